@@ -1,9 +1,23 @@
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, make_response
 from flask_cors import CORS
-import pymysql
+import base64
+import functools
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from db import get_db, init_app as init_pool
+import storage
+from cache import ResultCache
+import encoders
+import metrics
+import migrate
+import log
+import rollups
+from log import log_payload, logger
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for cross-origin requests
+CORS(app, expose_headers=['X-Next-Cursor'])  # Enable CORS for cross-origin requests
 
 # Database connection configuration
 db_config = {
@@ -15,140 +29,344 @@ db_config = {
     'database': 'project'
 }
 
-# Initialize database tables
+# Connection pool settings (seconds for all timeouts)
+pool_config = {
+    'max_size': 10,  # Upper bound on open connections per process
+    'pre_ping': True,  # Ping idle connections before handing them out
+    'idle_timeout': 300,  # Recycle connections idle longer than this
+    'max_lifetime': 3600,  # Recycle connections older than this
+    'checkout_timeout': 10  # Wait at most this long for a free connection
+}
+
+# Storage engine: 'mysql' uses db_config, 'sqlite' an embedded database at sqlite_path
+# (':memory:' keeps it in this process). STORAGE_BACKEND and SQLITE_PATH override these.
+storage_config = {
+    'backend': os.environ.get('STORAGE_BACKEND', 'mysql'),
+    'sqlite_path': os.environ.get('SQLITE_PATH', ':memory:')
+}
+
+storage_backend = storage.create_backend(
+    **storage_config, db_config=db_config,
+    cursorclass=metrics.MeteredDictCursor, stream_cursorclass=metrics.MeteredSSDictCursor,
+    on_execute=metrics.observe_query, on_rows=metrics.count_rows
+)
+
+db_pool = init_pool(app, storage_backend, on_checkout=metrics.observe_pool_wait, **pool_config)
+
+# JSON encoder for responses: 'orjson' (falls back to 'stdlib' without orjson) or 'stdlib'.
+# Both write dates in ISO 8601, so routes pass date columns through unformatted.
+# JSON_ENCODER overrides it.
+json_config = {
+    'encoder': os.environ.get('JSON_ENCODER', 'orjson')
+}
+
+app.json = encoders.create_provider(app, **json_config)
+
+# Per-route request, query and pool metrics, served at /metrics
+metrics.init_app(app)
+
+# Structured logging settings; records are written as JSON lines by a background thread
+log_config = {
+    'level': 'INFO',
+    'queue_size': 10000,  # Records beyond this are dropped instead of blocking a request
+    'sample_rate': 1.0,  # Fraction of request payloads that are logged
+    'max_list_items': 10,  # Payload lists are cut to this many items
+    'max_payload_chars': 2000,  # Serialized payloads are cut to this many characters
+    'redact_fields': ('password',),  # Keys (any case, any depth) whose values are masked
+    'routes': {  # Per-endpoint overrides of the payload settings above
+        'add_grades_batch': {'sample_rate': 0.1},
+        'submit_attendance': {'sample_rate': 0.1}
+    }
+}
+
+log.init_app(app, **log_config)
+
+# Query result cache settings (seconds for ttl and poll_interval)
+cache_config = {
+    'ttl': 60,  # Longest time a cached result is served
+    'max_entries': 1024,  # Least recently used entries are evicted beyond this
+    'max_bytes': 32 * 1024 * 1024,  # ...or beyond this much cached response data
+    'poll_interval': 1.0  # How often to check table_versions for other workers' writes
+}
+
+# Cached query results, invalidated by the write routes through table tags
+query_cache = ResultCache(**cache_config)
+
+# Seconds the admin dashboard counts are served from cache
+DASHBOARD_CACHE_TTL = 30
+
+# Relative weight of each grade type in a final grade, for courses without their
+# own weights (set with PUT /grade-weights/<courseId>)
+grade_weight_config = {
+    'quiz': 20,
+    'exam': 40,
+    'assignment': 25,
+    'homework': 15
+}
+
+# Bring the database schema up to date (see migrate.py and migrations.py)
 def init_db():
     try:
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
-        cursor = connection.cursor()
+        connection = get_db()
         
-        # Check if grades table exists, create if not
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS grades (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            date DATE NOT NULL,
-            course VARCHAR(100) NOT NULL,
-            course_id VARCHAR(50) NOT NULL,
-            type ENUM('quiz', 'exam', 'assignment', 'homework') NOT NULL,
-            title VARCHAR(255) NOT NULL,
-            student VARCHAR(100) NOT NULL,
-            student_id INT NOT NULL,
-            score INT NOT NULL,
-            max_score INT NOT NULL,
-            feedback TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Check if students table exists, create if not
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS students (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            first_name VARCHAR(100) NOT NULL,
-            last_name VARCHAR(100) NOT NULL,
-            date_of_birth DATE NOT NULL,
-            id_number VARCHAR(50) NOT NULL,
-            id_type VARCHAR(20) NOT NULL,
-            grade VARCHAR(20) NOT NULL,
-            location VARCHAR(100) NOT NULL,
-            courses TEXT NOT NULL,
-            parent_name VARCHAR(100) NOT NULL,
-            parent_email VARCHAR(100) NOT NULL,
-            parent_phone VARCHAR(20) NOT NULL,
-            parent_id_number VARCHAR(50) NOT NULL,
-            parent_id_type VARCHAR(20) NOT NULL,
-            address TEXT,
-            emergency_contact VARCHAR(20) NOT NULL,
-            medical_info TEXT,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Check if attendance records table exists, create if not
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            date DATE NOT NULL,
-            course_id VARCHAR(50) NOT NULL,
-            course_name VARCHAR(100) NOT NULL,
-            student_id VARCHAR(50) NOT NULL,
-            student_name VARCHAR(100) NOT NULL,
-            status ENUM('present', 'absent', 'late') NOT NULL,
-            arrival_time VARCHAR(20),
-            leaving_time VARCHAR(20),
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Check if teachers table exists, create if not
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS teachers (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            first_name VARCHAR(100) NOT NULL,
-            last_name VARCHAR(100) NOT NULL,
-            email VARCHAR(100) NOT NULL,
-            phone VARCHAR(20) NOT NULL,
-            id_number VARCHAR(50) NOT NULL,
-            id_type VARCHAR(20) NOT NULL,
-            location VARCHAR(100) NOT NULL,
-            courses TEXT NOT NULL,
-            qualifications VARCHAR(255) NOT NULL,
-            experience VARCHAR(50) NOT NULL,
-            join_date DATE NOT NULL,
-            languages VARCHAR(255) NOT NULL,
-            bio TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Check if courses table exists, create if not
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS courses (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(100) NOT NULL,
-            level VARCHAR(50) NOT NULL,
-            age_range VARCHAR(50) NOT NULL,
-            location VARCHAR(100) NOT NULL,
-            schedule VARCHAR(100) NOT NULL,
-            time VARCHAR(100) NOT NULL,
-            teacher VARCHAR(100) NOT NULL,
-            max_students INT NOT NULL,
-            fee VARCHAR(50) NOT NULL,
-            description TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        
-        # Check if enrollments table exists, create if not
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS enrollments (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            parent_id INT NOT NULL,
-            course_id INT NOT NULL,
-            enrollment_date DATE DEFAULT CURRENT_TIMESTAMP,
-            status VARCHAR(20) DEFAULT 'active',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
-        )
-        """)
+        if storage_backend.name == 'sqlite':
+            # The embedded database belongs to this process, so migrate it in place
+            applied = migrate.migrate(connection, storage_backend, log=None)
+            logger.info("Database migrated, %d migrations applied", len(applied))
+            return
         
-        connection.commit()
-        print("Database tables initialized successfully")
+        # MySQL is migrated ahead of deployment; online index builds do not belong in app startup
+        pending = migrate.pending_migrations(connection, storage_backend)
+        if pending:
+            logger.warning("Database schema is %d migrations behind (next: %d %s), run python migrate.py",
+                           len(pending), pending[0].version, pending[0].name)
+        else:
+            logger.info("Database schema is up to date")
     except Exception as e:
-        print(f"Database tables initialization failed: {str(e)}")
-    finally:
+        logger.error("Database migration check failed: %s", e)
+
+# Statement run once per changed table by bump_table_versions()
+# with (table_name, 1) as parameters
+BUMP_TABLE_VERSION_SQL = storage_backend.upsert(
+    'table_versions', ('table_name', 'version'), ('table_name',),
+    assignments={'version': 'version + 1'}
+)
+
+def bump_table_versions(cursor, tables):
+    """Increment the change counter of each table, inside the caller's transaction"""
+    cursor.executemany(BUMP_TABLE_VERSION_SQL, [(table, 1) for table in tables])
+
+def get_table_versions(cursor, tables):
+    """Return {table: version} for the given tables; unknown tables are at version 0"""
+    placeholders = ', '.join(['%s'] * len(tables))
+    cursor.execute(
+        f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})",
+        list(tables)
+    )
+    versions = {table: 0 for table in tables}
+    for row in cursor.fetchall():
+        versions[row['table_name']] = row['version']
+    return versions
+
+def commit_changes(connection, cursor, *tables):
+    """Commit a write, bumping the version of every table it changed and evicting cached results"""
+    bump_table_versions(cursor, tables)
+    connection.commit()
+    query_cache.invalidate(*tables)
+
+def version_etag(full_path, tables, versions):
+    """ETag for a read of full_path at the given table versions"""
+    version_key = full_path + '|' + ','.join(f"{table}.{versions[table]}" for table in tables)
+    return hashlib.sha1(version_key.encode('utf-8')).hexdigest()[:16]
+
+def versioned(*tables):
+    """Serve a read route with a version-based ETag and answer 304 when it still matches.
+
+    The ETag is derived from the change counters of the tables the route reads,
+    so a matching If-None-Match is answered from one primary-key lookup without
+    running the route's query.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                cursor = get_db().cursor()
+                try:
+                    versions = get_table_versions(cursor, tables)
+                finally:
+                    cursor.close()
+            except Exception as e:
+                # Serve without an ETag if the counters cannot be read
+                logger.warning("Table version lookup failed: %s", e)
+                return view(*args, **kwargs)
+            
+            # Evict results cached before these counters moved, so @cached
+            # cannot serve an older body under this ETag
+            query_cache.observe_versions(versions)
+            etag = version_etag(request.full_path, tables, versions)
+            
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+def sync_cache_versions():
+    """Evict cached results for tables changed by other worker processes.
+
+    Polls table_versions at most once per poll_interval; local writes already
+    invalidate through commit_changes().
+    """
+    if not query_cache.poll_due():
+        return
+    try:
+        cursor = get_db().cursor()
+        try:
+            cursor.execute("SELECT table_name, version FROM table_versions")
+            query_cache.apply_versions({row['table_name']: row['version'] for row in cursor.fetchall()})
+        finally:
+            cursor.close()
+    except Exception as e:
+        # Without the counters, fall back to dropping everything that may be stale
+        logger.warning("Table version poll failed: %s", e)
+        query_cache.clear()
+
+def cached(*tables):
+    """Serve a read route from query_cache, keyed by path and query string.
+
+    Entries are tagged with the tables the route reads, so writes to any of
+    them evict the entry. Only 200 responses are cached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            sync_cache_versions()
+            cache_key = ('route', request.full_path)
+            entry = query_cache.get(cache_key)
+            if entry is not None:
+                body, mimetype = entry
+                return Response(body, mimetype=mimetype)
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                body = response.get_data()
+                query_cache.set(cache_key, (body, response.mimetype), tags=tables, size=len(body))
+            return response
+        return wrapper
+    return decorator
+
+def resolve_course_ids(cursor, courses):
+    """Map a list of course ids or course names to existing course ids"""
+    if not courses:
+        return []
+    values = [str(course) for course in courses]
+    placeholders = ', '.join(['%s'] * len(values))
+    sql = f"SELECT id FROM courses WHERE id IN ({placeholders}) OR name IN ({placeholders})"
+    cursor.execute(sql, values + values)
+    return [row['id'] for row in cursor.fetchall()]
+
+def fetch_course_names(cursor, link_table, owner_column, owner_ids):
+    """Map each owner id to its active course names through a link table"""
+    course_names = {owner_id: [] for owner_id in owner_ids}
+    if not owner_ids:
+        return course_names
+    placeholders = ', '.join(['%s'] * len(owner_ids))
+    # Uses the (owner_id, course_id) unique key and the courses primary key
+    sql = f"""
+    SELECT l.{owner_column} AS owner_id, c.name
+    FROM {link_table} l
+    JOIN courses c ON c.id = l.course_id
+    WHERE l.{owner_column} IN ({placeholders}) AND l.status = 'active'
+    ORDER BY c.name
+    """
+    cursor.execute(sql, list(owner_ids))
+    for row in cursor.fetchall():
+        course_names[row['owner_id']].append(row['name'])
+    return course_names
+
+# Largest page size accepted by paginated list endpoints
+MAX_PAGE_SIZE = 500
+
+# Assessment types allowed in the grades table
+GRADE_TYPES = rollups.GRADE_TYPES
+
+# Sort keys accepted by GET /grades: column and whether it is descending
+GRADE_SORTS = {
+    'date': ('date', False),
+    '-date': ('date', True),
+    'score': ('score', False),
+    '-score': ('score', True)
+}
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page as an opaque cursor token"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_cursor(token):
+    """Decode a cursor token back into its sort key values, raising ValueError if malformed"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def keyset_clause(column, descending):
+    """SQL condition selecting rows after (column, id) = (%s, %s) in the given order"""
+    op = '<' if descending else '>'
+    return f"{column} {op}= %s AND ({column} {op} %s OR id {op} %s)"
+
+def escape_like(value):
+    """Escape LIKE wildcards so user input is matched literally, for use with ESCAPE '!'"""
+    return value.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+# Rows read from the server-side cursor per chunk of a streamed response
+STREAM_BATCH_SIZE = 500
+
+def requested_stream_format():
+    """Return 'ndjson' or 'json' when the client asked for a streamed list, else None"""
+    if request.accept_mimetypes.best == 'application/x-ndjson':
+        return 'ndjson'
+    if request.args.get('stream') in ('1', 'true'):
+        return 'json'
+    return None
+
+def stream_query(connection, sql, params, format_row, stream_format):
+    """Stream query results as NDJSON or a chunked JSON array.
+
+    Rows are read through the backend's streaming cursor and written out in
+    batches, so memory stays flat regardless of the result size. The query is
+    executed before returning, so SQL errors still surface as a normal 500.
+    """
+    cursor = storage_backend.stream_cursor(connection)
+    try:
+        cursor.execute(sql, params)
+    except Exception:
         cursor.close()
-        connection.close()
+        raise
+    
+    def generate():
+        try:
+            first = True
+            if stream_format == 'json':
+                yield '['
+            while True:
+                rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                if stream_format == 'ndjson':
+                    yield ''.join(app.json.dumps(format_row(row)) + '\n' for row in rows)
+                else:
+                    chunk = ','.join(app.json.dumps(format_row(row)) for row in rows)
+                    yield chunk if first else ',' + chunk
+                first = False
+            if stream_format == 'json':
+                yield ']'
+        finally:
+            cursor.close()
+    
+    mimetype = 'application/x-ndjson' if stream_format == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+def parse_page_limit(value):
+    """Parse the limit query parameter, clamped to MAX_PAGE_SIZE"""
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_PAGE_SIZE)
+
+def parse_iso_date(value, name):
+    """Parse a YYYY-MM-DD parameter into a date (None if empty), raising ValueError if invalid"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"{name} must be YYYY-MM-DD")
 
 @app.route('/signup', methods=['POST'])
 def signup():
@@ -171,21 +389,11 @@ def signup():
         email = form_data.get('email')
         password = form_data.get('password')
         
-        # Print received data for debugging
-        print(f"User type: {user_type}")
-        print(f"Form data: {form_data}")
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],  # 添加端口参数
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}  # Bypass SSL verification requirement
-        )
+        # Log received data for debugging (passwords are redacted)
+        log_payload("Signup request", data)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -193,14 +401,14 @@ def signup():
                 child_name = form_data.get('childName')
                 child_age = form_data.get('childAge')
                 # Insert data - Fix column name format
-                sql = "INSERT INTO parent (`id`, `First_Name`, `Last_Name`, `Email_Address`, `Password`, `Child_Name`, `Child_Age`) VALUES (%s, %s, %s, %s, %s, %s, %s)"
-                cursor.execute(sql, (0, first_name, last_name, email, password, child_name, child_age))
+                sql = "INSERT INTO parent (`First_Name`, `Last_Name`, `Email_Address`, `Password`, `Child_Name`, `Child_Age`) VALUES (%s, %s, %s, %s, %s, %s)"
+                cursor.execute(sql, (first_name, last_name, email, password, child_name, child_age))
             elif user_type == 'teacher':
                 subject = form_data.get('subject')
                 experience = form_data.get('experience')
                 # Insert data - Fix column name format
-                sql = "INSERT INTO teacher (`id`, `First_Name`, `Last_Name`, `Email_Address`, `Password`, `Subject`, `Experience`) VALUES (%s, %s, %s, %s, %s, %s, %s)"
-                cursor.execute(sql, (0, first_name, last_name, email, password, subject, experience))
+                sql = "INSERT INTO teacher (`First_Name`, `Last_Name`, `Email_Address`, `Password`, `Subject`, `Experience`) VALUES (%s, %s, %s, %s, %s, %s)"
+                cursor.execute(sql, (first_name, last_name, email, password, subject, experience))
             else:
                 return jsonify({"error": "Unsupported user type"}), 400
                 
@@ -209,15 +417,14 @@ def signup():
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/login', methods=['POST'])
@@ -236,20 +443,11 @@ def login():
         if not user_type or not email or not password:
             return jsonify({"error": "Incorrect data format"}), 400
             
-        # Print received data for debugging
-        print(f"Login attempt - User type: {user_type}, Email: {email}, Password: {password}")
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],  # 添加端口参数
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}  # Bypass SSL verification requirement
-        )
+        # Log received data for debugging (passwords are redacted)
+        log_payload("Login attempt", data)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -287,15 +485,14 @@ def login():
                 return jsonify({"error": "Incorrect email or password"}), 401
                 
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/students', methods=['POST'])
@@ -306,20 +503,11 @@ def add_student():
         if not data:
             return jsonify({"error": "No data received"}), 400
             
-        # Print received data for debugging
-        print(f"Received student data: {data}")
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}  # Bypass SSL verification requirement
-        )
+        # Log received data for debugging
+        log_payload("Received student data", data)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -331,7 +519,7 @@ def add_student():
             id_type = data.get('idType')
             grade = data.get('grade')
             location = data.get('location')
-            courses = ','.join(data.get('courses', []))  # Convert course list to comma-separated string
+            courses = data.get('courses', [])
             
             # Parent information
             parent_name = data.get('parentName')
@@ -350,34 +538,42 @@ def add_student():
             sql = """
             INSERT INTO students (
                 first_name, last_name, date_of_birth, id_number, id_type,
-                grade, location, courses, parent_name, parent_email,
+                grade, location, parent_name, parent_email,
                 parent_phone, parent_id_number, parent_id_type, address,
                 emergency_contact, medical_info, notes
             ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
             )
             """
             cursor.execute(sql, (
                 first_name, last_name, date_of_birth, id_number, id_type,
-                grade, location, courses, parent_name, parent_email,
+                grade, location, parent_name, parent_email,
                 parent_phone, parent_id_number, parent_id_type, address,
                 emergency_contact, medical_info, notes
             ))
+            student_id = cursor.lastrowid
+            
+            # Record course memberships in the student_course relation
+            course_ids = resolve_course_ids(cursor, courses)
+            if course_ids:
+                cursor.executemany(
+                    storage_backend.insert_ignore('student_course', ('student_id', 'course_id')),
+                    [(student_id, course_id) for course_id in course_ids]
+                )
                 
-            connection.commit()
+            commit_changes(connection, cursor, 'students', 'student_course')
             return jsonify({"message": "Student added successfully!"}), 200
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/courses', methods=['POST'])
@@ -388,20 +584,11 @@ def add_course():
         if not data:
             return jsonify({"error": "No data received"}), 400
             
-        # Print received data for debugging
-        print(f"Received course data: {data}")
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}  # Bypass SSL verification requirement
-        )
+        # Log received data for debugging
+        log_payload("Received course data", data)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -419,12 +606,13 @@ def add_course():
             
             # Get teacher name based on teacher ID
             teacher_name = ""
+            teacher_result = None
             if teacher_id:
-                sql_get_teacher = "SELECT CONCAT(first_name, ' ', last_name) as full_name FROM teachers WHERE id = %s"
+                sql_get_teacher = "SELECT first_name, last_name FROM teachers WHERE id = %s"
                 cursor.execute(sql_get_teacher, (teacher_id,))
                 teacher_result = cursor.fetchone()
                 if teacher_result:
-                    teacher_name = teacher_result['full_name']
+                    teacher_name = f"{teacher_result['first_name']} {teacher_result['last_name']}"
                 else:
                     # If teacher not found, use ID as fallback
                     teacher_name = f"Teacher ID: {teacher_id}"
@@ -442,21 +630,27 @@ def add_course():
                 name, level, age_range, location, schedule,
                 time, teacher_name, max_students, fee, description
             ))
+            
+            # Link the assigned teacher through the teacher_course relation
+            if teacher_result:
+                cursor.execute(
+                    storage_backend.insert_ignore('teacher_course', ('teacher_id', 'course_id')),
+                    (teacher_id, cursor.lastrowid)
+                )
                 
-            connection.commit()
+            commit_changes(connection, cursor, 'courses', 'teacher_course')
             return jsonify({"message": "Course added successfully!"}), 200
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/teachers', methods=['POST'])
@@ -467,20 +661,11 @@ def add_teacher():
         if not data:
             return jsonify({"error": "No data received"}), 400
             
-        # Print received data for debugging
-        print(f"Received teacher data: {data}")
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}  # Bypass SSL verification requirement
-        )
+        # Log received data for debugging
+        log_payload("Received teacher data", data)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -492,7 +677,7 @@ def add_teacher():
             id_number = data.get('idNumber')
             id_type = data.get('idType')
             location = data.get('location')
-            courses = ','.join(data.get('courses', []))  # Convert course list to comma-separated string
+            courses = data.get('courses', [])
             qualifications = data.get('qualifications')
             experience = data.get('experience')
             join_date = data.get('joinDate')
@@ -503,48 +688,47 @@ def add_teacher():
             sql = """
             INSERT INTO teachers (
                 first_name, last_name, email, phone, id_number, id_type,
-                location, courses, qualifications, experience, join_date,
+                location, qualifications, experience, join_date,
                 languages, bio
             ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
             )
             """
             cursor.execute(sql, (
                 first_name, last_name, email, phone, id_number, id_type,
-                location, courses, qualifications, experience, join_date,
+                location, qualifications, experience, join_date,
                 languages, bio
             ))
+            teacher_id = cursor.lastrowid
+            
+            # Record course assignments in the teacher_course relation
+            course_ids = resolve_course_ids(cursor, courses)
+            if course_ids:
+                cursor.executemany(
+                    storage_backend.insert_ignore('teacher_course', ('teacher_id', 'course_id')),
+                    [(teacher_id, course_id) for course_id in course_ids]
+                )
                 
-            connection.commit()
+            commit_changes(connection, cursor, 'teachers', 'teacher_course')
             return jsonify({"message": "Teacher added successfully!"}), 200
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/courses/<int:course_id>', methods=['DELETE'])
 def delete_course(course_id):
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -555,158 +739,214 @@ def delete_course(course_id):
             if cursor.rowcount == 0:
                 return jsonify({"error": "Course not found"}), 404
                 
-            connection.commit()
+            commit_changes(connection, cursor, 'courses', 'student_course', 'teacher_course', 'enrollments')
             return jsonify({"message": "Course deleted successfully"}), 200
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+# All courses together with their registered student counts, in one grouped
+# query instead of one COUNT query per course
+COURSES_QUERY = """
+SELECT c.*, COUNT(sc.student_id) AS enrolled_count
+FROM courses c
+LEFT JOIN student_course sc ON sc.course_id = c.id AND sc.status = 'active'
+GROUP BY c.id
+"""
+
+def format_course(course):
+    """Convert a COURSES_QUERY row to the format the frontend expects"""
+    return {
+        'id': course['id'],
+        'name': course['name'],
+        'level': course['level'],
+        'ageRange': course['age_range'],
+        'location': course['location'],
+        'schedule': course['schedule'],
+        'time': course['time'],
+        'teacher': course['teacher'],
+        'enrolledStudents': course['enrolled_count'],
+        'maxStudents': course['max_students'],
+        'fee': course['fee'],
+        'status': 'active'  # Default all courses are active
+    }
+
 @app.route('/courses', methods=['GET'])
+@versioned('courses', 'student_course')
+@cached('courses', 'student_course')
 def get_courses():
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
-            # Query all courses
-            sql = "SELECT * FROM courses"
-            cursor.execute(sql)
+            # Query all courses with their enrolled student counts
+            cursor.execute(COURSES_QUERY)
             courses_data = cursor.fetchall()
             
-            # Query the number of registered students for each course
-            courses = []
-            for course in courses_data:
-                # Query the number of students registered for this course
-                sql = "SELECT COUNT(*) as count FROM students WHERE FIND_IN_SET(%s, courses)"
-                cursor.execute(sql, (str(course['id'])))
-                enrolled_count = cursor.fetchone()['count']
-                
-                # Convert data format to match frontend requirements
-                courses.append({
-                    'id': course['id'],
-                    'name': course['name'],
-                    'level': course['level'],
-                    'ageRange': course['age_range'],
-                    'location': course['location'],
-                    'schedule': course['schedule'],
-                    'time': course['time'],
-                    'teacher': course['teacher'],
-                    'enrolledStudents': enrolled_count,
-                    'maxStudents': course['max_students'],
-                    'fee': course['fee'],
-                    'status': 'active'  # Default all courses are active
-                })
+            # Convert data format to match frontend requirements
+            courses = [format_course(course) for course in courses_data]
                 
             return jsonify(courses), 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+# Aggregate of a student's course names, newline-separated in name order
+STUDENT_COURSE_NAMES = storage_backend.group_concat('c.name', 'c.name', '\n')
+
+# Columns returned by GET /students; age is computed by the database against
+# the date bound to its placeholder, and course names come from the
+# student_course relation through its (student_id, course_id) unique key
+STUDENTS_LIST_SELECT = f"""
+SELECT s.id, s.first_name, s.last_name, s.grade, s.location,
+    s.parent_name, s.parent_phone, s.created_at,
+    {storage_backend.age_in_years('s.date_of_birth')} AS age,
+    (SELECT {STUDENT_COURSE_NAMES}
+     FROM student_course sc
+     JOIN courses c ON c.id = sc.course_id
+     WHERE sc.student_id = s.id AND sc.status = 'active') AS course_names
+FROM students s
+"""
+
+def format_student(student):
+    """Convert a STUDENTS_LIST_SELECT row to the format the frontend expects"""
+    return {
+        'id': student['id'],
+        'name': f"{student['first_name']} {student['last_name']}",
+        'age': student['age'],
+        'grade': student['grade'],
+        'location': student['location'],
+        'courses': student['course_names'].split('\n') if student['course_names'] else [],
+        'parent': student['parent_name'],
+        'contact': student['parent_phone'],
+        # created_at is a timestamp; the JSON provider writes the date part as YYYY-MM-DD
+        'joinDate': student['created_at'].date(),
+        'status': 'active'  # Default all students are active
+    }
+
+def build_students_query(args, today):
+    """Build the SELECT for GET /students from its query parameters.
+
+    Returns (sql, params, page_size); the caller appends LIMIT when
+    page_size is set. Ages are computed as of ``today``. Raises ValueError
+    with a client-facing message for invalid parameters.
+    """
+    # Optional filters
+    grade = args.get('grade')
+    location = args.get('location')
+    course_id = args.get('courseId')
+    
+    # Keyset pagination on id: pass limit, then the X-Next-Cursor
+    # response header as cursor to get the following page
+    limit = args.get('limit')
+    cursor_token = args.get('cursor')
+    
+    try:
+        page_size = parse_page_limit(limit) if limit else (MAX_PAGE_SIZE if cursor_token else None)
+        after_id = int(decode_cursor(cursor_token)[0]) if cursor_token else None
+    except (ValueError, TypeError, IndexError, KeyError):
+        raise ValueError("Invalid limit or cursor parameter")
+    
+    sql = STUDENTS_LIST_SELECT + "WHERE 1=1"
+    params = [today]
+    
+    if grade:
+        sql += " AND s.grade = %s"
+        params.append(grade)
+        
+    if location:
+        sql += " AND s.location = %s"
+        params.append(location)
+        
+    if course_id:
+        # Uses the (course_id, status, student_id) index of student_course
+        sql += """ AND s.id IN (
+            SELECT student_id FROM student_course WHERE course_id = %s AND status = 'active'
+        )"""
+        params.append(course_id)
+        
+    if after_id is not None:
+        sql += " AND s.id > %s"
+        params.append(after_id)
+        
+    sql += " ORDER BY s.id"
+    
+    return sql, params, page_size
+
 @app.route('/students', methods=['GET'])
 def get_students():
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        try:
+            sql, params, page_size = build_students_query(request.args, datetime.today().date())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
-            # Query all students
-            sql = "SELECT * FROM students"
-            cursor.execute(sql)
+            # Streaming applies to unpaginated requests only, like GET /grades
+            stream_format = requested_stream_format()
+            if stream_format and not page_size:
+                return stream_query(connection, sql, params, format_student, stream_format)
+            
+            if page_size:
+                # Fetch one extra row to know whether another page follows
+                sql += " LIMIT %s"
+                params.append(page_size + 1)
+                
+            cursor.execute(sql, params)
             students_data = cursor.fetchall()
             
+            next_cursor = None
+            if page_size and len(students_data) > page_size:
+                students_data = students_data[:page_size]
+                next_cursor = encode_cursor([students_data[-1]['id']])
+            
             # Convert data format to match frontend requirements
-            students = []
-            for student in students_data:
-                # Calculate age (based on date of birth)
-                from datetime import datetime
-                birth_date = datetime.strptime(str(student['date_of_birth']), '%Y-%m-%d')
-                today = datetime.today()
-                age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
-                
-                # Convert courses string to array
-                courses_list = student['courses'].split(',') if student['courses'] else []
+            students = [format_student(student) for student in students_data]
                 
-                # Convert data format
-                students.append({
-                    'id': student['id'],
-                    'name': f"{student['first_name']} {student['last_name']}",
-                    'age': age,
-                    'grade': student['grade'],
-                    'location': student['location'],
-                    'courses': courses_list,
-                    'parent': student['parent_name'],
-                    'contact': student['parent_phone'],
-                    'joinDate': student['created_at'].strftime('%Y-%m-%d'),
-                    'status': 'active'  # Default all students are active
-                })
-                
-            return jsonify(students), 200
+            response = jsonify(students)
+            if next_cursor:
+                response.headers['X-Next-Cursor'] = next_cursor
+            return response, 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/teachers/<int:teacher_id>', methods=['DELETE'])
 def delete_teacher(teacher_id):
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -717,36 +957,26 @@ def delete_teacher(teacher_id):
             if cursor.rowcount == 0:
                 return jsonify({"error": "Teacher not found"}), 404
                 
-            connection.commit()
+            commit_changes(connection, cursor, 'teachers', 'teacher_course')
             return jsonify({"message": "Teacher deleted successfully"}), 200
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/students/<int:student_id>', methods=['DELETE'])
 def delete_student(student_id):
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -757,36 +987,28 @@ def delete_student(student_id):
             if cursor.rowcount == 0:
                 return jsonify({"error": "Student not found"}), 404
                 
-            connection.commit()
+            commit_changes(connection, cursor, 'students', 'student_course')
             return jsonify({"message": "Student deleted successfully"}), 200
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/locations', methods=['GET'])
+@versioned('students')
+@cached('students')
 def get_locations():
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -809,31 +1031,23 @@ def get_locations():
             return jsonify(locations), 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/course-names', methods=['GET'])
+@versioned('courses')
+@cached('courses')
 def get_course_names():
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -853,31 +1067,23 @@ def get_course_names():
             return jsonify(courses), 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/teachers', methods=['GET'])
+@versioned('teachers', 'teacher_course', 'courses')
+@cached('teachers', 'teacher_course', 'courses')
 def get_teachers():
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -886,12 +1092,14 @@ def get_teachers():
             cursor.execute(sql)
             teachers_data = cursor.fetchall()
             
+            # Look up course assignments through the teacher_course relation
+            course_names = fetch_course_names(
+                cursor, 'teacher_course', 'teacher_id', [teacher['id'] for teacher in teachers_data]
+            )
+            
             # Convert data format to match frontend requirements
             teachers = []
             for teacher in teachers_data:
-                # Convert courses string to array
-                courses_list = teacher['courses'].split(',') if teacher['courses'] else []
-                
                 # Convert qualifications string to array
                 qualifications_list = teacher['qualifications'].split(',') if teacher['qualifications'] else []
                 
@@ -900,134 +1108,246 @@ def get_teachers():
                     'id': teacher['id'],
                     'name': f"{teacher['first_name']} {teacher['last_name']}",
                     'location': teacher['location'],
-                    'courses': courses_list,
+                    'courses': course_names[teacher['id']],
                     'experience': teacher['experience'],
                     'qualifications': qualifications_list,
                     'contact': teacher['phone'],
-                    'joinDate': teacher['join_date'].strftime('%Y-%m-%d'),
+                    'joinDate': teacher['join_date'],
                     'status': 'active'  # Default all teachers are active
                 })
                 
             return jsonify(teachers), 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+def format_grade(grade):
+    """Convert a grades row to the format the frontend expects"""
+    return {
+        'id': grade['id'],
+        'date': grade['date'],
+        'course': grade['course'],
+        'courseId': grade['course_id'],
+        'type': grade['type'],
+        'title': grade['title'],
+        'student': grade['student'],
+        'studentId': grade['student_id'],
+        'score': grade['score'],
+        'maxScore': grade['max_score'],
+        'feedback': grade['feedback']
+    }
+
+def build_grades_query(args):
+    """Build the SELECT for GET /grades from its query parameters.
+
+    Returns (sql, params, page_size, sort); the caller appends LIMIT when
+    page_size is set. Raises ValueError with a client-facing message for
+    invalid parameters.
+    """
+    # Optional filters, each served by one of the grades indexes
+    course_id = args.get('courseId')
+    grade_type = args.get('type')
+    student_id = args.get('studentId')
+    student_name = args.get('studentName')  # Name prefix
+    date_from = args.get('dateFrom')
+    date_to = args.get('dateTo')
+    sort = args.get('sort', '-date')
+    
+    if sort not in GRADE_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(GRADE_SORTS)}")
+    if grade_type and grade_type not in GRADE_TYPES:
+        raise ValueError(f"type must be one of: {', '.join(GRADE_TYPES)}")
+    try:
+        for value in (date_from, date_to):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError("dateFrom and dateTo must be YYYY-MM-DD")
+    
+    # Keyset pagination on (sort column, id): pass limit, then the
+    # X-Next-Cursor response header as cursor to get the following page
+    limit = args.get('limit')
+    cursor_token = args.get('cursor')
+    sort_column, descending = GRADE_SORTS[sort]
+    
+    try:
+        page_size = parse_page_limit(limit) if limit else (MAX_PAGE_SIZE if cursor_token else None)
+        after = decode_cursor(cursor_token) if cursor_token else None
+        if after is not None:
+            cursor_sort, after_value, after_id = after[0], after[1], int(after[2])
+            if cursor_sort != sort:
+                raise ValueError("Cursor does not match sort")
+    except (ValueError, TypeError, IndexError, KeyError):
+        raise ValueError("Invalid limit or cursor parameter")
+    
+    # Build query with filters
+    sql = "SELECT * FROM grades WHERE 1=1"
+    params = []
+    
+    if course_id:
+        sql += " AND course_id = %s"
+        params.append(course_id)
+        
+    if grade_type:
+        sql += " AND type = %s"
+        params.append(grade_type)
+        
+    if student_id:
+        sql += " AND student_id = %s"
+        params.append(student_id)
+        
+    if student_name:
+        # Prefix match so the student name index can be used
+        sql += " AND student LIKE %s ESCAPE '!'"
+        params.append(escape_like(student_name) + '%')
+        
+    if date_from:
+        sql += " AND date >= %s"
+        params.append(date_from)
+        
+    if date_to:
+        sql += " AND date <= %s"
+        params.append(date_to)
+    
+    # Seek past the last row of the previous page instead of using
+    # OFFSET, so deep pages cost the same as page one
+    if after is not None:
+        sql += " AND " + keyset_clause(sort_column, descending)
+        params.extend([after_value, after_value, after_id])
+        
+    direction = 'DESC' if descending else 'ASC'
+    sql += f" ORDER BY {sort_column} {direction}, id {direction}"
+    
+    return sql, params, page_size, sort
+
+def split_grades_page(grades_data, page_size, sort):
+    """Trim the look-ahead row off a page of grades and return (rows, next cursor or None)"""
+    if not page_size or len(grades_data) <= page_size:
+        return grades_data, None
+    grades_data = grades_data[:page_size]
+    last = grades_data[-1]
+    sort_column = GRADE_SORTS[sort][0]
+    last_value = last[sort_column]
+    if sort_column == 'date':
+        last_value = last_value.strftime('%Y-%m-%d')
+    return grades_data, encode_cursor([sort, last_value, last['id']])
+
 @app.route('/grades', methods=['GET'])
 def get_grades():
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        try:
+            sql, params, page_size, sort = build_grades_query(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
-            # Query all grades
-            sql = "SELECT * FROM grades ORDER BY date DESC"
-            cursor.execute(sql)
-            grades_data = cursor.fetchall()
+            # Streaming applies to unpaginated requests only, since the next
+            # cursor is not known until the last row has been sent
+            stream_format = requested_stream_format()
+            if stream_format and not page_size:
+                return stream_query(connection, sql, params, format_grade, stream_format)
+            
+            if page_size:
+                # Fetch one extra row to know whether another page follows
+                sql += " LIMIT %s"
+                params.append(page_size + 1)
+                
+            cursor.execute(sql, params)
+            grades_data, next_cursor = split_grades_page(cursor.fetchall(), page_size, sort)
             
             # Format the grades data for frontend
-            formatted_grades = []
-            for grade in grades_data:
-                formatted_grades.append({
-                    'id': grade['id'],
-                    'date': grade['date'].strftime('%Y-%m-%d'),
-                    'course': grade['course'],
-                    'courseId': grade['course_id'],
-                    'type': grade['type'],
-                    'title': grade['title'],
-                    'student': grade['student'],
-                    'studentId': grade['student_id'],
-                    'score': grade['score'],
-                    'maxScore': grade['max_score'],
-                    'feedback': grade['feedback']
-                })
+            formatted_grades = [format_grade(grade) for grade in grades_data]
                 
-            return jsonify(formatted_grades), 200
+            response = jsonify(formatted_grades)
+            if next_cursor:
+                response.headers['X-Next-Cursor'] = next_cursor
+            return response, 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 @app.route('/admin/dashboard-stats', methods=['GET'])
 def get_dashboard_stats():
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Serve from cache; student/course/teacher writes invalidate it
+        today = datetime.now().strftime('%Y-%m-%d')
+        cache_key = ('dashboard-stats', today)
+        sync_cache_versions()
+        stats = query_cache.get(cache_key)
+        if stats is not None:
+            return jsonify(stats), 200
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
+            one_month_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+            
+            # Get today's class count (this needs to be adjusted based on actual situation, assuming there's a course schedule table)
+            # Since there's no course schedule table, use an estimate here: each course has one class per week
+            today_weekday = datetime.now().weekday()  # 0-6，0是周一
+            
+            # Get all counts in one round trip, scanning each table once
+            cursor.execute("""
+            SELECT *
+            FROM
+                (SELECT COUNT(*) AS total_students,
+                        COALESCE(SUM(created_at < %s), 0) AS last_month_students
+                 FROM students) s,
+                (SELECT COUNT(*) AS active_courses,
+                        COALESCE(SUM(created_at < %s), 0) AS last_month_courses,
+                        COALESCE(SUM(schedule LIKE %s), 0) AS classes_today
+                 FROM courses) c,
+                (SELECT COUNT(*) AS total_teachers,
+                        COALESCE(SUM(created_at < %s), 0) AS last_month_teachers
+                 FROM teachers) t
+            """, (one_month_ago, one_month_ago, f"%{today_weekday}%", one_month_ago))
+            counts = cursor.fetchone()
+            
             # Get total number of students
-            cursor.execute("SELECT COUNT(*) as count FROM students")
-            total_students = cursor.fetchone()['count']
+            total_students = int(counts['total_students'])
             
             # Get last month's student count, calculate percentage change
-            from datetime import datetime, timedelta
-            one_month_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-            cursor.execute("SELECT COUNT(*) as count FROM students WHERE created_at < %s", (one_month_ago,))
-            last_month_students = cursor.fetchone()['count'] or 1  # Avoid division by zero
+            last_month_students = int(counts['last_month_students']) or 1  # Avoid division by zero
             student_change_percent = round(((total_students - last_month_students) / last_month_students) * 100)
             student_change = f"+{student_change_percent}%" if student_change_percent > 0 else f"{student_change_percent}%"
             
             # Get active course count
-            cursor.execute("SELECT COUNT(*) as count FROM courses")
-            active_courses = cursor.fetchone()['count']
+            active_courses = int(counts['active_courses'])
             
             # Get last month's course count, calculate change
-            cursor.execute("SELECT COUNT(*) as count FROM courses WHERE created_at < %s", (one_month_ago,))
-            last_month_courses = cursor.fetchone()['count'] or 0
+            last_month_courses = int(counts['last_month_courses'])
             course_change = f"+{active_courses - last_month_courses}" if active_courses > last_month_courses else f"{active_courses - last_month_courses}"
             
             # Get total number of teachers
-            cursor.execute("SELECT COUNT(*) as count FROM teachers")
-            total_teachers = cursor.fetchone()['count']
+            total_teachers = int(counts['total_teachers'])
             
             # Get last month's teacher count, calculate change
-            cursor.execute("SELECT COUNT(*) as count FROM teachers WHERE created_at < %s", (one_month_ago,))
-            last_month_teachers = cursor.fetchone()['count'] or total_teachers
+            last_month_teachers = int(counts['last_month_teachers']) or total_teachers
             teacher_change = f"+{total_teachers - last_month_teachers}" if total_teachers > last_month_teachers else f"{total_teachers - last_month_teachers}"
             
-            # Get today's class count (this needs to be adjusted based on actual situation, assuming there's a course schedule table)
-            # Since there's no course schedule table, use an estimate here: each course has one class per week
-            today_weekday = datetime.now().weekday()  # 0-6，0是周一
-            cursor.execute("SELECT COUNT(*) as count FROM courses WHERE schedule LIKE %s", (f"%{today_weekday}%",))
-            classes_today_result = cursor.fetchone()
-            classes_today = classes_today_result['count'] if classes_today_result else 0
+            classes_today = int(counts['classes_today'])
             
             # Assume last week's class count on the same day
             last_week_classes = int(classes_today * 1.1)  # Assume 10% more than this week
@@ -1057,20 +1377,60 @@ def get_dashboard_stats():
                 }
             }
             
+            query_cache.set(cache_key, stats, tags=('students', 'courses', 'teachers'), ttl=DASHBOARD_CACHE_TTL)
             return jsonify(stats), 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+# Links a student to a course, reactivating a dropped link
+ENROLL_STUDENT_COURSE_SQL = storage_backend.upsert(
+    'student_course', ('student_id', 'course_id'), ('student_id', 'course_id'),
+    assignments={'status': "'active'"}
+)
+
+# Creates the student for an enrollment made without a studentId, filling the
+# legacy init_db.sql columns as well as the required ones
+ENROLL_NEW_STUDENT_SQL = """
+INSERT INTO students (
+    first_name, last_name, date_of_birth, id_number, id_type, grade, location,
+    parent_name, parent_email, parent_phone, parent_id_number, parent_id_type,
+    emergency_contact, name, age, parent, contact, course_id
+) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def new_student_params(parent, course):
+    """ENROLL_NEW_STUDENT_SQL parameters for a parent account's child enrolling in course.
+
+    The child's name is split into first and last name (the parent's last name
+    if it has one word) and the date of birth is derived from the child's age.
+    Details the parent account does not hold are left empty.
+    """
+    name = parent.get('Child_Name') or 'Unknown Child'
+    first_name, _, last_name = name.partition(' ')
+    age = parent.get('Child_Age') or 0
+    today = datetime.now().date()
+    try:
+        date_of_birth = today.replace(year=today.year - age)
+    except ValueError:
+        # Born on 29 February of a leap year
+        date_of_birth = today.replace(year=today.year - age, day=28)
+    parent_name = f"{parent.get('First_Name', '')} {parent.get('Last_Name', '')}"
+    email = parent.get('Email_Address') or ''
+    return (
+        first_name, last_name or parent.get('Last_Name') or '', date_of_birth, '', '', '',
+        course['location'], parent_name.strip(), email, '', '', '', '',
+        name, age, parent_name, email or 'No contact', course['id']
+    )
+
 @app.route('/enroll', methods=['POST'])
 def enroll_course():
     try:
@@ -1087,20 +1447,11 @@ def enroll_course():
         if not course_id or not parent_id:
             return jsonify({"error": "Incorrect data format, missing courseId or parentId"}), 400
             
-        # Print received data for debugging
-        print(f"Enrollment request - Course ID: {course_id}, Parent ID: {parent_id}, Student ID: {student_id}")
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Log received data for debugging
+        logger.info("Enrollment request - Course ID: %s, Parent ID: %s, Student ID: %s", course_id, parent_id, student_id)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -1142,16 +1493,7 @@ def enroll_course():
                     return jsonify({"error": "Parent not found"}), 404
                 
                 # 创建学生记录
-                cursor.execute("""
-                INSERT INTO students (name, age, parent, contact, course_id)
-                VALUES (%s, %s, %s, %s, %s)
-                """, (
-                    parent.get('Child_Name', 'Unknown Child'),
-                    parent.get('Child_Age', 0),
-                    f"{parent.get('First_Name', '')} {parent.get('Last_Name', '')}",
-                    parent.get('Email_Address', 'No contact'),
-                    course_id
-                ))
+                cursor.execute(ENROLL_NEW_STUDENT_SQL, new_student_params(parent, course))
                 
                 # 获取新创建的学生ID
                 student_id = cursor.lastrowid
@@ -1167,13 +1509,9 @@ def enroll_course():
                           (course_id_int, parent_id_int, student_id))
             
             # 创建学生-课程关联记录
-            cursor.execute("""
-            INSERT INTO student_course (student_id, course_id)
-            VALUES (%s, %s)
-            ON DUPLICATE KEY UPDATE status = 'active'
-            """, (student_id, course_id_int))
+            cursor.execute(ENROLL_STUDENT_COURSE_SQL, (student_id, course_id_int))
             
-            connection.commit()
+            commit_changes(connection, cursor, 'students', 'enrollments', 'student_course')
             return jsonify({
                 "message": "Enrollment successful",
                 "studentId": student_id
@@ -1181,17 +1519,44 @@ def enroll_course():
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+# A parent's active enrollments joined with their courses
+USER_ENROLLMENTS_QUERY = """
+SELECT c.*, e.enrollment_date, e.status as enrollment_status
+FROM enrollments e
+JOIN courses c ON e.course_id = c.id
+WHERE e.parent_id = %s AND e.status = 'active'
+"""
+
+def format_enrollment(enrollment):
+    """Convert a USER_ENROLLMENTS_QUERY row to a calendar event"""
+    # Safely handle time format
+    time_parts = enrollment['time'].split('-') if '-' in enrollment['time'] else ['00:00', '00:00']
+    start_time = time_parts[0].strip() if len(time_parts) > 0 else '00:00'
+    end_time = time_parts[1].strip() if len(time_parts) > 1 else '01:00'
+    
+    return {
+        'id': str(enrollment['id']),
+        'title': enrollment['name'],
+        'start': f"2025-01-16T{start_time}:00",  # 使用课程时间创建事件开始时间
+        'end': f"2025-01-16T{end_time}:00",    # 使用课程时间创建事件结束时间
+        'extendedProps': {
+            'location': enrollment['location'],
+            'teacher': enrollment['teacher'],
+            'zoomLink': 'https://zoom.us/j/123456789' if 'Online' in enrollment['location'] else None,
+            'courseId': str(enrollment['id'])
+        }
+    }
+
 @app.route('/user-enrollments', methods=['GET'])
 def get_user_enrollments():
     try:
@@ -1207,199 +1572,312 @@ def get_user_enrollments():
         except ValueError:
             return jsonify({"error": "parentId must be an integer"}), 400
             
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
             # Query user's enrolled courses
-            sql = """
-            SELECT c.*, e.enrollment_date, e.status as enrollment_status
-            FROM enrollments e
-            JOIN courses c ON e.course_id = c.id
-            WHERE e.parent_id = %s AND e.status = 'active'
-            """
-            cursor.execute(sql, (parent_id_int,))
+            cursor.execute(USER_ENROLLMENTS_QUERY, (parent_id_int,))
             enrollments = cursor.fetchall()
             
             # Format results
-            formatted_enrollments = []
-            for enrollment in enrollments:
-                # Safely handle time format
-                time_parts = enrollment['time'].split('-') if '-' in enrollment['time'] else ['00:00', '00:00']
-                start_time = time_parts[0].strip() if len(time_parts) > 0 else '00:00'
-                end_time = time_parts[1].strip() if len(time_parts) > 1 else '01:00'
-                
-                formatted_enrollments.append({
-                    'id': str(enrollment['id']),
-                    'title': enrollment['name'],
-                    'start': f"2025-01-16T{start_time}:00",  # 使用课程时间创建事件开始时间
-                    'end': f"2025-01-16T{end_time}:00",    # 使用课程时间创建事件结束时间
-                    'extendedProps': {
-                        'location': enrollment['location'],
-                        'teacher': enrollment['teacher'],
-                        'zoomLink': 'https://zoom.us/j/123456789' if 'Online' in enrollment['location'] else None,
-                        'courseId': str(enrollment['id'])
-                    }
-                })
+            formatted_enrollments = [format_enrollment(enrollment) for enrollment in enrollments]
             
             return jsonify(formatted_enrollments), 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+# 课程的在读学生
+COURSE_STUDENTS_QUERY = """
+SELECT
+    s.id,
+    s.name,
+    s.age,
+    s.parent,
+    s.contact
+FROM
+    students s
+JOIN
+    student_course sc ON s.id = sc.student_id
+WHERE
+    sc.course_id = %s
+    AND sc.status = 'active'
+"""
+
 @app.route('/course-students/<int:course_id>', methods=['GET'])
 def get_course_students(course_id):
     """获取特定课程的学生列表"""
     try:
-        # 连接数据库
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # 获取本次请求的连接池连接
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
             # 查询课程学生
-            sql = """
-            SELECT
-                s.id,
-                s.name,
-                s.age,
-                s.parent,
-                s.contact
-            FROM
-                students s
-            JOIN
-                student_course sc ON s.id = sc.student_id
-            WHERE
-                sc.course_id = %s
-                AND sc.status = 'active'
-            """
-            cursor.execute(sql, (course_id,))
+            cursor.execute(COURSE_STUDENTS_QUERY, (course_id,))
             students = cursor.fetchall()
             
             return jsonify(students), 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+# Records per upsert statement in POST /attendance
+ATTENDANCE_UPSERT_CHUNK_SIZE = 200
+
+# Columns written by POST /attendance, in parse_attendance_records() row order
+ATTENDANCE_COLUMNS = (
+    'date', 'course_id', 'course_name', 'student_id', 'student_name',
+    'status', 'arrival_time', 'leaving_time', 'notes'
+)
+
+def format_attendance(record):
+    """Convert an attendance row to the format the frontend expects"""
+    return {
+        'id': record['id'],
+        'date': record['date'],
+        'course': record['course_name'],
+        'student': record['student_name'],
+        'status': record['status'],
+        'arrivalTime': record['arrival_time'],
+        'leavingTime': record['leaving_time'],
+        'notes': record['notes']
+    }
+
+def build_attendance_query(args):
+    """Build the SELECT for GET /attendance from its query parameters, returning (sql, params)"""
+    # Get query parameters
+    course_id = args.get('courseId')
+    student_id = args.get('studentId')
+    date_from = args.get('dateFrom')
+    date_to = args.get('dateTo')
+    status = args.get('status')
+    
+    # Build query with filters
+    sql = "SELECT * FROM attendance WHERE 1=1"
+    params = []
+    
+    if course_id:
+        sql += " AND course_id = %s"
+        params.append(course_id)
+        
+    if student_id:
+        sql += " AND student_id = %s"
+        params.append(student_id)
+        
+    if date_from:
+        sql += " AND date >= %s"
+        params.append(date_from)
+        
+    if date_to:
+        sql += " AND date <= %s"
+        params.append(date_to)
+        
+    if status:
+        sql += " AND status = %s"
+        params.append(status)
+        
+    # Order by date descending
+    sql += " ORDER BY date DESC"
+    
+    return sql, params
+
 # API endpoint to get attendance records
 @app.route('/attendance', methods=['GET'])
 def get_attendance():
     try:
-        # Get query parameters
-        course_id = request.args.get('courseId')
-        student_id = request.args.get('studentId')
-        date_from = request.args.get('dateFrom')
-        date_to = request.args.get('dateTo')
-        status = request.args.get('status')
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        sql, params = build_attendance_query(request.args)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
-            # Build query with filters
-            sql = "SELECT * FROM attendance WHERE 1=1"
-            params = []
-            
-            if course_id:
-                sql += " AND course_id = %s"
-                params.append(course_id)
-                
-            if student_id:
-                sql += " AND student_id = %s"
-                params.append(student_id)
-                
-            if date_from:
-                sql += " AND date >= %s"
-                params.append(date_from)
-                
-            if date_to:
-                sql += " AND date <= %s"
-                params.append(date_to)
-                
-            if status:
-                sql += " AND status = %s"
-                params.append(status)
-                
-            # Order by date descending
-            sql += " ORDER BY date DESC"
+            stream_format = requested_stream_format()
+            if stream_format:
+                return stream_query(connection, sql, params, format_attendance, stream_format)
             
             # Execute query
             cursor.execute(sql, params)
             records = cursor.fetchall()
             
             # Format records for frontend
-            formatted_records = []
-            for record in records:
-                formatted_records.append({
-                    'id': record['id'],
-                    'date': record['date'].strftime('%Y-%m-%d'),
-                    'course': record['course_name'],
-                    'student': record['student_name'],
-                    'status': record['status'],
-                    'arrivalTime': record['arrival_time'],
-                    'leavingTime': record['leaving_time'],
-                    'notes': record['notes']
-                })
+            formatted_records = [format_attendance(record) for record in records]
                 
             return jsonify(formatted_records), 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+def build_attendance_rate_queries(course_id, student_id, date_from, date_to):
+    """Return [(sql, params)] whose rows are per-course status counts for GET /attendance-rates.
+
+    Without a student the daily rollup covers any range. A student's counts
+    come from the monthly rollup for whole months, and from the attendance
+    rows of that student only for the partial months at either end.
+    """
+    def query(table, sums, ranges):
+        conditions = []
+        params = []
+        if course_id:
+            conditions.append("course_id = %s")
+            params.append(course_id)
+        if student_id:
+            conditions.append("student_id = %s")
+            params.append(student_id)
+        for condition, value in ranges:
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"SELECT course_id, {sums} FROM {table} {where} GROUP BY course_id", params
+    
+    rollup_sums = ', '.join(f"SUM({column}) AS {column}" for column in rollups.ATTENDANCE_TOTALS)
+    if not student_id:
+        return [query('attendance_daily', rollup_sums, [("date >= %s", date_from), ("date <= %s", date_to)])]
+    
+    months, edges = rollups.split_months(date_from, date_to)
+    queries = []
+    if months is not None:
+        queries.append(query('attendance_monthly', rollup_sums,
+                             [("month >= %s", months[0]), ("month < %s", months[1])]))
+    status_sums = ', '.join(
+        f"SUM(CASE WHEN status = '{status}' THEN 1 ELSE 0 END) AS {column}"
+        for status, column in zip(rollups.ATTENDANCE_STATUSES, rollups.ATTENDANCE_TOTALS)
+    )
+    for edge_from, edge_to in edges:
+        queries.append(query('attendance', status_sums, [("date >= %s", edge_from), ("date <= %s", edge_to)]))
+    return queries
+
+# API endpoint to report attendance rates over a date range
+@app.route('/attendance-rates', methods=['GET'])
+def get_attendance_rates():
+    try:
+        course_id = request.args.get('courseId')
+        student_id = request.args.get('studentId')
+        try:
+            date_from = parse_iso_date(request.args.get('dateFrom'), 'dateFrom')
+            date_to = parse_iso_date(request.args.get('dateTo'), 'dateTo')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if date_from and date_to and date_from > date_to:
+            return jsonify({"error": "dateFrom must not be after dateTo"}), 400
+        
+        # Get the pooled connection for this request
+        connection = get_db()
+        cursor = connection.cursor()
+        
+        try:
+            # Rollup rows only, plus at most two partial months of one student's attendance
+            courses = {}
+            for sql, params in build_attendance_rate_queries(course_id, student_id, date_from, date_to):
+                cursor.execute(sql, params)
+                for row in cursor.fetchall():
+                    counts = courses.setdefault(row['course_id'], dict.fromkeys(rollups.ATTENDANCE_TOTALS, 0))
+                    for column in rollups.ATTENDANCE_TOTALS:
+                        counts[column] += int(row[column] or 0)
+            
+            overall = {column: sum(counts[column] for counts in courses.values())
+                       for column in rollups.ATTENDANCE_TOTALS}
+            report = {
+                "dateFrom": date_from.isoformat() if date_from else None,
+                "dateTo": date_to.isoformat() if date_to else None,
+                "courseId": course_id,
+                "studentId": student_id,
+                **rollups.attendance_rates(overall)
+            }
+            if not course_id:
+                report["courses"] = [{"courseId": cid, **rollups.attendance_rates(courses[cid])}
+                                     for cid in sorted(courses)]
+            return jsonify(report), 200
+            
+        except Exception as e:
+            logger.error("Database error: %s", e)
+            return jsonify({"error": f"Database error: {str(e)}"}), 500
+        finally:
+            # Close cursor
+            cursor.close()
+            
+    except Exception as e:
+        logger.error("Server error: %s", e)
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+def parse_attendance_records(data):
+    """Turn a POST /attendance payload into attendance row tuples, raising ValueError if invalid"""
+    # Check if it's a single record or multiple records
+    records = data if isinstance(data, list) else [data]
+    
+    rows = []
+    for record in records:
+        # Extract attendance data
+        date = record.get('date')
+        course_id = record.get('courseId')
+        course_name = record.get('courseName')
+        student_id = record.get('studentId')
+        student_name = record.get('studentName')
+        status = record.get('status')
+        arrival_time = record.get('arrivalTime', '')
+        leaving_time = record.get('leavingTime', '')
+        notes = record.get('notes', '')
+        
+        # Validate required fields
+        if not all([date, course_id, course_name, student_id, student_name, status]):
+            raise ValueError("Missing required fields")
+        if status not in rollups.ATTENDANCE_STATUSES:
+            raise ValueError(f"status must be one of: {', '.join(rollups.ATTENDANCE_STATUSES)}")
+        date = parse_iso_date(date, 'date')
+            
+        rows.append((
+            date, course_id, course_name, student_id, student_name,
+            status, arrival_time, leaving_time, notes
+        ))
+    return rows
+
+def attendance_rollup_rows(rows):
+    """(date, course_id, student_id, status) marks of parsed attendance rows, for the rollups"""
+    return [(row[0], row[1], row[3], row[5]) for row in rows]
+
+def attendance_upsert_statements(rows):
+    """Yield (sql, params) upserting attendance rows in chunks.
+
+    The unique (date, course_id, student_id) key turns repeats into updates,
+    so a whole register is written in a few statements and concurrent
+    submissions for the same class cannot create duplicates.
+    """
+    for chunk_start in range(0, len(rows), ATTENDANCE_UPSERT_CHUNK_SIZE):
+        chunk = rows[chunk_start:chunk_start + ATTENDANCE_UPSERT_CHUNK_SIZE]
+        sql = storage_backend.upsert(
+            'attendance', ATTENDANCE_COLUMNS, ('date', 'course_id', 'student_id'),
+            update_columns=('status', 'arrival_time', 'leaving_time', 'notes'),
+            rows=len(chunk)
+        )
+        yield sql, [value for row in chunk for value in row]
+
 # API endpoint to submit attendance records
 @app.route('/attendance', methods=['POST'])
 def submit_attendance():
@@ -1409,85 +1887,47 @@ def submit_attendance():
         if not data:
             return jsonify({"error": "No data received"}), 400
             
-        # Print received data for debugging
-        print(f"Received attendance data: {data}")
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        try:
+            rows = parse_attendance_records(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        log_payload(f"Received {len(rows)} attendance records", data)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
-            # Check if it's a single record or multiple records
-            records = data if isinstance(data, list) else [data]
-            
-            for record in records:
-                # Extract attendance data
-                date = record.get('date')
-                course_id = record.get('courseId')
-                course_name = record.get('courseName')
-                student_id = record.get('studentId')
-                student_name = record.get('studentName')
-                status = record.get('status')
-                arrival_time = record.get('arrivalTime', '')
-                leaving_time = record.get('leavingTime', '')
-                notes = record.get('notes', '')
-                
-                # Validate required fields
-                if not all([date, course_id, course_name, student_id, student_name, status]):
-                    return jsonify({"error": "Missing required fields"}), 400
-                
-                # Check if record already exists for this student, course and date
-                sql_check = """
-                SELECT id FROM attendance
-                WHERE date = %s AND course_id = %s AND student_id = %s
-                """
-                cursor.execute(sql_check, (date, course_id, student_id))
-                existing = cursor.fetchone()
-                
-                if existing:
-                    # Update existing record
-                    sql = """
-                    UPDATE attendance SET
-                    status = %s, arrival_time = %s, leaving_time = %s, notes = %s
-                    WHERE id = %s
-                    """
-                    cursor.execute(sql, (status, arrival_time, leaving_time, notes, existing['id']))
-                else:
-                    # Insert new record
-                    sql = """
-                    INSERT INTO attendance (
-                        date, course_id, course_name, student_id, student_name,
-                        status, arrival_time, leaving_time, notes
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """
-                    cursor.execute(sql, (
-                        date, course_id, course_name, student_id, student_name,
-                        status, arrival_time, leaving_time, notes
-                    ))
+            # Lock each register's daily rollup row, then read the statuses being replaced
+            registers = rollups.attendance_registers(attendance_rollup_rows(rows))
+            cursor.execute(*rollups.attendance_lock_statement(storage_backend, registers))
+            previous = {}
+            for register, sql, params in rollups.previous_attendance_queries(storage_backend, registers):
+                cursor.execute(sql, params)
+                previous[register] = {row['student_id']: row['status'] for row in cursor.fetchall()}
+            
+            for sql, params in attendance_upsert_statements(rows):
+                cursor.execute(sql, params)
+            
+            # Move the changed marks between the rollup counts read by GET /attendance-rates
+            totals = rollups.attendance_rollup_totals(rollups.attendance_changes(registers, previous))
+            for sql, params in rollups.attendance_rollup_statements(storage_backend, totals):
+                cursor.execute(sql, params)
             
             connection.commit()
             return jsonify({"message": "Attendance records submitted successfully"}), 200
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 # API endpoint to add a grade
@@ -1499,20 +1939,11 @@ def add_grade():
         if not data:
             return jsonify({"error": "No data received"}), 400
             
-        # Print received data for debugging
-        print(f"Received grade data: {data}")
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Log received data for debugging
+        log_payload("Received grade data", data)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -1528,9 +1959,10 @@ def add_grade():
             max_score = data.get('maxScore')
             feedback = data.get('feedback', '')
             
-            # Validate required fields
-            if not all([date, course, course_id, grade_type, title, student, student_id, score, max_score]):
-                return jsonify({"error": "Missing required fields"}), 400
+            # Same checks as POST /grades/batch
+            errors = validate_grade(data)
+            if errors:
+                return jsonify({"error": '; '.join(errors)}), 400
             
             # Insert data into grades table
             sql = """
@@ -1549,6 +1981,11 @@ def add_grade():
             # Get the ID of the inserted grade
             grade_id = cursor.lastrowid
             
+            # Add it to the rollups read by GET /grade-stats and GET /final-grades
+            for sql, params in rollups.grade_rollup_statements(
+                    storage_backend, [(course_id, student_id, grade_type, score, max_score, 1)]):
+                cursor.execute(sql, params)
+            
             connection.commit()
             
             # Return the created grade with ID
@@ -1568,17 +2005,105 @@ def add_grade():
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+# Grade fields that must be present in every grade record, keyed by JSON name
+GRADE_REQUIRED_FIELDS = ('date', 'course', 'courseId', 'type', 'title', 'student', 'studentId', 'score', 'maxScore')
+
+# Rows per multi-row INSERT in POST /grades/batch (override with ?chunkSize=)
+GRADE_BATCH_CHUNK_SIZE = 200
+MAX_GRADE_BATCH_CHUNK_SIZE = 1000
+
+def validate_grade(grade_data):
+    """Return a list of validation errors for one grade record (empty if valid)"""
+    if not isinstance(grade_data, dict):
+        return ["Grade must be an object"]
+    
+    errors = []
+    missing = [field for field in GRADE_REQUIRED_FIELDS if grade_data.get(field) in (None, '')]
+    if missing:
+        errors.append(f"Missing required fields: {', '.join(missing)}")
+    if grade_data.get('type') not in (None, '') and grade_data['type'] not in GRADE_TYPES:
+        errors.append(f"type must be one of: {', '.join(GRADE_TYPES)}")
+    # Integer columns, also read as integers by the grade rollups; a zero
+    # maxScore would record every score as a ratio of 0
+    for field, minimum in (('score', 0), ('maxScore', 1), ('studentId', 0)):
+        value = grade_data.get(field)
+        if value in (None, ''):
+            continue
+        if isinstance(value, str) and value.isascii() and value.isdigit():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+            errors.append(f"{field} must be a {'positive' if minimum else 'non-negative'} integer")
+    return errors
+
+def validate_grade_batch(data):
+    """Return [{"index": i, "errors": [...]}, ...] for every invalid grade in a batch"""
+    validation_errors = []
+    for index, grade_data in enumerate(data):
+        errors = validate_grade(grade_data)
+        if errors:
+            validation_errors.append({"index": index, "errors": errors})
+    return validation_errors
+
+def grade_insert_chunks(data, chunk_size):
+    """Yield (sql, params, rows) inserting validated grades with one multi-row INSERT per chunk"""
+    for chunk_start in range(0, len(data), chunk_size):
+        chunk = data[chunk_start:chunk_start + chunk_size]
+        
+        rows = []
+        for grade_data in chunk:
+            # Extract grade data
+            rows.append((
+                grade_data['date'],
+                grade_data['course'],
+                grade_data['courseId'],
+                grade_data['type'],
+                grade_data['title'],
+                grade_data['student'],
+                grade_data['studentId'],
+                grade_data['score'],
+                grade_data['maxScore'],
+                grade_data.get('feedback', '')
+            ))
+        
+        sql = """
+        INSERT INTO grades (
+            date, course, course_id, type, title, student, student_id,
+            score, max_score, feedback
+        ) VALUES
+        """ + ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+        yield sql, [value for row in rows for value in row], rows
+
+def grade_rollup_rows(data):
+    """(course_id, student_id, type, score, max_score, count) of validated grade records, for rollups"""
+    return [(grade_data['courseId'], grade_data['studentId'], grade_data['type'],
+             grade_data['score'], grade_data['maxScore'], 1) for grade_data in data]
+
+def created_grade(row, grade_id):
+    """Build the response object for an inserted grade row tuple"""
+    return {
+        "id": grade_id,
+        "date": row[0],
+        "course": row[1],
+        "courseId": row[2],
+        "type": row[3],
+        "title": row[4],
+        "student": row[5],
+        "studentId": row[6],
+        "score": row[7],
+        "maxScore": row[8],
+        "feedback": row[9]
+    }
+
 # API endpoint to add multiple grades in batch
 @app.route('/grades/batch', methods=['POST'])
 def add_grades_batch():
@@ -1588,105 +2113,301 @@ def add_grades_batch():
         if not data or not isinstance(data, list):
             return jsonify({"error": "No data received or data is not a list"}), 400
             
-        # Print received data for debugging
-        print(f"Received batch grade data: {data}")
-        
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        log_payload(f"Received batch of {len(data)} grades", data)
+        
+        try:
+            chunk_size = int(request.args.get('chunkSize', GRADE_BATCH_CHUNK_SIZE))
+            if chunk_size < 1:
+                raise ValueError
+        except ValueError:
+            return jsonify({"error": "chunkSize must be a positive integer"}), 400
+        chunk_size = min(chunk_size, MAX_GRADE_BATCH_CHUNK_SIZE)
+        
+        # Validate every row up front; the batch is only written if all rows are valid
+        validation_errors = validate_grade_batch(data)
+        if validation_errors:
+            return jsonify({
+                "error": f"{len(validation_errors)} of {len(data)} grades are invalid, nothing was saved",
+                "invalidRows": validation_errors
+            }), 400
+        
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
+            # A multi-row INSERT assigns consecutive ids to its rows, spaced by
+            # the server's auto_increment_increment
+            id_step = storage_backend.auto_increment_step(cursor)
+            
             created_grades = []
             
-            for grade_data in data:
-                # Extract grade data
-                date = grade_data.get('date')
-                course = grade_data.get('course')
-                course_id = grade_data.get('courseId')
-                grade_type = grade_data.get('type')
-                title = grade_data.get('title')
-                student = grade_data.get('student')
-                student_id = grade_data.get('studentId')
-                score = grade_data.get('score')
-                max_score = grade_data.get('maxScore')
-                feedback = grade_data.get('feedback', '')
-                
-                # Validate required fields
-                if not all([date, course, course_id, grade_type, title, student, student_id, score, max_score]):
-                    continue  # Skip invalid entries
+            for sql, params, rows in grade_insert_chunks(data, chunk_size):
+                # Insert the whole chunk in one statement
+                cursor.execute(sql, params)
                 
-                # Insert data into grades table
-                sql = """
-                INSERT INTO grades (
-                    date, course, course_id, type, title, student, student_id,
-                    score, max_score, feedback
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                )
-                """
-                cursor.execute(sql, (
-                    date, course, course_id, grade_type, title, student, student_id,
-                    score, max_score, feedback
-                ))
-                    
-                # Get the ID of the inserted grade
-                grade_id = cursor.lastrowid
+                first_id = storage_backend.first_insert_id(cursor, len(rows))
                 
-                # Add to created grades list
-                created_grades.append({
-                    "id": grade_id,
-                    "date": date,
-                    "course": course,
-                    "courseId": course_id,
-                    "type": grade_type,
-                    "title": title,
-                    "student": student,
-                    "studentId": student_id,
-                    "score": score,
-                    "maxScore": max_score,
-                    "feedback": feedback
-                })
+                # Add to created grades list, in request order
+                for offset, row in enumerate(rows):
+                    created_grades.append(created_grade(row, first_id + offset * id_step))
+            
+            # Add the whole batch to the grade rollups in a few statements
+            for sql, params in rollups.grade_rollup_statements(storage_backend, grade_rollup_rows(data)):
+                cursor.execute(sql, params)
             
             connection.commit()
             return jsonify(created_grades), 201
             
         except Exception as e:
             connection.rollback()
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+def grade_stats_by_type(rows):
+    """Overall and per-type bucket_stats() of rollup rows with type, bucket, grade_count and ratio_sum"""
+    overall = {}
+    by_type = {}
+    for row in rows:
+        rollups.add_bucket(overall, row['bucket'], row['grade_count'], row['ratio_sum'])
+        rollups.add_bucket(by_type.setdefault(row['type'], {}), row['bucket'], row['grade_count'], row['ratio_sum'])
+    return {
+        'overall': rollups.bucket_stats(overall),
+        'byType': {grade_type: rollups.bucket_stats(by_type[grade_type])
+                   for grade_type in GRADE_TYPES if grade_type in by_type}
+    }
+
+# API endpoint for grade statistics of a course or a student, as percentages of max_score
+@app.route('/grade-stats', methods=['GET'])
+def get_grade_stats():
+    try:
+        course_id = request.args.get('courseId')
+        student_id = request.args.get('studentId')
+        if bool(course_id) == bool(student_id):
+            return jsonify({"error": "Pass exactly one of courseId or studentId"}), 400
+        if student_id and not student_id.isdigit():
+            return jsonify({"error": "studentId must be an integer"}), 400
+        
+        # Get the pooled connection for this request
+        connection = get_db()
+        cursor = connection.cursor()
+        
+        try:
+            # Both reads cover at most 101 buckets per course/student and type,
+            # whatever the number of grades
+            if course_id:
+                cursor.execute("""
+                SELECT type, bucket, grade_count, ratio_sum
+                FROM grade_course_buckets WHERE course_id = %s
+                """, (course_id,))
+                stats = {'courseId': course_id, **grade_stats_by_type(cursor.fetchall())}
+                
+                cursor.execute("""
+                SELECT student_id, bucket, grade_count, ratio_sum
+                FROM grade_student_buckets WHERE course_id = %s
+                """, (course_id,))
+                students = {}
+                for row in cursor.fetchall():
+                    rollups.add_bucket(students.setdefault(row['student_id'], {}),
+                                       row['bucket'], row['grade_count'], row['ratio_sum'])
+                stats['students'] = [{'studentId': sid, **rollups.bucket_stats(students[sid])}
+                                     for sid in sorted(students)]
+            else:
+                cursor.execute("""
+                SELECT course_id, type, bucket, grade_count, ratio_sum
+                FROM grade_student_buckets WHERE student_id = %s
+                """, (int(student_id),))
+                rows = cursor.fetchall()
+                stats = {'studentId': int(student_id), **grade_stats_by_type(rows)}
+                
+                courses = {}
+                for row in rows:
+                    courses.setdefault(row['course_id'], []).append(row)
+                stats['courses'] = [{'courseId': cid, **grade_stats_by_type(courses[cid])}
+                                    for cid in sorted(courses)]
+            
+            return jsonify(stats), 200
+            
+        except Exception as e:
+            logger.error("Database error: %s", e)
+            return jsonify({"error": f"Database error: {str(e)}"}), 500
+        finally:
+            # Close cursor
+            cursor.close()
+            
+    except Exception as e:
+        logger.error("Server error: %s", e)
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+def parse_grade_weights(data):
+    """Validate a {type: weight} body; return (weights, error message or None)"""
+    if not isinstance(data, dict) or not data:
+        return None, "Body must be an object mapping grade types to weights"
+    unknown = [key for key in data if key not in GRADE_TYPES]
+    if unknown:
+        return None, f"Unknown grade types: {', '.join(map(str, unknown))}"
+    weights = {}
+    for grade_type, weight in data.items():
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not 0 <= weight < 100000:
+            return None, f"Weight of {grade_type} must be a number from 0 to 99999"
+        weights[grade_type] = round(weight, 2)
+    if not any(weights.values()):
+        return None, "At least one weight must be positive"
+    return {grade_type: weights.get(grade_type, 0) for grade_type in GRADE_TYPES}, None
+
+def fetch_grade_weights(cursor, course_ids):
+    """Return {course_id: {type: weight}}, using grade_weight_config for courses without weights"""
+    weights = {course_id: None for course_id in course_ids}
+    if weights:
+        placeholders = ', '.join(['%s'] * len(weights))
+        cursor.execute(
+            f"SELECT course_id, type, weight FROM course_grade_weights WHERE course_id IN ({placeholders})",
+            list(weights)
+        )
+        for row in cursor.fetchall():
+            course_weights = weights[row['course_id']] or dict.fromkeys(GRADE_TYPES, 0)
+            course_weights[row['type']] = float(row['weight'])
+            weights[row['course_id']] = course_weights
+    return {course_id: course_weights or dict(grade_weight_config)
+            for course_id, course_weights in weights.items()}
+
+def format_final_grade(row, weights):
+    final, by_type = rollups.final_grade(row, weights)
+    return {
+        "studentId": row['student_id'],
+        "courseId": row['course_id'],
+        "finalGrade": final,
+        "gradeCount": sum(entry['count'] for entry in by_type.values()),
+        "byType": by_type
+    }
+
+# API endpoint to get the grade weights of a course
+@app.route('/grade-weights/<course_id>', methods=['GET'])
+def get_grade_weights(course_id):
+    try:
+        # Get the pooled connection for this request
+        connection = get_db()
+        cursor = connection.cursor()
+        
+        try:
+            cursor.execute("SELECT COUNT(*) AS weight_count FROM course_grade_weights WHERE course_id = %s", (course_id,))
+            is_default = cursor.fetchone()['weight_count'] == 0
+            return jsonify({
+                "courseId": course_id,
+                "weights": fetch_grade_weights(cursor, [course_id])[course_id],
+                "isDefault": is_default
+            }), 200
+            
+        except Exception as e:
+            logger.error("Database error: %s", e)
+            return jsonify({"error": f"Database error: {str(e)}"}), 500
+        finally:
+            # Close cursor
+            cursor.close()
+            
+    except Exception as e:
+        logger.error("Server error: %s", e)
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+# API endpoint to set the grade weights of a course; types left out weigh 0
+@app.route('/grade-weights/<course_id>', methods=['PUT'])
+def set_grade_weights(course_id):
+    try:
+        weights, error = parse_grade_weights(request.get_json(silent=True))
+        if error:
+            return jsonify({"error": error}), 400
+        log_payload("Received grade weights", weights)
+        
+        # Get the pooled connection for this request
+        connection = get_db()
+        cursor = connection.cursor()
+        
+        try:
+            # Final grades are weighted when read, so no totals need updating
+            cursor.executemany(
+                storage_backend.upsert('course_grade_weights', ('course_id', 'type', 'weight'),
+                                       ('course_id', 'type'), update_columns=('weight',)),
+                [(course_id, grade_type, weight) for grade_type, weight in weights.items()]
+            )
+            connection.commit()
+            return jsonify({"courseId": course_id, "weights": weights, "isDefault": False}), 200
+            
+        except Exception as e:
+            connection.rollback()
+            logger.error("Database error: %s", e)
+            return jsonify({"error": f"Database error: {str(e)}"}), 500
+        finally:
+            # Close cursor
+            cursor.close()
+            
+    except Exception as e:
+        logger.error("Server error: %s", e)
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+# API endpoint to get weighted final grades by student, by course, or both
+@app.route('/final-grades', methods=['GET'])
+def get_final_grades():
+    try:
+        course_id = request.args.get('courseId')
+        student_id = request.args.get('studentId')
+        if not course_id and not student_id:
+            return jsonify({"error": "Pass studentId, courseId or both"}), 400
+        if student_id and not student_id.isdigit():
+            return jsonify({"error": "studentId must be an integer"}), 400
+        
+        # Get the pooled connection for this request
+        connection = get_db()
+        cursor = connection.cursor()
+        
+        try:
+            # One primary key row per student and course, whatever the number of grades
+            conditions = []
+            params = []
+            if student_id:
+                conditions.append("student_id = %s")
+                params.append(int(student_id))
+            if course_id:
+                conditions.append("course_id = %s")
+                params.append(course_id)
+            cursor.execute(
+                f"SELECT * FROM student_grade_totals WHERE {' AND '.join(conditions)} "
+                f"ORDER BY {'course_id' if student_id else 'student_id'}",
+                params
+            )
+            rows = cursor.fetchall()
+            weights = fetch_grade_weights(cursor, sorted({row['course_id'] for row in rows}))
+            final_grades = [format_final_grade(row, weights[row['course_id']]) for row in rows]
+            
+            if student_id:
+                return jsonify({"studentId": int(student_id), "courses": final_grades}), 200
+            return jsonify({"courseId": course_id, "students": final_grades}), 200
+            
+        except Exception as e:
+            logger.error("Database error: %s", e)
+            return jsonify({"error": f"Database error: {str(e)}"}), 500
+        finally:
+            # Close cursor
+            cursor.close()
+            
+    except Exception as e:
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 # API endpoint to get student grade levels (renamed from the original get_grades)
 @app.route('/student-grade-levels', methods=['GET'])
+@versioned('students')
+@cached('students')
 def get_student_grade_levels():
     try:
-        # Connect to database
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        # Get the pooled connection for this request
+        connection = get_db()
         cursor = connection.cursor()
         
         try:
@@ -1705,18 +2426,42 @@ def get_student_grade_levels():
             return jsonify(grades), 200
             
         except Exception as e:
-            print(f"Database error: {str(e)}")
+            logger.error("Database error: %s", e)
             return jsonify({"error": f"Database error: {str(e)}"}), 500
         finally:
-            # Close connection
+            # Close cursor
             cursor.close()
-            connection.close()
             
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.error("Server error: %s", e)
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss/eviction counters of this process's query result cache"""
+    return jsonify(query_cache.stats()), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, query and pool metrics in the Prometheus text format, summed over gunicorn workers"""
+    return metrics.render()
+
+@app.route('/health/ready', methods=['GET'])
+def readiness():
+    """Ready once a pooled connection answers a query; polled by start.py and load balancers"""
+    try:
+        cursor = get_db().cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        finally:
+            cursor.close()
+    except Exception as e:
+        return jsonify({"status": "unavailable", "error": str(e)}), 503
+    return jsonify({"status": "ready"}), 200
+
 if __name__ == '__main__':
     # Initialize database tables
-    init_db()
+    with app.app_context():
+        init_db()
     app.run(port=9999, debug=True, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,641 @@
+"""Asyncio serving mode.
+
+Serves the high-traffic routes (grades, attendance, enrollment, courses)
+natively on an async MySQL pool, and hands every other route to the Flask
+app in app.py. Queries, validation and response formatting are shared with
+app.py, so the JSON contracts are identical in both modes.
+
+Run with:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 9999
+"""
+import asyncio
+import contextlib
+import time
+
+import aiomysql
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+import app as flask_module
+from app import (
+    BUMP_TABLE_VERSION_SQL, COURSES_QUERY, COURSE_STUDENTS_QUERY, ENROLL_NEW_STUDENT_SQL,
+    ENROLL_STUDENT_COURSE_SQL, GRADE_BATCH_CHUNK_SIZE, MAX_GRADE_BATCH_CHUNK_SIZE,
+    STREAM_BATCH_SIZE, USER_ENROLLMENTS_QUERY, attendance_rollup_rows, attendance_upsert_statements,
+    build_attendance_query, build_grades_query, created_grade, db_config, format_attendance,
+    format_course, format_enrollment, format_grade, grade_insert_chunks, grade_rollup_rows,
+    new_student_params, parse_attendance_records, pool_config, query_cache, split_grades_page,
+    storage_backend, validate_grade, validate_grade_batch, version_etag
+)
+from db import PoolTimeout
+from log import log_payload, logger
+import rollups
+
+flask_app = flask_module.app
+
+if storage_backend.name != 'mysql':
+    # The native routes run on aiomysql and the shared SQL is rendered for MySQL
+    raise RuntimeError("The asyncio serving mode needs the MySQL storage backend")
+
+# Sent on every natively served response, matching flask-cors in app.py
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Expose-Headers': 'X-Next-Cursor'
+}
+
+
+class AsyncConnectionPool:
+    """aiomysql pool with the same settings and checkout rules as db.ConnectionPool.
+
+    aiomysql recycles connections idle longer than ``idle_timeout``; this
+    wrapper also retires connections older than ``max_lifetime``, pings on
+    checkout when ``pre_ping`` is set, and raises PoolTimeout when no
+    connection is free within ``checkout_timeout`` seconds.
+    """
+
+    def __init__(self, db_config, max_size=10, pre_ping=True, idle_timeout=300,
+                 max_lifetime=3600, checkout_timeout=10):
+        self.db_config = db_config
+        self.max_size = max_size
+        self.pre_ping = pre_ping
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+
+        self._pool = None
+
+    async def start(self):
+        self._pool = await aiomysql.create_pool(
+            host=self.db_config['host'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            port=self.db_config['port'],
+            db=self.db_config['database'],
+            charset='utf8mb4',
+            cursorclass=aiomysql.DictCursor,
+            autocommit=False,
+            minsize=0,
+            maxsize=self.max_size,
+            pool_recycle=self.idle_timeout or -1
+        )
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    def _discard(self, connection):
+        connection.close()
+        self._pool.release(connection)
+
+    async def acquire(self):
+        """Check out a connection, waiting up to checkout_timeout seconds."""
+        deadline = time.monotonic() + self.checkout_timeout
+
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                connection = await asyncio.wait_for(self._pool.acquire(), max(remaining, 0))
+            except asyncio.TimeoutError:
+                raise PoolTimeout(
+                    f"Could not get a database connection within {self.checkout_timeout}s "
+                    f"(pool size {self.max_size})"
+                )
+
+            # Stored on the connection, so it goes away with connections aiomysql recycles itself
+            now = time.monotonic()
+            if not hasattr(connection, '_pool_created_at'):
+                connection._pool_created_at = now
+            if self.max_lifetime and now - connection._pool_created_at > self.max_lifetime:
+                self._discard(connection)
+                continue
+
+            if self.pre_ping:
+                try:
+                    await connection.ping(reconnect=False)
+                except Exception:
+                    self._discard(connection)
+                    continue
+
+            return connection
+
+    async def release(self, connection):
+        """Return a connection to the pool, rolling back any open transaction."""
+        try:
+            await connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+        self._pool.release(connection)
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        connection = await self.acquire()
+        try:
+            yield connection
+        finally:
+            await self.release(connection)
+
+
+db_pool = AsyncConnectionPool(db_config, **pool_config)
+
+
+def dump_json(data):
+    """Serialize exactly like Flask's jsonify outside debug mode"""
+    return flask_app.json.dumps(data, separators=(',', ':')) + '\n'
+
+
+def json_response(data, status=200, headers=None):
+    response = Response(dump_json(data), status_code=status,
+                        media_type='application/json', headers=headers)
+    response.headers.update(CORS_HEADERS)
+    return response
+
+
+def database_error(e):
+    logger.error("Database error: %s", e)
+    return json_response({"error": f"Database error: {str(e)}"}, 500)
+
+
+def api_route(handler):
+    """Turn anything a handler lets escape into the same 500 body the Flask routes use"""
+    async def wrapper(request):
+        try:
+            return await handler(request)
+        except Exception as e:
+            logger.error("Server error: %s", e)
+            return json_response({"error": f"Server error: {str(e)}"}, 500)
+    wrapper.__name__ = handler.__name__
+    return wrapper
+
+
+async def read_json(request):
+    """Request body as JSON, or None if it is empty or malformed"""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def full_path(request):
+    """Path and query string in the form of Flask's request.full_path"""
+    return f"{request.url.path}?{request.url.query}"
+
+
+def requested_stream_format(request):
+    """Return 'ndjson' or 'json' when the client asked for a streamed list, else None"""
+    accept = parse_accept_header(request.headers.get('accept'), MIMEAccept)
+    if accept.best == 'application/x-ndjson':
+        return 'ndjson'
+    if request.query_params.get('stream') in ('1', 'true'):
+        return 'json'
+    return None
+
+
+async def fetch_all(connection, sql, params=None):
+    async with connection.cursor() as cursor:
+        await cursor.execute(sql, params)
+        return await cursor.fetchall()
+
+
+async def commit_changes(connection, cursor, *tables):
+    """Commit a write, bumping table versions and evicting cached results like app.commit_changes"""
+    await cursor.executemany(BUMP_TABLE_VERSION_SQL, [(table, 1) for table in tables])
+    await connection.commit()
+    query_cache.invalidate(*tables)
+
+
+async def stream_query(sql, params, format_row, stream_format):
+    """Stream query results as NDJSON or a chunked JSON array from a server-side cursor.
+
+    The connection is held until the last row is sent. The query is executed
+    before returning, so SQL errors still surface as a normal 500.
+    """
+    connection = await db_pool.acquire()
+    try:
+        cursor = await connection.cursor(aiomysql.SSDictCursor)
+        await cursor.execute(sql, params)
+    except Exception:
+        await db_pool.release(connection)
+        raise
+
+    async def generate():
+        try:
+            first = True
+            if stream_format == 'json':
+                yield '['
+            while True:
+                rows = await cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                if stream_format == 'ndjson':
+                    yield ''.join(flask_app.json.dumps(format_row(row)) + '\n' for row in rows)
+                else:
+                    chunk = ','.join(flask_app.json.dumps(format_row(row)) for row in rows)
+                    yield chunk if first else ',' + chunk
+                first = False
+            if stream_format == 'json':
+                yield ']'
+        finally:
+            await cursor.close()
+            await db_pool.release(connection)
+
+    media_type = 'application/x-ndjson' if stream_format == 'ndjson' else 'application/json'
+    return StreamingResponse(generate(), media_type=media_type, headers=CORS_HEADERS)
+
+
+async def versioned_cached(request, tables, load):
+    """Async counterpart of app.py's @versioned and @cached decorators.
+
+    Uses the same ETags and the same query_cache keys, so a cached body is
+    shared with Flask routes in this process. ``load(connection)`` returns
+    the data to serialize on a cache miss.
+    """
+    path = full_path(request)
+    async with db_pool.connection() as connection:
+        etag = None
+        try:
+            rows = await fetch_all(
+                connection,
+                f"SELECT table_name, version FROM table_versions WHERE table_name IN ({', '.join(['%s'] * len(tables))})",
+                list(tables)
+            )
+            versions = {table: 0 for table in tables}
+            versions.update({row['table_name']: row['version'] for row in rows})
+            # As in app.versioned: never serve a body cached before these counters moved
+            query_cache.observe_versions(versions)
+            etag = version_etag(path, tables, versions)
+        except Exception as e:
+            # Serve without an ETag if the counters cannot be read
+            logger.warning("Table version lookup failed: %s", e)
+
+        cache_headers = {'ETag': quote_etag(etag, weak=True), 'Cache-Control': 'no-cache'} if etag else {}
+        if etag and parse_etags(request.headers.get('if-none-match')).contains_weak(etag):
+            return Response(status_code=304, headers={**cache_headers, **CORS_HEADERS})
+
+        if query_cache.poll_due():
+            try:
+                rows = await fetch_all(connection, "SELECT table_name, version FROM table_versions")
+                query_cache.apply_versions({row['table_name']: row['version'] for row in rows})
+            except Exception as e:
+                logger.warning("Table version poll failed: %s", e)
+                query_cache.clear()
+
+        cache_key = ('route', path)
+        entry = query_cache.get(cache_key)
+        if entry is None:
+            try:
+                data = await load(connection)
+            except Exception as e:
+                return database_error(e)
+            body = dump_json(data).encode('utf-8')
+            entry = (body, 'application/json')
+            query_cache.set(cache_key, entry, tags=tables, size=len(body))
+
+        body, media_type = entry
+        response = Response(body, media_type=media_type, headers=cache_headers)
+        response.headers.update(CORS_HEADERS)
+        return response
+
+
+@api_route
+async def get_courses(request):
+    async def load(connection):
+        return [format_course(course) for course in await fetch_all(connection, COURSES_QUERY)]
+    return await versioned_cached(request, ('courses', 'student_course'), load)
+
+
+@api_route
+async def get_course_names(request):
+    async def load(connection):
+        rows = await fetch_all(connection, "SELECT id, name FROM courses")
+        return [{'id': str(course['id']), 'name': course['name']} for course in rows]
+    return await versioned_cached(request, ('courses',), load)
+
+
+@api_route
+async def get_grades(request):
+    try:
+        sql, params, page_size, sort = build_grades_query(request.query_params)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    # Streaming applies to unpaginated requests only, as in app.get_grades
+    stream_format = requested_stream_format(request)
+    if stream_format and not page_size:
+        try:
+            return await stream_query(sql, params, format_grade, stream_format)
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            return database_error(e)
+
+    if page_size:
+        # Fetch one extra row to know whether another page follows
+        sql += " LIMIT %s"
+        params.append(page_size + 1)
+
+    async with db_pool.connection() as connection:
+        try:
+            grades_data = await fetch_all(connection, sql, params)
+        except Exception as e:
+            return database_error(e)
+
+    grades_data, next_cursor = split_grades_page(grades_data, page_size, sort)
+    headers = {'X-Next-Cursor': next_cursor} if next_cursor else None
+    return json_response([format_grade(grade) for grade in grades_data], headers=headers)
+
+
+@api_route
+async def add_grade(request):
+    data = await read_json(request)
+    if not data:
+        return json_response({"error": "No data received"}, 400)
+
+    log_payload("Received grade data", data, route='add_grade')
+
+    date = data.get('date')
+    course = data.get('course')
+    course_id = data.get('courseId')
+    grade_type = data.get('type')
+    title = data.get('title')
+    student = data.get('student')
+    student_id = data.get('studentId')
+    score = data.get('score')
+    max_score = data.get('maxScore')
+    feedback = data.get('feedback', '')
+
+    # Same checks as the Flask route and POST /grades/batch
+    errors = validate_grade(data)
+    if errors:
+        return json_response({"error": '; '.join(errors)}, 400)
+
+    async with db_pool.connection() as connection:
+        try:
+            async with connection.cursor() as cursor:
+                await cursor.execute("""
+                INSERT INTO grades (
+                    date, course, course_id, type, title, student, student_id,
+                    score, max_score, feedback
+                ) VALUES (
+                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                )
+                """, (
+                    date, course, course_id, grade_type, title, student, student_id,
+                    score, max_score, feedback
+                ))
+                grade_id = cursor.lastrowid
+                for sql, params in rollups.grade_rollup_statements(
+                        storage_backend, [(course_id, student_id, grade_type, score, max_score, 1)]):
+                    await cursor.execute(sql, params)
+            await connection.commit()
+        except Exception as e:
+            return database_error(e)
+
+    return json_response({
+        "id": grade_id,
+        "date": date,
+        "course": course,
+        "courseId": course_id,
+        "type": grade_type,
+        "title": title,
+        "student": student,
+        "studentId": student_id,
+        "score": score,
+        "maxScore": max_score,
+        "feedback": feedback
+    }, 201)
+
+
+@api_route
+async def add_grades_batch(request):
+    data = await read_json(request)
+    if not data or not isinstance(data, list):
+        return json_response({"error": "No data received or data is not a list"}, 400)
+
+    log_payload(f"Received batch of {len(data)} grades", data, route='add_grades_batch')
+
+    try:
+        chunk_size = int(request.query_params.get('chunkSize', GRADE_BATCH_CHUNK_SIZE))
+        if chunk_size < 1:
+            raise ValueError
+    except ValueError:
+        return json_response({"error": "chunkSize must be a positive integer"}, 400)
+    chunk_size = min(chunk_size, MAX_GRADE_BATCH_CHUNK_SIZE)
+
+    validation_errors = validate_grade_batch(data)
+    if validation_errors:
+        return json_response({
+            "error": f"{len(validation_errors)} of {len(data)} grades are invalid, nothing was saved",
+            "invalidRows": validation_errors
+        }, 400)
+
+    async with db_pool.connection() as connection:
+        try:
+            created_grades = []
+            async with connection.cursor() as cursor:
+                await cursor.execute("SELECT @@auto_increment_increment AS step")
+                id_step = (await cursor.fetchone())['step']
+
+                for sql, params, rows in grade_insert_chunks(data, chunk_size):
+                    await cursor.execute(sql, params)
+                    # lastrowid is the id of the first row in the chunk
+                    first_id = cursor.lastrowid
+                    for offset, row in enumerate(rows):
+                        created_grades.append(created_grade(row, first_id + offset * id_step))
+                for sql, params in rollups.grade_rollup_statements(storage_backend, grade_rollup_rows(data)):
+                    await cursor.execute(sql, params)
+            await connection.commit()
+        except Exception as e:
+            return database_error(e)
+
+    return json_response(created_grades, 201)
+
+
+@api_route
+async def get_attendance(request):
+    sql, params = build_attendance_query(request.query_params)
+
+    stream_format = requested_stream_format(request)
+    if stream_format:
+        try:
+            return await stream_query(sql, params, format_attendance, stream_format)
+        except PoolTimeout:
+            raise
+        except Exception as e:
+            return database_error(e)
+
+    async with db_pool.connection() as connection:
+        try:
+            records = await fetch_all(connection, sql, params)
+        except Exception as e:
+            return database_error(e)
+
+    return json_response([format_attendance(record) for record in records])
+
+
+@api_route
+async def submit_attendance(request):
+    data = await read_json(request)
+    if not data:
+        return json_response({"error": "No data received"}, 400)
+
+    try:
+        rows = parse_attendance_records(data)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    log_payload(f"Received {len(rows)} attendance records", data, route='submit_attendance')
+
+    async with db_pool.connection() as connection:
+        try:
+            async with connection.cursor() as cursor:
+                registers = rollups.attendance_registers(attendance_rollup_rows(rows))
+                await cursor.execute(*rollups.attendance_lock_statement(storage_backend, registers))
+                previous = {}
+                for register, sql, params in rollups.previous_attendance_queries(storage_backend, registers):
+                    await cursor.execute(sql, params)
+                    previous[register] = {row['student_id']: row['status'] for row in await cursor.fetchall()}
+                for sql, params in attendance_upsert_statements(rows):
+                    await cursor.execute(sql, params)
+                totals = rollups.attendance_rollup_totals(rollups.attendance_changes(registers, previous))
+                for sql, params in rollups.attendance_rollup_statements(storage_backend, totals):
+                    await cursor.execute(sql, params)
+            await connection.commit()
+        except Exception as e:
+            return database_error(e)
+
+    return json_response({"message": "Attendance records submitted successfully"})
+
+
+@api_route
+async def enroll_course(request):
+    data = await read_json(request)
+    if not data:
+        return json_response({"error": "No data received"}, 400)
+
+    course_id = data.get('courseId')
+    parent_id = data.get('parentId')
+    student_id = data.get('studentId')
+
+    if not course_id or not parent_id:
+        return json_response({"error": "Incorrect data format, missing courseId or parentId"}, 400)
+
+    logger.info("Enrollment request - Course ID: %s, Parent ID: %s, Student ID: %s", course_id, parent_id, student_id)
+
+    async with db_pool.connection() as connection:
+        try:
+            async with connection.cursor() as cursor:
+                await cursor.execute("SELECT * FROM courses WHERE id = %s", (course_id,))
+                course = await cursor.fetchone()
+                if not course:
+                    return json_response({"error": "Course does not exist"}, 404)
+
+                await cursor.execute("SELECT COUNT(*) as count FROM student_course WHERE course_id = %s AND status = 'active'", (course_id,))
+                enrolled_count = (await cursor.fetchone())['count']
+                if enrolled_count >= course['max_students']:
+                    return json_response({"error": "Course is full"}, 400)
+
+                await cursor.execute("SELECT * FROM enrollments WHERE course_id = %s AND parent_id = %s",
+                                     (course_id, parent_id))
+                if await cursor.fetchone():
+                    return json_response({"error": "You have already enrolled in this course"}, 400)
+
+                try:
+                    parent_id_int = int(parent_id)
+                    course_id_int = int(course_id)
+                except ValueError:
+                    return json_response({"error": "parentId and courseId must be integers"}, 400)
+
+                # Without a student id, create the student from the parent's child details
+                if not student_id:
+                    await cursor.execute("SELECT * FROM parent WHERE id = %s", (parent_id_int,))
+                    parent = await cursor.fetchone()
+                    if not parent:
+                        return json_response({"error": "Parent not found"}, 404)
+
+                    await cursor.execute(ENROLL_NEW_STUDENT_SQL, new_student_params(parent, course))
+                    student_id = cursor.lastrowid
+                else:
+                    try:
+                        student_id = int(student_id)
+                    except ValueError:
+                        return json_response({"error": "studentId must be an integer"}, 400)
+
+                await cursor.execute("INSERT INTO enrollments (course_id, parent_id, student_id) VALUES (%s, %s, %s)",
+                                     (course_id_int, parent_id_int, student_id))
+                await cursor.execute(ENROLL_STUDENT_COURSE_SQL, (student_id, course_id_int))
+
+                await commit_changes(connection, cursor, 'students', 'enrollments', 'student_course')
+        except Exception as e:
+            return database_error(e)
+
+    return json_response({
+        "message": "Enrollment successful",
+        "studentId": student_id
+    })
+
+
+@api_route
+async def get_user_enrollments(request):
+    parent_id = request.query_params.get('parentId')
+    if not parent_id:
+        return json_response({"error": "Missing parentId parameter"}, 400)
+
+    try:
+        parent_id_int = int(parent_id)
+    except ValueError:
+        return json_response({"error": "parentId must be an integer"}, 400)
+
+    async with db_pool.connection() as connection:
+        try:
+            enrollments = await fetch_all(connection, USER_ENROLLMENTS_QUERY, (parent_id_int,))
+        except Exception as e:
+            return database_error(e)
+
+    return json_response([format_enrollment(enrollment) for enrollment in enrollments])
+
+
+@api_route
+async def get_course_students(request):
+    course_id = request.path_params['course_id']
+    async with db_pool.connection() as connection:
+        try:
+            students = await fetch_all(connection, COURSE_STUDENTS_QUERY, (course_id,))
+        except Exception as e:
+            return database_error(e)
+
+    return json_response(students)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await db_pool.start()
+    try:
+        yield
+    finally:
+        await db_pool.close()
+
+
+# Routes not listed here, and other methods on these paths (including CORS
+# preflight OPTIONS), fall through to the Flask app
+routes = [
+    Route('/courses', get_courses, methods=['GET']),
+    Route('/course-names', get_course_names, methods=['GET']),
+    Route('/grades', get_grades, methods=['GET']),
+    Route('/grades', add_grade, methods=['POST']),
+    Route('/grades/batch', add_grades_batch, methods=['POST']),
+    Route('/attendance', get_attendance, methods=['GET']),
+    Route('/attendance', submit_attendance, methods=['POST']),
+    Route('/enroll', enroll_course, methods=['POST']),
+    Route('/user-enrollments', get_user_enrollments, methods=['GET']),
+    Route('/course-students/{course_id:int}', get_course_students, methods=['GET']),
+    Mount('/', app=WSGIMiddleware(flask_app))
+]
+
+app = Starlette(routes=routes, lifespan=lifespan)
@@ -0,0 +1,140 @@
+"""Micro-benchmark of JSON serialization for large list responses.
+
+Builds rows shaped like the ones the database cursor returns (dates as
+``date``, timestamps as ``datetime``, DECIMAL columns as ``Decimal``) and
+times formatting plus encoding of one response body:
+
+- ``baseline``: per-row strftime/str formatting and Flask's default
+  provider, the path before encoders.py
+- every provider in encoders.PROVIDERS, with dates and decimals passed
+  through unformatted
+
+    python bench_json.py
+    python bench_json.py --rows 100000 --repeat 7 --payload grades
+
+Each body is parsed back and compared with the baseline; the script exits
+with status 1 if any encoder's output differs.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+import encoders
+from app import app, format_attendance, format_grade
+
+GRADE_TYPES = ('quiz', 'exam', 'assignment', 'homework')
+ATTENDANCE_STATUSES = ('present', 'absent', 'late')
+TERM_START = date(2025, 1, 6)
+
+
+def grade_rows(count, rng):
+    for row_id in range(1, count + 1):
+        max_score = rng.choice((10, 20, 50, 100))
+        yield {
+            'id': row_id, 'date': TERM_START + timedelta(days=rng.randrange(120)),
+            'course': 'Phonics Foundation', 'course_id': f"course-{rng.randrange(60)}",
+            'type': rng.choice(GRADE_TYPES), 'title': f"Week {rng.randrange(1, 16)} Quiz",
+            'student': 'Emily Wong', 'student_id': rng.randrange(1, 10000),
+            'score': rng.randrange(max_score + 1), 'max_score': max_score, 'feedback': 'Good work'
+        }
+
+
+def attendance_rows(count, rng):
+    for row_id in range(1, count + 1):
+        yield {
+            'id': row_id, 'date': TERM_START + timedelta(days=rng.randrange(120)),
+            'course_name': 'Young Readers', 'student_name': 'Thomas Chan',
+            'status': rng.choice(ATTENDANCE_STATUSES), 'arrival_time': '10:00',
+            'leaving_time': '11:00', 'notes': ''
+        }
+
+
+def weight_rows(count, rng):
+    """Rows with a timestamp and a DECIMAL column, as read from course_grade_weights"""
+    for row_id in range(1, count + 1):
+        yield {
+            'courseId': f"course-{row_id}", 'type': rng.choice(GRADE_TYPES),
+            'weight': Decimal(rng.randrange(1, 10000)) / 100,
+            'updatedAt': datetime(2025, 1, 6) + timedelta(seconds=rng.randrange(10 ** 7))
+        }
+
+
+def baseline_grade(grade):
+    formatted = format_grade(grade)
+    formatted['date'] = grade['date'].strftime('%Y-%m-%d')
+    return formatted
+
+
+def baseline_attendance(record):
+    formatted = format_attendance(record)
+    formatted['date'] = record['date'].strftime('%Y-%m-%d')
+    return formatted
+
+
+def baseline_weight(row):
+    return {**row, 'weight': str(row['weight']), 'updatedAt': row['updatedAt'].isoformat()}
+
+
+# Payload name: (row generator, baseline formatter, formatter for the providers)
+PAYLOADS = {
+    'grades': (grade_rows, baseline_grade, format_grade),
+    'attendance': (attendance_rows, baseline_attendance, format_attendance),
+    'weights': (weight_rows, baseline_weight, dict)
+}
+
+
+def encode(provider, format_row, rows):
+    return provider.response([format_row(row) for row in rows]).get_data()
+
+
+def measure(provider, format_row, rows, repeat):
+    """Median seconds to format and encode rows, and the last body"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode(provider, format_row, rows)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON encoders on large list responses')
+    parser.add_argument('--rows', type=int, default=100000, help='rows per response')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per encoder; the median is reported')
+    parser.add_argument('--payload', choices=PAYLOADS, action='append', help='payloads to run (default: all)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    baseline = DefaultJSONProvider(app)
+    providers = {name: provider(app) for name, provider in encoders.PROVIDERS.items()}
+    if encoders.orjson is None:
+        del providers['orjson']
+        print("orjson is not installed, skipping it")
+
+    mismatches = 0
+    with app.app_context():
+        for payload in args.payload or PAYLOADS:
+            make_rows, baseline_format, format_row = PAYLOADS[payload]
+            rows = list(make_rows(args.rows, random.Random(args.seed)))
+            base_seconds, base_body = measure(baseline, baseline_format, rows, args.repeat)
+            expected = json.loads(base_body)
+            print(f"{payload}: {args.rows} rows, {len(base_body) / 1e6:.1f} MB")
+            print(f"  {'baseline':<10} {base_seconds * 1000:8.1f} ms")
+            for name, provider in providers.items():
+                seconds, body = measure(provider, format_row, rows, args.repeat)
+                same = json.loads(body) == expected
+                mismatches += not same
+                print(f"  {name:<10} {seconds * 1000:8.1f} ms  {base_seconds / seconds:5.2f}x"
+                      f"{'' if same else '  OUTPUT DIFFERS'}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
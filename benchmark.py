@@ -0,0 +1,466 @@
+"""Load-testing benchmark for every HTTP route in app.py.
+
+Drives a running backend with a weighted read/write mix from concurrent
+worker threads and writes throughput, latency percentiles and error rates,
+overall and per route, as JSON. Two result files can be compared to catch
+regressions.
+
+    python benchmark.py run --concurrency 16 --duration 30 --write-ratio 0.2 --output base.json
+    python benchmark.py run ... --output new.json
+    python benchmark.py diff base.json new.json --threshold 10
+
+Only the standard library is used. Rows created by a run are named with a
+"bench-<run id>" prefix.
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+
+class Client:
+    """Keep-alive HTTP client for one worker thread."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        """Send a request and return (status, parsed JSON body or None)"""
+        headers = {'Accept': 'application/json'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.close()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; retry once on a new one
+                self.close()
+                if attempt == 2:
+                    raise
+        try:
+            parsed = json.loads(data) if data else None
+        except ValueError:
+            parsed = None
+        return response.status, parsed
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Fixtures:
+    """Ids and credentials the operations draw on, discovered or created before the run."""
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.course_ids = []
+        self.courses = {}
+        self.student_ids = []
+        self.parent_id = None
+        self.parent_email = None
+        self.parent_password = 'bench-password'
+        self.deletable = {'students': [], 'courses': [], 'teachers': []}
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def unique(self, prefix):
+        with self._lock:
+            self._counter += 1
+            return f"bench-{self.run_id}-{prefix}-{self._counter}"
+
+    def pop_deletable(self, kind):
+        with self._lock:
+            items = self.deletable[kind]
+            return items.pop() if items else None
+
+
+def student_payload(fixtures, rng):
+    name = fixtures.unique('student')
+    return {
+        'firstName': name, 'lastName': 'Student',
+        'dateOfBirth': (date(2014, 1, 1) + timedelta(days=rng.randrange(2000))).isoformat(),
+        'idNumber': name, 'idType': 'passport', 'grade': f"Grade {rng.randint(1, 6)}",
+        'location': rng.choice(['Central', 'Kowloon', 'Online']),
+        'courses': rng.sample(fixtures.course_ids, min(2, len(fixtures.course_ids))),
+        'parentName': 'Bench Parent', 'parentEmail': f"{name}@example.com",
+        'parentPhone': '12345678', 'parentIdNumber': name, 'parentIdType': 'passport',
+        'address': '1 Bench Road', 'emergencyContact': '87654321', 'medicalInfo': '', 'notes': ''
+    }
+
+
+def course_payload(fixtures, rng):
+    return {
+        'name': fixtures.unique('course'), 'level': 'Beginner', 'ageRange': '6-8',
+        'location': rng.choice(['Central', 'Kowloon', 'Online']), 'schedule': 'Mon',
+        'time': '10:00-11:00', 'teacher': None, 'maxStudents': 20, 'fee': 100,
+        'description': 'Benchmark course'
+    }
+
+
+def teacher_payload(fixtures, rng):
+    name = fixtures.unique('teacher')
+    return {
+        'firstName': name, 'lastName': 'Teacher', 'email': f"{name}@example.com",
+        'phone': '12345678', 'idNumber': name, 'idType': 'passport', 'location': 'Central',
+        'courses': [], 'qualifications': 'BEd', 'experience': '3 years',
+        'joinDate': '2024-01-01', 'languages': 'English', 'bio': ''
+    }
+
+
+def grade_payload(fixtures, rng):
+    course_id = rng.choice(fixtures.course_ids)
+    student_id = rng.choice(fixtures.student_ids) if fixtures.student_ids else 1
+    return {
+        'date': (date(2025, 1, 1) + timedelta(days=rng.randrange(365))).isoformat(),
+        'course': fixtures.courses[course_id], 'courseId': course_id,
+        'type': rng.choice(['quiz', 'exam', 'assignment', 'homework']),
+        'title': 'Benchmark', 'student': f"Student {student_id}", 'studentId': student_id,
+        'score': rng.randint(0, 100), 'maxScore': 100, 'feedback': ''
+    }
+
+
+def attendance_payload(fixtures, rng, size=20):
+    course_id = rng.choice(fixtures.course_ids)
+    day = (date(2025, 1, 1) + timedelta(days=rng.randrange(365))).isoformat()
+    students = rng.sample(fixtures.student_ids, min(size, len(fixtures.student_ids))) or [1]
+    return [{
+        'date': day, 'courseId': course_id, 'courseName': fixtures.courses[course_id],
+        'studentId': student_id, 'studentName': f"Student {student_id}",
+        'status': rng.choice(['present', 'present', 'present', 'late', 'absent']),
+        'arrivalTime': '10:00', 'leavingTime': '11:00', 'notes': ''
+    } for student_id in students]
+
+
+def delete_op(kind, path):
+    def build(fixtures, rng):
+        item_id = fixtures.pop_deletable(kind)
+        # Once the created rows are used up, exercise the not-found path
+        return 'DELETE', f"{path}/{item_id if item_id is not None else 2 ** 31 - 1}", None
+    return build
+
+
+# (name, kind, weight, build(fixtures, rng) -> (method, path, body), extra accepted statuses)
+OPERATIONS = [
+    ('GET /courses', 'read', 10, lambda f, r: ('GET', '/courses', None), ()),
+    ('GET /course-names', 'read', 5, lambda f, r: ('GET', '/course-names', None), ()),
+    ('GET /students', 'read', 3, lambda f, r: ('GET', '/students', None), ()),
+    ('GET /teachers', 'read', 3, lambda f, r: ('GET', '/teachers', None), ()),
+    ('GET /locations', 'read', 2, lambda f, r: ('GET', '/locations', None), ()),
+    ('GET /student-grade-levels', 'read', 2, lambda f, r: ('GET', '/student-grade-levels', None), ()),
+    ('GET /grades?courseId', 'read', 10,
+     lambda f, r: ('GET', f"/grades?courseId={r.choice(f.course_ids)}&limit=50", None), ()),
+    ('GET /grades?studentId', 'read', 5,
+     lambda f, r: ('GET', f"/grades?studentId={r.choice(f.student_ids or [1])}", None), ()),
+    ('GET /grade-stats?courseId', 'read', 3,
+     lambda f, r: ('GET', f"/grade-stats?courseId={r.choice(f.course_ids)}", None), ()),
+    ('GET /grade-stats?studentId', 'read', 2,
+     lambda f, r: ('GET', f"/grade-stats?studentId={r.choice(f.student_ids or [1])}", None), ()),
+    ('GET /final-grades?studentId', 'read', 3,
+     lambda f, r: ('GET', f"/final-grades?studentId={r.choice(f.student_ids or [1])}", None), ()),
+    ('GET /attendance?courseId', 'read', 5,
+     lambda f, r: ('GET', f"/attendance?courseId={r.choice(f.course_ids)}", None), ()),
+    ('GET /attendance-rates', 'read', 2,
+     lambda f, r: ('GET', f"/attendance-rates?dateFrom=2025-01-01&dateTo=2025-12-31&courseId={r.choice(f.course_ids)}", None), ()),
+    ('GET /attendance-rates?studentId', 'read', 2,
+     lambda f, r: ('GET', f"/attendance-rates?dateFrom=2025-01-10&dateTo=2025-11-20&studentId={r.choice(f.student_ids or [1])}", None), ()),
+    ('GET /admin/dashboard-stats', 'read', 3, lambda f, r: ('GET', '/admin/dashboard-stats', None), ()),
+    ('GET /user-enrollments', 'read', 3,
+     lambda f, r: ('GET', f"/user-enrollments?parentId={f.parent_id}", None), ()),
+    ('GET /course-students/<id>', 'read', 4,
+     lambda f, r: ('GET', f"/course-students/{r.choice(f.course_ids)}", None), ()),
+    ('GET /cache/stats', 'read', 1, lambda f, r: ('GET', '/cache/stats', None), ()),
+    ('GET /metrics', 'read', 1, lambda f, r: ('GET', '/metrics', None), ()),
+    ('GET /health/ready', 'read', 1, lambda f, r: ('GET', '/health/ready', None), ()),
+    ('POST /login', 'read', 2, lambda f, r: ('POST', '/login', {
+        'userType': 'parent', 'email': f.parent_email, 'password': f.parent_password}), ()),
+    ('POST /grades', 'write', 10, lambda f, r: ('POST', '/grades', grade_payload(f, r)), ()),
+    ('POST /grades/batch', 'write', 3,
+     lambda f, r: ('POST', '/grades/batch', [grade_payload(f, r) for _ in range(50)]), ()),
+    ('POST /attendance', 'write', 5, lambda f, r: ('POST', '/attendance', attendance_payload(f, r)), ()),
+    # Repeat enrollments and full courses answer 400 by design
+    ('POST /enroll', 'write', 2, lambda f, r: ('POST', '/enroll', {
+        'courseId': r.choice(f.course_ids), 'parentId': f.parent_id,
+        'studentId': r.choice(f.student_ids or [1])}), (400,)),
+    ('POST /students', 'write', 2, lambda f, r: ('POST', '/students', student_payload(f, r)), ()),
+    ('POST /courses', 'write', 1, lambda f, r: ('POST', '/courses', course_payload(f, r)), ()),
+    ('POST /teachers', 'write', 1, lambda f, r: ('POST', '/teachers', teacher_payload(f, r)), ()),
+    ('POST /signup', 'write', 1, lambda f, r: ('POST', '/signup', {'userType': 'parent', 'formData': {
+        'firstName': f.unique('parent'), 'lastName': 'Parent', 'email': f"{f.unique('parent')}@example.com",
+        'password': f.parent_password, 'childName': 'Bench Child', 'childAge': 7}}), ()),
+    ('DELETE /students/<id>', 'write', 1, delete_op('students', '/students'), (404,)),
+    ('DELETE /courses/<id>', 'write', 1, delete_op('courses', '/courses'), (404,)),
+    ('DELETE /teachers/<id>', 'write', 1, delete_op('teachers', '/teachers'), (404,)),
+]
+
+
+def setup_fixtures(client, run_id, delete_pool, rng):
+    """Discover existing ids and create the rows the run needs"""
+    fixtures = Fixtures(run_id)
+
+    def call(method, path, body=None):
+        status, data = client.request(method, path, body)
+        if status >= 400:
+            raise RuntimeError(f"Setup request {method} {path} failed with {status}: {data}")
+        return data
+
+    if not call('GET', '/courses'):
+        for _ in range(5):
+            call('POST', '/courses', course_payload(fixtures, rng))
+    fixtures.courses = {course['id']: course['name'] for course in call('GET', '/courses')}
+    fixtures.course_ids = sorted(fixtures.courses)
+
+    if not call('GET', '/students'):
+        for _ in range(20):
+            call('POST', '/students', student_payload(fixtures, rng))
+    fixtures.student_ids = [student['id'] for student in call('GET', '/students')]
+
+    # A parent account for login, enrollment and user-enrollments
+    fixtures.parent_email = f"bench-{run_id}-parent@example.com"
+    call('POST', '/signup', {'userType': 'parent', 'formData': {
+        'firstName': 'Bench', 'lastName': 'Parent', 'email': fixtures.parent_email,
+        'password': fixtures.parent_password, 'childName': 'Bench Child', 'childAge': 7}})
+    login = call('POST', '/login', {'userType': 'parent', 'email': fixtures.parent_email,
+                                    'password': fixtures.parent_password})
+    fixtures.parent_id = login['user']['id']
+
+    # Rows for the DELETE operations to remove
+    if delete_pool:
+        prefix = f"bench-{run_id}-delete"
+        for i in range(delete_pool):
+            call('POST', '/students', {**student_payload(fixtures, rng), 'firstName': f"{prefix}-{i}"})
+            call('POST', '/courses', {**course_payload(fixtures, rng), 'name': f"{prefix}-{i}"})
+            call('POST', '/teachers', {**teacher_payload(fixtures, rng), 'firstName': f"{prefix}-{i}"})
+        fixtures.deletable['students'] = [s['id'] for s in call('GET', '/students') if s['name'].startswith(prefix)]
+        fixtures.deletable['courses'] = [c['id'] for c in call('GET', '/courses') if c['name'].startswith(prefix)]
+        fixtures.deletable['teachers'] = [t['id'] for t in call('GET', '/teachers') if t['name'].startswith(prefix)]
+    return fixtures
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    requests = len(latencies)
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': requests,
+        'errors': errors,
+        'errorRate': round(errors / requests, 6) if requests else 0.0,
+        'throughput': round(requests / elapsed, 3) if elapsed else 0.0,
+        'latencyMs': {
+            'mean': to_ms(sum(latencies) / requests) if requests else None,
+            'p50': to_ms(percentile(latencies, 0.50)),
+            'p95': to_ms(percentile(latencies, 0.95)),
+            'p99': to_ms(percentile(latencies, 0.99)),
+            'max': to_ms(latencies[-1]) if latencies else None
+        }
+    }
+
+
+def run(args):
+    run_id = uuid.uuid4().hex[:8]
+    rng = random.Random(args.seed)
+    setup_client = Client(args.base_url, args.timeout)
+    fixtures = setup_fixtures(setup_client, run_id, args.delete_pool, rng)
+    setup_client.close()
+
+    operations = [op for op in OPERATIONS if not args.only or any(word in op[0] for word in args.only)]
+    reads = [op for op in operations if op[1] == 'read']
+    writes = [op for op in operations if op[1] == 'write']
+    if not reads and not writes:
+        sys.exit("No operations match --only")
+
+    results = {op[0]: {'latencies': [], 'errors': 0} for op in operations}
+    results_lock = threading.Lock()
+    warmup_end = time.monotonic() + args.warmup
+    deadline = warmup_end + args.duration
+    stop = threading.Event()
+
+    def pick(worker_rng):
+        use_writes = writes and (not reads or worker_rng.random() < args.write_ratio)
+        pool = writes if use_writes else reads
+        return worker_rng.choices(pool, weights=[op[2] for op in pool])[0]
+
+    def worker(index):
+        worker_rng = random.Random(f"{args.seed}-{index}")
+        client = Client(args.base_url, args.timeout)
+        local = {name: {'latencies': [], 'errors': 0} for name in results}
+        try:
+            while not stop.is_set() and time.monotonic() < deadline:
+                name, _, _, build, accepted = pick(worker_rng)
+                method, path, body = build(fixtures, worker_rng)
+                started = time.perf_counter()
+                try:
+                    status, _ = client.request(method, path, body)
+                    failed = not (200 <= status < 400 or status in accepted)
+                except (OSError, http.client.HTTPException):
+                    client.close()
+                    failed = True
+                elapsed = time.perf_counter() - started
+                if time.monotonic() < warmup_end:
+                    continue
+                local[name]['latencies'].append(elapsed)
+                local[name]['errors'] += failed
+        finally:
+            client.close()
+            with results_lock:
+                for name, result in local.items():
+                    results[name]['latencies'].extend(result['latencies'])
+                    results[name]['errors'] += result['errors']
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    print(f"Run {run_id}: {args.concurrency} workers, {args.warmup}s warm-up, {args.duration}s measured, "
+          f"write ratio {args.write_ratio}", file=sys.stderr)
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    elapsed = max(0.001, min(time.monotonic(), deadline) - warmup_end)
+
+    all_latencies = [value for result in results.values() for value in result['latencies']]
+    report = {
+        'runId': run_id,
+        'startedAt': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': {
+            'baseUrl': args.base_url, 'concurrency': args.concurrency, 'duration': args.duration,
+            'warmup': args.warmup, 'writeRatio': args.write_ratio, 'seed': args.seed, 'only': args.only
+        },
+        'elapsedSeconds': round(elapsed, 3),
+        'total': summarize(all_latencies, sum(result['errors'] for result in results.values()), elapsed),
+        'routes': {name: summarize(result['latencies'], result['errors'], elapsed)
+                   for name, result in results.items() if result['latencies']}
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+def change(base, new):
+    if base in (None, 0) or new is None:
+        return None
+    return round((new - base) / base * 100, 2)
+
+
+def diff(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+
+    rows = []
+    regressions = []
+    names = ['total'] + sorted(set(base['routes']) | set(new['routes']))
+    for name in names:
+        before = base['total'] if name == 'total' else base['routes'].get(name)
+        after = new['total'] if name == 'total' else new['routes'].get(name)
+        if before is None or after is None:
+            rows.append({'route': name, 'missingIn': 'base' if before is None else 'new'})
+            continue
+        row = {
+            'route': name,
+            'throughputChangePct': change(before['throughput'], after['throughput']),
+            'p50ChangePct': change(before['latencyMs']['p50'], after['latencyMs']['p50']),
+            'p95ChangePct': change(before['latencyMs']['p95'], after['latencyMs']['p95']),
+            'p99ChangePct': change(before['latencyMs']['p99'], after['latencyMs']['p99']),
+            'errorRateChange': round(after['errorRate'] - before['errorRate'], 6)
+        }
+        reasons = []
+        if row['throughputChangePct'] is not None and row['throughputChangePct'] < -args.threshold:
+            reasons.append('throughput')
+        if row['p95ChangePct'] is not None and row['p95ChangePct'] > args.threshold:
+            reasons.append('p95')
+        if row['errorRateChange'] > args.error_threshold:
+            reasons.append('errorRate')
+        row['regressed'] = reasons
+        if reasons:
+            regressions.append(name)
+        rows.append(row)
+
+    if args.json:
+        print(json.dumps({'threshold': args.threshold, 'routes': rows, 'regressions': regressions}, indent=2))
+    else:
+        fmt = lambda value: '-' if value is None else f"{value:+.1f}%"
+        print(f"{'route':<30} {'throughput':>11} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>9}")
+        for row in rows:
+            if 'missingIn' in row:
+                print(f"{row['route']:<30} (not in {row['missingIn']} run)")
+                continue
+            flag = '  REGRESSED: ' + ', '.join(row['regressed']) if row['regressed'] else ''
+            print(f"{row['route']:<30} {fmt(row['throughputChangePct']):>11} {fmt(row['p50ChangePct']):>9} "
+                  f"{fmt(row['p95ChangePct']):>9} {fmt(row['p99ChangePct']):>9} "
+                  f"{row['errorRateChange'] * 100:>+8.2f}pp{flag}")
+    # Non-zero exit status so CI and scripts can fail on a regression
+    sys.exit(1 if regressions else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='drive the server and report results as JSON')
+    run_parser.add_argument('--base-url', default='http://localhost:9999')
+    run_parser.add_argument('--concurrency', type=int, default=8, help='worker threads (default 8)')
+    run_parser.add_argument('--duration', type=float, default=30, help='measured seconds (default 30)')
+    run_parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds first (default 5)')
+    run_parser.add_argument('--write-ratio', type=float, default=0.2,
+                            help='fraction of requests that are writes (default 0.2)')
+    run_parser.add_argument('--only', nargs='*', help='run only operations whose name contains one of these')
+    run_parser.add_argument('--delete-pool', type=int, default=100,
+                            help='students, courses and teachers created up front for DELETE operations')
+    run_parser.add_argument('--seed', type=int, default=1, help='random seed for a reproducible request mix')
+    run_parser.add_argument('--timeout', type=float, default=30, help='per-request timeout in seconds')
+    run_parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    run_parser.set_defaults(handler=run)
+
+    diff_parser = commands.add_parser('diff', help='compare two reports, exit 1 on regression')
+    diff_parser.add_argument('base')
+    diff_parser.add_argument('new')
+    diff_parser.add_argument('--threshold', type=float, default=10,
+                             help='allowed throughput drop / p95 increase in percent (default 10)')
+    diff_parser.add_argument('--error-threshold', type=float, default=0.01,
+                             help='allowed error rate increase as a fraction (default 0.01)')
+    diff_parser.add_argument('--json', action='store_true', help='print the comparison as JSON')
+    diff_parser.set_defaults(handler=diff)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Thread-safe, memory-bounded LRU cache of query results.
+
+    Entries expire after ``ttl`` seconds and carry a set of table tags;
+    ``invalidate('students')`` drops every entry tagged with that table, so
+    write routes can evict what they made stale. The least recently used
+    entries are evicted once more than ``max_entries`` entries or
+    ``max_bytes`` bytes are cached.
+
+    Other processes learn about writes through ``apply_versions``: callers
+    poll the database's per-table change counters every ``poll_interval``
+    seconds and pass them in, and tags whose counter moved are invalidated.
+    Counters read between polls, such as those behind an ETag, go through
+    ``observe_versions`` so a cached result never outlives a counter the
+    caller has already seen move. Tables without a counter are at version 0.
+    """
+
+    def __init__(self, ttl=60, max_entries=1024, max_bytes=32 * 1024 * 1024, poll_interval=1.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._bytes = 0
+        self._versions = None
+        self._last_poll = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, tags, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, tags=(), ttl=None, size=None):
+        """Cache ``value``; ``size`` in bytes defaults to the length of the value or its repr."""
+        ttl = self.ttl if ttl is None else ttl
+        if size is None:
+            size = len(value) if isinstance(value, (bytes, str)) else len(repr(value))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tuple(tags), size)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry tagged with any of ``tags``."""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def poll_due(self):
+        """Whether table versions should be polled now; claims the poll if so."""
+        now = time.monotonic()
+        with self._lock:
+            if self._last_poll is not None and now - self._last_poll < self.poll_interval:
+                return False
+            self._last_poll = now
+            return True
+
+    def apply_versions(self, versions):
+        """Invalidate the tags whose change counter differs from the last poll."""
+        with self._lock:
+            previous, self._versions = self._versions, dict(versions)
+        if previous is None:
+            return
+        changed = [table for table in set(previous) | set(versions)
+                   if previous.get(table, 0) != versions.get(table, 0)]
+        if changed:
+            self.invalidate(*changed)
+
+    def observe_versions(self, versions):
+        """Like apply_versions, for the counters of some tables only; the others keep their last value."""
+        with self._lock:
+            known = self._versions or {}
+            changed = [table for table, version in versions.items() if known.get(table, 0) != version]
+            self._versions = {**known, **versions}
+        if changed:
+            self.invalidate(*changed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'maxEntries': self.max_entries,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[3]
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
@@ -0,0 +1,81 @@
+"""Fail when a GET /attendance filter combination would scan a whole table.
+
+Runs EXPLAIN for every combination of the filters build_attendance_query()
+accepts and exits with status 1 if any plan reads a table, or an entire
+index, in full. Without filters the route lists every row, so that case
+is not checked.
+
+    python check_query_plans.py
+    STORAGE_BACKEND=sqlite python check_query_plans.py
+
+test_query_plans.py runs the same check on an in-memory SQLite database
+as part of the test suite.
+
+MySQL chooses plans from table statistics and may scan tables that are
+nearly empty, so run it against a database of realistic size (see
+seed_data.py).
+"""
+import itertools
+import sys
+from datetime import date, timedelta
+
+from app import app, build_attendance_query, db_pool, init_db, storage_backend
+
+# Query parameters of GET /attendance, in build_attendance_query() order
+ATTENDANCE_FILTERS = ('courseId', 'studentId', 'dateFrom', 'dateTo', 'status')
+
+
+def sample_filters(cursor):
+    """Filter values taken from an existing attendance row, or placeholders on an empty table"""
+    cursor.execute("SELECT course_id, student_id, date FROM attendance ORDER BY date LIMIT 1")
+    row = cursor.fetchone()
+    if row is None:
+        row = {'course_id': 'course-1', 'student_id': '1', 'date': date(2025, 1, 1)}
+    day = date.fromisoformat(str(row['date']))
+    return {
+        'courseId': row['course_id'],
+        'studentId': row['student_id'],
+        'dateFrom': day.isoformat(),
+        'dateTo': (day + timedelta(days=30)).isoformat(),
+        'status': 'absent'
+    }
+
+
+def filter_combinations():
+    for size in range(1, len(ATTENDANCE_FILTERS) + 1):
+        yield from itertools.combinations(ATTENDANCE_FILTERS, size)
+
+
+def attendance_full_scans(cursor, backend):
+    """Yield (filter combination, tables read in full) for every GET /attendance filter combination"""
+    values = sample_filters(cursor)
+    for combination in filter_combinations():
+        sql, params = build_attendance_query({name: values[name] for name in combination})
+        yield combination, backend.full_scans(cursor, sql, params)
+
+
+def main():
+    with app.app_context():
+        init_db()
+
+    failures = 0
+    with db_pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            for combination, scanned in attendance_full_scans(cursor, storage_backend):
+                label = ' + '.join(combination)
+                if scanned:
+                    failures += 1
+                    print(f"FULL SCAN  {label}: {', '.join(scanned)}")
+                else:
+                    print(f"ok         {label}")
+        finally:
+            cursor.close()
+
+    total = sum(1 for _ in filter_combinations())
+    print(f"{total - failures} of {total} attendance filter combinations use an index ({storage_backend.name})")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
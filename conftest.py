@@ -0,0 +1,61 @@
+"""Shared pytest setup.
+
+The app runs on a throwaway SQLite database file, set before app.py is
+imported. A file rather than ':memory:' lets tests write through a second
+connection, as another worker process would.
+
+    python -m pytest
+"""
+import os
+import tempfile
+
+os.environ['STORAGE_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(), 'test.db')
+
+import pytest
+
+# Scripts that drive a running server rather than tests
+collect_ignore = ['test_api.py', 'test_system.py']
+
+
+@pytest.fixture
+def client():
+    from app import app, init_db
+    with app.app_context():
+        init_db()
+    return app.test_client()
+
+
+@pytest.fixture
+def sql(client):
+    """Run one statement on a connection outside the app's pool and commit.
+
+    Returns the rows of a query, or the id of the inserted row.
+    """
+    from app import storage_backend
+
+    def run(statement, params=()):
+        connection = storage_backend.connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(statement, params)
+            result = cursor.fetchall() if cursor.description else cursor.lastrowid
+            connection.commit()
+            cursor.close()
+            return result
+        finally:
+            connection.close()
+    return run
+
+
+@pytest.fixture
+def add_course(sql):
+    """Insert a course through sql() and return its id"""
+    def add(name, location='Tsz Wan Shan Centre', max_students=20):
+        return sql(
+            "INSERT INTO courses (name, level, age_range, location, schedule, time, teacher, "
+            "max_students, fee, description) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            (name, 'Beginner', '5-7 years', location, 'Mon, Wed', '10:00-11:00', 'John Smith',
+             max_students, 'HK$1,800/month', '')
+        )
+    return add
@@ -0,0 +1,199 @@
+import threading
+import time
+
+from flask import current_app, g
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the timeout."""
+
+
+class _PooledConnection:
+    """Book-keeping wrapper around a raw backend connection."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.returned_at = self.created_at
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of connections opened by a storage backend.
+
+    Connections are created lazily up to ``max_size``. On checkout a
+    connection is discarded and replaced if it has been idle longer than
+    ``idle_timeout`` or alive longer than ``max_lifetime`` seconds, and is
+    pinged first when ``pre_ping`` is enabled. Callers block for at most
+    ``checkout_timeout`` seconds when the pool is exhausted.
+
+    ``backend`` (see storage.py) opens the connections; ``max_size`` is
+    capped at its ``max_connections``. ``on_checkout``, if given, is called
+    with the seconds each successful checkout took.
+    """
+
+    def __init__(self, backend, max_size=10, pre_ping=True, idle_timeout=300,
+                 max_lifetime=3600, checkout_timeout=10, on_checkout=None):
+        self.backend = backend
+        if backend.max_connections:
+            max_size = min(max_size, backend.max_connections)
+        self.max_size = max_size
+        self.pre_ping = pre_ping
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.on_checkout = on_checkout
+
+        self._idle = []
+        self._size = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+    def _connect(self):
+        return self.backend.connect()
+
+    def _is_stale(self, pooled, now):
+        if self.max_lifetime and now - pooled.created_at > self.max_lifetime:
+            return True
+        if self.idle_timeout and now - pooled.returned_at > self.idle_timeout:
+            return True
+        return False
+
+    def _discard(self, pooled):
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """Check out a connection, waiting up to ``timeout`` seconds."""
+        started = time.monotonic()
+        pooled = self._checkout(self.checkout_timeout if timeout is None else timeout)
+        if self.on_checkout is not None:
+            self.on_checkout(time.monotonic() - started)
+        return pooled
+
+    def _checkout(self, timeout):
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._available:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"Could not get a database connection within {timeout}s "
+                            f"(pool size {self.max_size})"
+                        )
+                    self._available.wait(remaining)
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    # Reserve a slot, connect outside the lock
+                    self._size += 1
+                    pooled = None
+
+            if pooled is None:
+                try:
+                    return _PooledConnection(self._connect())
+                except Exception:
+                    self._release_slot()
+                    raise
+
+            if self._is_stale(pooled, time.monotonic()):
+                self._discard(pooled)
+                self._release_slot()
+                continue
+
+            if self.pre_ping:
+                try:
+                    pooled.raw.ping(reconnect=False)
+                except Exception:
+                    self._discard(pooled)
+                    self._release_slot()
+                    continue
+
+            return pooled
+
+    def release(self, pooled):
+        """Return a connection to the pool, rolling back any open transaction."""
+        try:
+            pooled.raw.rollback()
+        except Exception:
+            self._discard(pooled)
+            self._release_slot()
+            return
+
+        pooled.returned_at = time.monotonic()
+        with self._available:
+            self._idle.append(pooled)
+            self._available.notify()
+
+    def _release_slot(self):
+        with self._available:
+            self._size -= 1
+            self._available.notify()
+
+    def close(self):
+        """Close every idle connection; checked-out ones close on release."""
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for pooled in idle:
+            self._discard(pooled)
+
+    def reset(self):
+        """Forget every pooled connection without closing it, after os.fork().
+
+        A forked worker must not share sockets with its parent, and closing
+        them would end the parent's sessions, so the child drops them and
+        starts with an empty pool and fresh locks.
+        """
+        self._idle = []
+        self._size = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+    def connection(self):
+        """Context manager for use outside a request (scripts, startup)."""
+        return _PoolCheckout(self)
+
+
+class _PoolCheckout:
+    def __init__(self, pool):
+        self.pool = pool
+        self.pooled = None
+
+    def __enter__(self):
+        self.pooled = self.pool.acquire()
+        return self.pooled.raw
+
+    def __exit__(self, exc_type, exc, tb):
+        self.pool.release(self.pooled)
+        return False
+
+
+def init_app(app, backend, **pool_options):
+    """Create the application's pool over ``backend`` and return pooled connections on teardown."""
+    pool = ConnectionPool(backend, **pool_options)
+    app.extensions['db_backend'] = backend
+    app.extensions['db_pool'] = pool
+    app.teardown_appcontext(close_db)
+    return pool
+
+
+def get_db():
+    """Return the connection for the current request, checking one out on first use.
+
+    The connection goes back to the pool when the request ends; anything not
+    committed by then is rolled back.
+    """
+    if '_db_connection' not in g:
+        g._db_connection = current_app.extensions['db_pool'].acquire()
+    return g._db_connection.raw
+
+
+def close_db(exception=None):
+    pooled = g.pop('_db_connection', None)
+    if pooled is not None:
+        current_app.extensions['db_pool'].release(pooled)
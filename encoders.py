@@ -0,0 +1,73 @@
+"""JSON providers for Flask responses, chosen by ``json_config`` in app.py.
+
+``OrjsonProvider`` serializes with orjson, which writes dicts, lists, dates
+and datetimes in C. Routes can therefore leave date columns as the
+``date``/``datetime`` objects the cursor returned, instead of formatting
+each row with strftime. ``StdlibProvider`` is Flask's own encoder with the
+same conventions, for installs without orjson.
+
+Both providers write dates as ``YYYY-MM-DD``, datetimes in ISO 8601 and
+``Decimal`` as a string. Keys are sorted and output is compact, as with
+Flask's default provider outside debug mode.
+"""
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the stdlib encoder
+    orjson = None
+
+# Flask's fallback for types json cannot write (Decimal, dataclasses, __html__)
+_flask_default = DefaultJSONProvider.default
+
+
+def _stdlib_default(value):
+    # date covers datetime; Flask's own default would write HTTP dates
+    if isinstance(value, date):
+        return value.isoformat()
+    return _flask_default(value)
+
+
+class StdlibProvider(DefaultJSONProvider):
+    """Flask's json-module provider, writing dates in ISO 8601"""
+
+    name = 'stdlib'
+    default = staticmethod(_stdlib_default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """orjson provider; dates and datetimes are written natively, Decimal through Flask's default"""
+
+    name = 'orjson'
+    options = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=_flask_default, option=self.options)
+
+    def dumps(self, obj, **kwargs):
+        # Formatting options (indent, separators) are ignored; output is always compact
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+PROVIDERS = {provider.name: provider for provider in (OrjsonProvider, StdlibProvider)}
+
+
+def create_provider(app, encoder='orjson'):
+    """Build the JSON provider named ``encoder`` for ``app``.
+
+    'orjson' falls back to 'stdlib' when orjson is not installed.
+    """
+    if encoder not in PROVIDERS:
+        raise ValueError(f"Unknown JSON encoder: {encoder!r} (expected one of {', '.join(PROVIDERS)})")
+    if encoder == 'orjson' and orjson is None:
+        encoder = 'stdlib'
+    return PROVIDERS[encoder](app)
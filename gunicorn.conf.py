@@ -0,0 +1,66 @@
+"""Gunicorn settings for the production server.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Every setting can be overridden with the environment variable named next to it.
+"""
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:9999')
+
+# Pre-forked worker processes, each serving requests on a thread pool.
+# Keep threads at or below pool_config['max_size'] in app.py so no thread
+# waits for a database connection.
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import app.py once in the master, so workers fork with the code loaded
+preload_app = True
+
+# Seconds a worker may spend on one request, and to finish in-flight
+# requests on reload or shutdown
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers periodically so slow leaks cannot build up
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+# Workers share their metrics through files in this directory, so GET /metrics
+# on any worker reports the whole server. It is emptied when the master starts;
+# give each server on a host its own directory. Other workers' series are up to
+# METRICS_INTERVAL seconds behind.
+metrics_dir = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), f"metrics-{bind.rsplit(':', 1)[-1]}"))
+metrics_interval = float(os.environ.get('METRICS_INTERVAL', 5))
+
+
+def on_starting(server):
+    """Drop metrics left by a previous server"""
+    import metrics
+    metrics.SharedDirectory(metrics.registry, metrics_dir).clear()
+
+
+def post_fork(server, worker):
+    """Give each worker its own connection pool and empty result cache, and share its metrics"""
+    import app
+    import metrics
+    app.db_pool.reset()
+    app.query_cache.clear()
+    metrics.share(metrics_dir, metrics_interval)
+
+
+def worker_exit(server, worker):
+    """Write the worker's final metrics"""
+    import metrics
+    if metrics.shared is not None:
+        metrics.shared.close()
+
+
+def child_exit(server, worker):
+    """Keep an exited worker's counts in the totals"""
+    import metrics
+    metrics.SharedDirectory(metrics.registry, metrics_dir).archive(worker.pid)
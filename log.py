@@ -0,0 +1,184 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+logger = logging.getLogger('app')
+
+REDACTED = '[REDACTED]'
+
+# Payload settings used until init_app() is called, and for routes
+# without an entry in the per-route overrides
+_payload_settings = {
+    'payload': True,
+    'sample_rate': 1.0,
+    'max_list_items': 10,
+    'max_payload_chars': 2000,
+    'redact_fields': ('password',)
+}
+_route_settings = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in ('route', 'method', 'path'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+
+        payload = getattr(record, 'payload', None)
+        if payload is not None:
+            max_chars = record.payload_max_chars
+            text = json.dumps(payload, default=str, ensure_ascii=False)
+            if max_chars and len(text) > max_chars:
+                entry['payload'] = text[:max_chars]
+                entry['payloadTruncated'] = True
+            else:
+                entry['payload'] = payload
+        if getattr(record, 'payload_omitted', None):
+            entry['payloadItemsOmitted'] = record.payload_omitted
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _RequestContextFilter(logging.Filter):
+    """Attach the current request's route, method and path while still on its thread."""
+
+    def filter(self, record):
+        if has_request_context() and not hasattr(record, 'route'):
+            record.route = request.endpoint
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class _BackgroundQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and runs its writer thread in the current process.
+
+    Records are dropped, and counted, when the queue is full. The writer
+    thread is (re)started on first use in each process, since threads do
+    not survive the fork into gunicorn workers.
+    """
+
+    def __init__(self, queue_size, target):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = target
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._listener = logging.handlers.QueueListener(self.queue, self.target)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Flush queued records and stop the writer thread."""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+
+
+def init_app(app, level='INFO', queue_size=10000, stream=None, routes=None, **payload_options):
+    """Send the 'app' logger's records through a background queue as JSON lines.
+
+    ``payload_options`` set the defaults for log_payload() (payload,
+    sample_rate, max_list_items, max_payload_chars, redact_fields) and
+    ``routes`` overrides them per Flask endpoint name.
+    """
+    unknown = set(payload_options) - set(_payload_settings)
+    if unknown:
+        raise ValueError(f"Unknown logging options: {', '.join(sorted(unknown))}")
+    _payload_settings.update(payload_options)
+    _route_settings.clear()
+    _route_settings.update(routes or {})
+
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(JsonFormatter())
+
+    handler = _BackgroundQueueHandler(queue_size, target)
+    handler.addFilter(_RequestContextFilter())
+
+    for old_handler in list(logger.handlers):
+        if isinstance(old_handler, _BackgroundQueueHandler):
+            logger.removeHandler(old_handler)
+            old_handler.stop()
+    logger.addHandler(handler)
+    atexit.register(handler.stop)
+    logger.setLevel(level)
+    logger.propagate = False
+    app.extensions['log_handler'] = handler
+    return handler
+
+
+def _redact(value, redact_fields):
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in redact_fields else _redact(item, redact_fields)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact(item, redact_fields) for item in value]
+    return value
+
+
+def log_payload(message, data, route=None):
+    """Log a request payload, subject to the route's sampling, size and redaction settings.
+
+    Only a bounded copy of the payload is made on the request thread: lists
+    longer than max_list_items are cut (the number of omitted items is
+    logged) and redact_fields keys are masked at any depth. Serializing and
+    truncating to max_payload_chars happen on the writer thread.
+    """
+    if route is None and has_request_context():
+        route = request.endpoint
+    settings = {**_payload_settings, **_route_settings.get(route, {})}
+    if not settings['payload'] or not logger.isEnabledFor(logging.INFO):
+        return
+    if settings['sample_rate'] < 1 and random.random() >= settings['sample_rate']:
+        return
+
+    omitted = 0
+    max_items = settings['max_list_items']
+    if isinstance(data, list) and max_items and len(data) > max_items:
+        omitted = len(data) - max_items
+        data = data[:max_items]
+    redact_fields = {field.lower() for field in settings['redact_fields']}
+
+    extra = {
+        'payload': _redact(data, redact_fields),
+        'payload_max_chars': settings['max_payload_chars'],
+        'payload_omitted': omitted
+    }
+    if route is not None and not has_request_context():
+        extra['route'] = route
+    logger.info(message, extra=extra)
@@ -0,0 +1,391 @@
+import json
+import os
+import threading
+import time
+
+import pymysql
+from flask import Response, g, has_request_context, request
+
+from log import logger
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with one series per label value tuple."""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def add(value, other):
+        return value + other
+
+    def samples(self, values=None):
+        if values is None:
+            values = self.snapshot()
+        for labels, value in sorted(values.items()):
+            yield self.name, list(zip(self.labelnames, labels)), value
+
+
+class Histogram:
+    """Cumulative histogram with one series per label value tuple."""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts, then sum and count
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: list(series) for labels, series in self._series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    @staticmethod
+    def add(series, other):
+        return [value + other_value for value, other_value in zip(series, other)]
+
+    def samples(self, all_series=None):
+        if all_series is None:
+            all_series = self.snapshot()
+        for labels, series in sorted(all_series.items()):
+            label_pairs = list(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield self.name + '_bucket', label_pairs + [('le', bound)], cumulative
+            yield self.name + '_bucket', label_pairs + [('le', '+Inf')], series[-1]
+            yield self.name + '_sum', label_pairs, series[-2]
+            yield self.name + '_count', label_pairs, series[-1]
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self):
+        """{metric name: {label values: value}} copy of every series"""
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+    def combine(self, snapshots):
+        """Sum snapshots series by series"""
+        combined = {metric.name: {} for metric in self._metrics}
+        for snapshot in snapshots:
+            for metric in self._metrics:
+                totals = combined[metric.name]
+                for labels, value in snapshot.get(metric.name, {}).items():
+                    totals[labels] = metric.add(totals[labels], value) if labels in totals else value
+        return combined
+
+    def render(self, snapshots=()):
+        """This registry's series, plus ``snapshots`` from other processes"""
+        combined = self.combine([self.snapshot(), *snapshots])
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples(combined[metric.name]):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _dump_snapshot(snapshot):
+    return {name: [[list(labels), value] for labels, value in series.items()]
+            for name, series in snapshot.items()}
+
+
+def _load_snapshot(data):
+    return {name: {tuple(labels): value for labels, value in series} for name, series in data.items()}
+
+
+class SharedDirectory:
+    """Metrics of all gunicorn workers, shared through files in one directory.
+
+    Each worker writes its series to its own file every ``interval`` seconds
+    and when it exits. A scrape of any worker adds the other workers' files
+    to its live series, so other workers are up to ``interval`` seconds
+    behind. Once a worker has exited the master adds its file into an
+    archive, so counters keep their totals across worker restarts.
+    """
+
+    ARCHIVE = 'archive.json'
+
+    def __init__(self, registry, path, interval=5):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._name = None
+        self._stopped = threading.Event()
+
+    def clear(self):
+        """Remove files left by a previous server; called by the master before forking"""
+        os.makedirs(self.path, exist_ok=True)
+        for name in os.listdir(self.path):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.path, name))
+
+    def start(self):
+        """Start publishing this worker's series; called in the worker after the fork"""
+        # Series inherited from the master are the master's, not this worker's
+        self.registry.clear()
+        self._name = f'worker-{os.getpid()}-{time.time_ns()}.json'
+        self.flush()
+        threading.Thread(target=self._run, name='metrics-flush', daemon=True).start()
+
+    def close(self):
+        """Stop the flush thread and write the final series; called when the worker exits"""
+        self._stopped.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("Could not write metrics to %s: %s", self.path, e)
+
+    def flush(self):
+        if self._name is not None:
+            self._write(self._name, _dump_snapshot(self.registry.snapshot()))
+
+    def snapshots(self):
+        """Snapshots of the archive and of every worker but this one"""
+        while True:
+            archive = self._read_archive()
+            snapshots = [_load_snapshot(archive['metrics'])]
+            try:
+                for name in self._worker_files():
+                    if name != self._name and name not in archive['merged']:
+                        snapshots.append(_load_snapshot(self._read(name)))
+                return snapshots
+            except FileNotFoundError:
+                # The master archived a worker meanwhile; its counts are in the new archive
+                continue
+
+    def archive(self, pid):
+        """Move the files of the exited worker ``pid`` into the archive; called by the master"""
+        names = [name for name in self._worker_files() if name.startswith(f'worker-{pid}-')]
+        if not names:
+            return
+        archive = self._read_archive()
+        totals = self.registry.combine(
+            [_load_snapshot(archive['metrics'])] + [_load_snapshot(self._read(name)) for name in names])
+        # Readers skip files named in the archive until they are removed, so none is counted twice
+        merged = [name for name in archive['merged'] if os.path.exists(os.path.join(self.path, name))]
+        self._write(self.ARCHIVE, {'merged': merged + names, 'metrics': _dump_snapshot(totals)})
+        for name in names:
+            os.remove(os.path.join(self.path, name))
+
+    def _worker_files(self):
+        return sorted(name for name in os.listdir(self.path)
+                      if name.startswith('worker-') and name.endswith('.json'))
+
+    def _read(self, name):
+        with open(os.path.join(self.path, name)) as f:
+            return json.load(f)
+
+    def _read_archive(self):
+        try:
+            return self._read(self.ARCHIVE)
+        except FileNotFoundError:
+            return {'merged': [], 'metrics': {}}
+
+    def _write(self, name, data):
+        # Written aside and renamed, so readers never see a partial file
+        temporary = os.path.join(self.path, f'.{name}.tmp')
+        with open(temporary, 'w') as f:
+            json.dump(data, f)
+        os.replace(temporary, os.path.join(self.path, name))
+
+
+registry = Registry()
+
+# Set by share() in gunicorn workers
+shared = None
+
+REQUESTS = registry.counter(
+    'http_requests_total', 'HTTP requests handled.', ('route', 'method', 'status'))
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', 'Time spent in the request handler.', ('route', 'method', 'status'))
+RESPONSE_SIZE = registry.histogram(
+    'http_response_size_bytes', 'Size of non-streamed response bodies.', ('route', 'method', 'status'),
+    buckets=SIZE_BUCKETS)
+QUERY_DURATION = registry.histogram(
+    'db_query_duration_seconds', 'Time spent in cursor.execute per statement.', ('route',))
+ROWS_FETCHED = registry.counter(
+    'db_rows_fetched_total', 'Rows read from result sets.', ('route',))
+POOL_WAIT = registry.histogram(
+    'db_pool_wait_seconds', 'Time spent checking out a pooled connection.', ('route',))
+
+
+def current_route():
+    """URL rule of the current request, used as the route label"""
+    if not has_request_context():
+        return 'none'
+    if request.url_rule is None:
+        # Unmatched paths share one label so 404s cannot inflate the series count
+        return 'unmatched'
+    return request.url_rule.rule
+
+
+def observe_pool_wait(seconds):
+    POOL_WAIT.observe((current_route(),), seconds)
+
+
+def observe_query(seconds):
+    QUERY_DURATION.observe((current_route(),), seconds)
+
+
+def count_rows(rows):
+    ROWS_FETCHED.inc((current_route(),), rows)
+
+
+class MeteredDictCursor(pymysql.cursors.DictCursor):
+    """DictCursor that records statement time and result rows for the current route."""
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        rows = 0
+        try:
+            result = super().execute(query, args)
+            if self.description is not None:
+                # Buffered cursors read the whole result set during execute
+                rows = self.rowcount
+            return result
+        finally:
+            observe_query(time.perf_counter() - started)
+            if rows:
+                count_rows(rows)
+
+
+class MeteredSSDictCursor(pymysql.cursors.SSDictCursor):
+    """Unbuffered SSDictCursor that records statement time, and rows read once closed."""
+
+    _rows_read = 0
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            observe_query(time.perf_counter() - started)
+
+    def read_next(self):
+        row = super().read_next()
+        if row is not None:
+            self._rows_read += 1
+        return row
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            if self._rows_read:
+                count_rows(self._rows_read)
+                self._rows_read = 0
+
+
+def init_app(app):
+    """Record count, latency and response size of every request handled by ``app``."""
+
+    @app.before_request
+    def start_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            labels = (current_route(), request.method, str(response.status_code))
+            REQUESTS.inc(labels)
+            REQUEST_DURATION.observe(labels, time.perf_counter() - started)
+            if not response.is_streamed and response.content_length is not None:
+                RESPONSE_SIZE.observe(labels, response.content_length)
+        return response
+
+
+def share(path, interval=5):
+    """Report the metrics of every worker sharing ``path`` from /metrics; call in each worker after the fork"""
+    global shared
+    shared = SharedDirectory(registry, path, interval)
+    shared.start()
+
+
+def render():
+    """Response with every metric in the Prometheus text format.
+
+    Covers this process, plus the other workers once share() was called.
+    """
+    snapshots = shared.snapshots() if shared is not None else ()
+    return Response(registry.render(snapshots), mimetype='text/plain; version=0.0.4')
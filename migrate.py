@@ -0,0 +1,235 @@
+"""数据库迁移：按版本号顺序执行 migrations.py 中尚未执行的迁移
+
+取代原来的 init_db.py、fix_database.py 和 update_db.py。已执行的版本记录在
+schema_migrations 表中，重复执行只会执行新增的迁移：
+
+    python migrate.py              # 执行全部未执行的迁移
+    python migrate.py --status     # 列出各迁移的状态
+    python migrate.py --to 5       # 只迁移到第 5 版
+
+STORAGE_BACKEND=sqlite 和 SQLITE_PATH 选择内嵌 SQLite 数据库，与 app.py 相同。
+MySQL 上的索引在线建立（ALGORITHM=INPLACE, LOCK=NONE），建索引期间表仍可读写，
+并每隔几秒报告一次进度。
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import pymysql
+
+import storage
+from migrations import MIGRATIONS
+
+# 数据库连接配置
+db_config = {
+    'host': 'localhost',
+    'user': 'root',
+    'port': 33066,
+    'password': '',
+    'database': 'project'
+}
+
+# 同一时间只允许一个进程执行迁移（MySQL GET_LOCK 的锁名）
+MIGRATION_LOCK = 'schema_migrations'
+
+# 建索引时报告进度的间隔（秒）
+PROGRESS_INTERVAL = 5
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT NOT NULL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    duration_ms INT NOT NULL
+)
+"""
+
+
+def get_connection(**options):
+    """连接到数据库，options 会传给 pymysql.connect（如 local_infile=True）"""
+    return pymysql.connect(
+        host=db_config['host'],
+        user=db_config['user'],
+        password=db_config['password'],
+        port=db_config['port'],
+        database=db_config['database'],
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor,
+        ssl={'fake': True},
+        **options
+    )
+
+
+class MigrationContext:
+    """迁移步骤使用的连接、游标和输出"""
+
+    def __init__(self, connection, backend, log=print, progress_interval=PROGRESS_INTERVAL):
+        self.connection = connection
+        self.backend = backend
+        self.cursor = connection.cursor()
+        self.progress_interval = progress_interval
+        self._log = log
+
+    def log(self, message):
+        if self._log:
+            self._log(message)
+
+    def execute(self, sql):
+        self.cursor.execute(sql)
+
+    def columns(self, table):
+        return self.backend.table_columns(self.cursor, table)
+
+    def indexes(self, table):
+        return self.backend.table_indexes(self.cursor, table)
+
+    def run_ddl(self, sql):
+        """执行耗时的 DDL，执行期间用另一个连接查询 performance_schema 报告进度"""
+        connection_id = self.backend.connection_id(self.connection)
+        if connection_id is None:
+            self.execute(sql)
+            return
+
+        errors = []
+
+        def run():
+            try:
+                self.execute(sql)
+            except Exception as e:
+                errors.append(e)
+
+        monitor = self.backend.connect()
+        try:
+            monitor_cursor = monitor.cursor()
+            tracked = self.backend.enable_ddl_progress(monitor_cursor)
+            started = time.monotonic()
+            worker = threading.Thread(target=run, daemon=True)
+            worker.start()
+            while True:
+                worker.join(self.progress_interval)
+                if not worker.is_alive():
+                    break
+                self.log(f"    {self._progress(monitor_cursor, connection_id, tracked, started)}")
+        finally:
+            monitor.close()
+
+        if errors:
+            raise errors[0]
+
+    def _progress(self, cursor, connection_id, tracked, started):
+        elapsed = f"已用 {time.monotonic() - started:.0f} 秒"
+        progress = self.backend.ddl_progress(cursor, connection_id) if tracked else None
+        if progress is None:
+            return f"执行中，{elapsed}"
+        stage, completed, estimated = progress
+        stage = stage.rsplit('/', 1)[-1]
+        if not estimated:
+            return f"{stage}，{elapsed}"
+        return f"{min(completed / estimated, 1):.0%}（{stage}），{elapsed}"
+
+
+def applied_versions(cursor):
+    """已执行的迁移版本 {版本号: 执行时间}，第一次执行时建立 schema_migrations 表"""
+    cursor.execute(SCHEMA_MIGRATIONS_SQL)
+    cursor.execute("SELECT version, applied_at FROM schema_migrations")
+    return {row['version']: row['applied_at'] for row in cursor.fetchall()}
+
+
+def pending_migrations(connection, backend, target=None):
+    """尚未执行的迁移，按版本号排序；target 为最高执行到的版本"""
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor)
+        connection.commit()
+    finally:
+        cursor.close()
+    return [
+        migration for migration in MIGRATIONS
+        if migration.version not in applied and (target is None or migration.version <= target)
+    ]
+
+
+def migrate(connection, backend, target=None, log=print, progress_interval=PROGRESS_INTERVAL):
+    """执行尚未执行的迁移，返回执行了的迁移列表
+
+    每个迁移的步骤执行完后才记录版本号，失败时抛出异常，下次从该迁移的第一步重新执行。
+    """
+    context = MigrationContext(connection, backend, log=log, progress_interval=progress_interval)
+    cursor = context.cursor
+    if not backend.try_lock(cursor, MIGRATION_LOCK):
+        cursor.close()
+        raise RuntimeError("另一个进程正在执行迁移")
+
+    applied = []
+    try:
+        for migration in pending_migrations(connection, backend, target):
+            context.log(f"迁移 {migration.version}: {migration.name}")
+            started = time.monotonic()
+            for step in migration.steps:
+                context.log(f"  {step.description}")
+                step.apply(context)
+            duration_ms = int((time.monotonic() - started) * 1000)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s)",
+                (migration.version, migration.name, duration_ms)
+            )
+            connection.commit()
+            context.log(f"  完成，耗时 {duration_ms} 毫秒")
+            applied.append(migration)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        backend.release_lock(cursor, MIGRATION_LOCK)
+        cursor.close()
+    return applied
+
+
+def print_status(connection):
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor)
+        connection.commit()
+    finally:
+        cursor.close()
+    for migration in MIGRATIONS:
+        state = f"已执行 {applied[migration.version]}" if migration.version in applied else "未执行"
+        print(f"{migration.version:>4}  {migration.name:<28} {state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='执行数据库迁移')
+    parser.add_argument('--status', action='store_true', help='只列出各迁移的状态')
+    parser.add_argument('--to', type=int, dest='target', help='最高执行到的版本号')
+    args = parser.parse_args()
+
+    backend = storage.create_backend(
+        os.environ.get('STORAGE_BACKEND', 'mysql'), db_config=db_config,
+        sqlite_path=os.environ.get('SQLITE_PATH', ':memory:')
+    )
+    if getattr(backend, 'path', None) == ':memory:':
+        print("内存 SQLite 数据库由 app.py 启动时自动迁移，请用 SQLITE_PATH 指定数据库文件")
+        return 0
+
+    connection = backend.connect()
+    try:
+        if args.status:
+            print_status(connection)
+            return 0
+        applied = migrate(connection, backend, target=args.target)
+        if applied:
+            print(f"数据库迁移成功！共执行 {len(applied)} 个迁移")
+        else:
+            print("数据库已是最新版本")
+        return 0
+    except Exception as e:
+        print(f"数据库迁移失败: {str(e)}")
+        return 1
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,698 @@
+"""数据库结构迁移，由 migrate.py 按版本号顺序执行
+
+每个迁移是一组步骤，步骤里分别写好 MySQL 和内嵌 SQLite 的语句。MySQL 的 DDL
+执行即提交，迁移中途失败时会从第一步重新执行，所以每一步都可以重复执行：
+建表用 IF NOT EXISTS，已存在的列和索引会跳过，数据修正以所依赖的列或索引为条件。
+
+修改表结构时在末尾追加一个版本号加一的 Migration，不要修改已发布的迁移。
+"""
+import rollups
+
+
+class Migration:
+    def __init__(self, version, name, steps):
+        self.version = version
+        self.name = name
+        self.steps = steps
+
+
+def engine_sql(context, mysql, sqlite):
+    return mysql if context.backend.name == 'mysql' else sqlite
+
+
+class CreateTable:
+    """建表（IF NOT EXISTS）"""
+
+    def __init__(self, table, mysql, sqlite):
+        self.description = f"建表 {table}"
+        self.mysql = mysql
+        self.sqlite = sqlite
+
+    def apply(self, context):
+        context.execute(engine_sql(context, self.mysql, self.sqlite))
+
+
+class AddColumn:
+    """为旧表补充列，列已存在时跳过"""
+
+    def __init__(self, table, column, definition):
+        self.description = f"添加列 {table}.{column}"
+        self.table = table
+        self.column = column
+        self.definition = definition
+
+    def apply(self, context):
+        if self.column in context.columns(self.table):
+            context.log("    已存在，跳过")
+            return
+        context.execute(f"ALTER TABLE {self.table} ADD COLUMN {self.column} {self.definition}")
+
+
+class AddIndex:
+    """添加索引，索引已存在时跳过；MySQL 上在线建立（ALGORITHM=INPLACE, LOCK=NONE）并报告进度"""
+
+    def __init__(self, table, name, columns, unique=False):
+        self.description = f"添加索引 {table}.{name} ({', '.join(columns)})"
+        self.table = table
+        self.name = name
+        self.columns = columns
+        self.unique = unique
+
+    def apply(self, context):
+        if self.name in context.indexes(self.table):
+            context.log("    已存在，跳过")
+            return
+        context.run_ddl(context.backend.add_index(self.table, self.name, self.columns, self.unique))
+
+
+class Sql:
+    """执行一条语句；某个引擎的语句为 None 时跳过
+
+    if_column=(表, 列) 时只在该列存在时执行，unless_index=(表, 索引) 时只在该索引不存在时执行。
+    """
+
+    def __init__(self, description, mysql=None, sqlite=None, if_column=None, unless_index=None):
+        self.description = description
+        self.mysql = mysql
+        self.sqlite = sqlite
+        self.if_column = if_column
+        self.unless_index = unless_index
+
+    def apply(self, context):
+        sql = engine_sql(context, self.mysql, self.sqlite)
+        if sql is None:
+            context.log("    此数据库引擎不需要，跳过")
+            return
+        if self.if_column and self.if_column[1] not in context.columns(self.if_column[0]):
+            context.log(f"    没有 {'.'.join(self.if_column)} 列，跳过")
+            return
+        if self.unless_index and self.unless_index[1] in context.indexes(self.unless_index[0]):
+            context.log(f"    已有索引 {'.'.join(self.unless_index)}，跳过")
+            return
+        context.execute(sql)
+
+
+class Run:
+    """调用 function(connection, backend)，如从原始数据重建汇总表"""
+
+    def __init__(self, description, function):
+        self.description = description
+        self.function = function
+
+    def apply(self, context):
+        context.connection.commit()
+        self.function(context.connection, context.backend)
+
+
+MIGRATIONS = [
+    Migration(1, 'base_tables', [
+        CreateTable('grades', """
+        CREATE TABLE IF NOT EXISTS grades (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            date DATE NOT NULL,
+            course VARCHAR(100) NOT NULL,
+            course_id VARCHAR(50) NOT NULL,
+            type ENUM('quiz', 'exam', 'assignment', 'homework') NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            student VARCHAR(100) NOT NULL,
+            student_id INT NOT NULL,
+            score INT NOT NULL,
+            max_score INT NOT NULL,
+            feedback TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS grades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATE NOT NULL,
+            course VARCHAR(100) NOT NULL,
+            course_id VARCHAR(50) NOT NULL,
+            type VARCHAR(20) NOT NULL CHECK (type IN ('quiz', 'exam', 'assignment', 'homework')),
+            title VARCHAR(255) NOT NULL,
+            student VARCHAR(100) NOT NULL,
+            student_id INT NOT NULL,
+            score INT NOT NULL,
+            max_score INT NOT NULL,
+            feedback TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """),
+        # 学生表保留 init_db.sql 的旧字段，/course-students 和 /enroll 仍在使用（MySQL 上由迁移 10 添加）
+        CreateTable('students', """
+        CREATE TABLE IF NOT EXISTS students (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            first_name VARCHAR(100) NOT NULL,
+            last_name VARCHAR(100) NOT NULL,
+            date_of_birth DATE NOT NULL,
+            id_number VARCHAR(50) NOT NULL,
+            id_type VARCHAR(20) NOT NULL,
+            grade VARCHAR(20) NOT NULL,
+            location VARCHAR(100) NOT NULL,
+            parent_name VARCHAR(100) NOT NULL,
+            parent_email VARCHAR(100) NOT NULL,
+            parent_phone VARCHAR(20) NOT NULL,
+            parent_id_number VARCHAR(50) NOT NULL,
+            parent_id_type VARCHAR(20) NOT NULL,
+            address TEXT,
+            emergency_contact VARCHAR(20) NOT NULL,
+            medical_info TEXT,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name VARCHAR(100) NOT NULL,
+            last_name VARCHAR(100) NOT NULL,
+            date_of_birth DATE NOT NULL,
+            id_number VARCHAR(50) NOT NULL,
+            id_type VARCHAR(20) NOT NULL,
+            grade VARCHAR(20) NOT NULL,
+            location VARCHAR(100) NOT NULL,
+            parent_name VARCHAR(100) NOT NULL,
+            parent_email VARCHAR(100) NOT NULL,
+            parent_phone VARCHAR(20) NOT NULL,
+            parent_id_number VARCHAR(50) NOT NULL,
+            parent_id_type VARCHAR(20) NOT NULL,
+            address TEXT,
+            emergency_contact VARCHAR(20) NOT NULL,
+            medical_info TEXT,
+            notes TEXT,
+            name VARCHAR(100),
+            age INT,
+            parent VARCHAR(100),
+            contact VARCHAR(100),
+            course_id INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """),
+        CreateTable('attendance', """
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            date DATE NOT NULL,
+            course_id VARCHAR(50) NOT NULL,
+            course_name VARCHAR(100) NOT NULL,
+            student_id VARCHAR(50) NOT NULL,
+            student_name VARCHAR(100) NOT NULL,
+            status ENUM('present', 'absent', 'late') NOT NULL,
+            arrival_time VARCHAR(20),
+            leaving_time VARCHAR(20),
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_attendance (date, course_id, student_id)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATE NOT NULL,
+            course_id VARCHAR(50) NOT NULL,
+            course_name VARCHAR(100) NOT NULL,
+            student_id VARCHAR(50) NOT NULL,
+            student_name VARCHAR(100) NOT NULL,
+            status VARCHAR(10) NOT NULL CHECK (status IN ('present', 'absent', 'late')),
+            arrival_time VARCHAR(20),
+            leaving_time VARCHAR(20),
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """),
+        CreateTable('teachers', """
+        CREATE TABLE IF NOT EXISTS teachers (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            first_name VARCHAR(100) NOT NULL,
+            last_name VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            phone VARCHAR(20) NOT NULL,
+            id_number VARCHAR(50) NOT NULL,
+            id_type VARCHAR(20) NOT NULL,
+            location VARCHAR(100) NOT NULL,
+            qualifications VARCHAR(255) NOT NULL,
+            experience VARCHAR(50) NOT NULL,
+            join_date DATE NOT NULL,
+            languages VARCHAR(255) NOT NULL,
+            bio TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS teachers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name VARCHAR(100) NOT NULL,
+            last_name VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            phone VARCHAR(20) NOT NULL,
+            id_number VARCHAR(50) NOT NULL,
+            id_type VARCHAR(20) NOT NULL,
+            location VARCHAR(100) NOT NULL,
+            qualifications VARCHAR(255) NOT NULL,
+            experience VARCHAR(50) NOT NULL,
+            join_date DATE NOT NULL,
+            languages VARCHAR(255) NOT NULL,
+            bio TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """),
+        CreateTable('courses', """
+        CREATE TABLE IF NOT EXISTS courses (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            level VARCHAR(50) NOT NULL,
+            age_range VARCHAR(50) NOT NULL,
+            location VARCHAR(100) NOT NULL,
+            schedule VARCHAR(100) NOT NULL,
+            time VARCHAR(100) NOT NULL,
+            teacher VARCHAR(100) NOT NULL,
+            max_students INT NOT NULL,
+            fee VARCHAR(50) NOT NULL,
+            description TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL,
+            level VARCHAR(50) NOT NULL,
+            age_range VARCHAR(50) NOT NULL,
+            location VARCHAR(100) NOT NULL,
+            schedule VARCHAR(100) NOT NULL,
+            time VARCHAR(100) NOT NULL,
+            teacher VARCHAR(100) NOT NULL,
+            max_students INT NOT NULL,
+            fee VARCHAR(50) NOT NULL,
+            description TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """),
+        CreateTable('enrollments', """
+        CREATE TABLE IF NOT EXISTS enrollments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            parent_id INT NOT NULL,
+            course_id INT NOT NULL,
+            student_id INT,
+            enrollment_date DATE DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(20) DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS enrollments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            parent_id INT NOT NULL,
+            course_id INT NOT NULL,
+            student_id INT,
+            enrollment_date DATE DEFAULT CURRENT_DATE,
+            status VARCHAR(20) DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
+        )
+        """),
+        CreateTable('student_course', """
+        CREATE TABLE IF NOT EXISTS student_course (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            student_id INT NOT NULL,
+            course_id INT NOT NULL,
+            enrollment_date DATE DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(20) DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+            FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
+            UNIQUE KEY unique_student_course (student_id, course_id)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS student_course (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INT NOT NULL,
+            course_id INT NOT NULL,
+            enrollment_date DATE DEFAULT CURRENT_DATE,
+            status VARCHAR(20) DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE,
+            FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
+        )
+        """),
+        AddIndex('student_course', 'unique_student_course', ('student_id', 'course_id'), unique=True),
+        CreateTable('teacher_course', """
+        CREATE TABLE IF NOT EXISTS teacher_course (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            teacher_id INT NOT NULL,
+            course_id INT NOT NULL,
+            status VARCHAR(20) DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (teacher_id) REFERENCES teachers(id) ON DELETE CASCADE,
+            FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE,
+            UNIQUE KEY unique_teacher_course (teacher_id, course_id)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS teacher_course (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            teacher_id INT NOT NULL,
+            course_id INT NOT NULL,
+            status VARCHAR(20) DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (teacher_id) REFERENCES teachers(id) ON DELETE CASCADE,
+            FOREIGN KEY (course_id) REFERENCES courses(id) ON DELETE CASCADE
+        )
+        """),
+        AddIndex('teacher_course', 'unique_teacher_course', ('teacher_id', 'course_id'), unique=True),
+        # 各表的变更计数，用于 ETag 和查询缓存失效
+        CreateTable('table_versions', """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name VARCHAR(64) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name VARCHAR(64) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """),
+        # 注册和登录使用的账号表
+        CreateTable('parent', """
+        CREATE TABLE IF NOT EXISTS parent (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            First_Name VARCHAR(100) NOT NULL,
+            Last_Name VARCHAR(100) NOT NULL,
+            Email_Address VARCHAR(100) NOT NULL,
+            Password VARCHAR(255) NOT NULL,
+            Child_Name VARCHAR(100),
+            Child_Age INT
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS parent (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            First_Name VARCHAR(100) NOT NULL,
+            Last_Name VARCHAR(100) NOT NULL,
+            Email_Address VARCHAR(100) NOT NULL,
+            Password VARCHAR(255) NOT NULL,
+            Child_Name VARCHAR(100),
+            Child_Age INT
+        )
+        """),
+        CreateTable('teacher', """
+        CREATE TABLE IF NOT EXISTS teacher (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            First_Name VARCHAR(100) NOT NULL,
+            Last_Name VARCHAR(100) NOT NULL,
+            Email_Address VARCHAR(100) NOT NULL,
+            Password VARCHAR(255) NOT NULL,
+            Subject VARCHAR(100),
+            Experience VARCHAR(50)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS teacher (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            First_Name VARCHAR(100) NOT NULL,
+            Last_Name VARCHAR(100) NOT NULL,
+            Email_Address VARCHAR(100) NOT NULL,
+            Password VARCHAR(255) NOT NULL,
+            Subject VARCHAR(100),
+            Experience VARCHAR(50)
+        )
+        """),
+        CreateTable('admin', """
+        CREATE TABLE IF NOT EXISTS admin (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            First_Name VARCHAR(100) NOT NULL,
+            Last_Name VARCHAR(100) NOT NULL,
+            Email_Address VARCHAR(100) NOT NULL,
+            Password VARCHAR(255) NOT NULL
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS admin (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            First_Name VARCHAR(100) NOT NULL,
+            Last_Name VARCHAR(100) NOT NULL,
+            Email_Address VARCHAR(100) NOT NULL,
+            Password VARCHAR(255) NOT NULL
+        )
+        """),
+    ]),
+
+    # 由旧 init_db.py 建立的数据库（原 fix_database.sql、update_db.sql 的结构部分）：
+    # 补齐课程、学生、报名表的新字段，并把逗号分隔的 courses 字段迁到关联表
+    Migration(2, 'legacy_columns', [
+        AddColumn('courses', 'level', "VARCHAR(50) DEFAULT 'Intermediate'"),
+        AddColumn('courses', 'age_range', "VARCHAR(50) DEFAULT '6-10 years'"),
+        AddColumn('courses', 'teacher', "VARCHAR(100) DEFAULT ''"),
+        AddColumn('courses', 'max_students', "INT DEFAULT 15"),
+        AddColumn('courses', 'fee', "VARCHAR(50) DEFAULT ''"),
+        AddColumn('courses', 'description', "TEXT"),
+        AddColumn('courses', 'created_at', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        AddColumn('students', 'first_name', "VARCHAR(100)"),
+        AddColumn('students', 'last_name', "VARCHAR(100)"),
+        AddColumn('students', 'date_of_birth', "DATE"),
+        AddColumn('students', 'id_number', "VARCHAR(50)"),
+        AddColumn('students', 'id_type', "VARCHAR(20)"),
+        AddColumn('students', 'grade', "VARCHAR(20)"),
+        AddColumn('students', 'location', "VARCHAR(100)"),
+        AddColumn('students', 'parent_name', "VARCHAR(100)"),
+        AddColumn('students', 'parent_email', "VARCHAR(100)"),
+        AddColumn('students', 'parent_phone', "VARCHAR(20)"),
+        AddColumn('students', 'parent_id_number', "VARCHAR(50)"),
+        AddColumn('students', 'parent_id_type', "VARCHAR(20)"),
+        AddColumn('students', 'address', "TEXT"),
+        AddColumn('students', 'emergency_contact', "VARCHAR(20)"),
+        AddColumn('students', 'medical_info', "TEXT"),
+        AddColumn('students', 'notes', "TEXT"),
+        AddColumn('students', 'created_at', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        AddColumn('enrollments', 'student_id', "INT"),
+        Sql("从旧字段（name、age、parent、contact）填充学生的新字段", mysql="""
+        UPDATE students SET
+            first_name = SUBSTRING_INDEX(name, ' ', 1),
+            last_name = SUBSTRING_INDEX(name, ' ', -1),
+            date_of_birth = DATE_SUB(CURRENT_DATE, INTERVAL age YEAR),
+            id_number = CONCAT('S', id),
+            id_type = 'HKID',
+            grade = CONCAT('Grade ', GREATEST(age - 5, 1)),
+            location = '',
+            parent_name = parent,
+            parent_email = CONCAT(LOWER(REPLACE(parent, ' ', '.')), '@example.com'),
+            parent_phone = contact,
+            parent_id_number = CONCAT('P', id),
+            parent_id_type = 'HKID',
+            emergency_contact = contact
+        WHERE first_name IS NULL
+        """, if_column=('students', 'name')),
+        Sql("将 students.courses 逗号分隔字段（课程ID或名称）回填到 student_course", mysql="""
+        INSERT IGNORE INTO student_course (student_id, course_id, status)
+        SELECT s.id, c.id, 'active'
+        FROM students s
+        JOIN courses c ON FIND_IN_SET(c.id, s.courses) OR FIND_IN_SET(c.name, s.courses)
+        WHERE s.courses IS NOT NULL AND s.courses <> ''
+        """, if_column=('students', 'courses')),
+        Sql("将 teachers.courses 逗号分隔字段回填到 teacher_course", mysql="""
+        INSERT IGNORE INTO teacher_course (teacher_id, course_id, status)
+        SELECT t.id, c.id, 'active'
+        FROM teachers t
+        JOIN courses c ON FIND_IN_SET(c.id, t.courses) OR FIND_IN_SET(c.name, t.courses)
+        WHERE t.courses IS NOT NULL AND t.courses <> ''
+        """, if_column=('teachers', 'courses')),
+        # 旧的逗号分隔字段不再写入，保留数据但允许为空
+        Sql("允许 students.courses 为空", mysql="ALTER TABLE students MODIFY COLUMN courses TEXT NULL",
+            if_column=('students', 'courses')),
+        Sql("允许 teachers.courses 为空", mysql="ALTER TABLE teachers MODIFY COLUMN courses TEXT NULL",
+            if_column=('teachers', 'courses')),
+    ]),
+
+    # 删除同一学生、课程、日期的重复考勤（保留最新一条），再添加唯一键，POST /attendance 依赖它做 upsert
+    Migration(3, 'attendance_unique_key', [
+        Sql("删除重复考勤记录", mysql="""
+        DELETE a1 FROM attendance a1
+        JOIN attendance a2
+            ON a1.date = a2.date
+            AND a1.course_id = a2.course_id
+            AND a1.student_id = a2.student_id
+            AND a1.id < a2.id
+        """, sqlite="""
+        DELETE FROM attendance WHERE id NOT IN (
+            SELECT MAX(id) FROM attendance GROUP BY date, course_id, student_id
+        )
+        """, unless_index=('attendance', 'unique_attendance')),
+        AddIndex('attendance', 'unique_attendance', ('date', 'course_id', 'student_id'), unique=True),
+    ]),
+
+    # "课程 X 有哪些学生/教师"走索引
+    Migration(4, 'link_table_indexes', [
+        AddIndex('student_course', 'idx_student_course_course', ('course_id', 'status', 'student_id')),
+        AddIndex('teacher_course', 'idx_teacher_course_course', ('course_id', 'status', 'teacher_id')),
+    ]),
+
+    # GET /grades 的服务端过滤、排序与游标分页
+    Migration(5, 'grades_list_indexes', [
+        AddIndex('grades', 'idx_grades_date_id', ('date', 'id')),
+        AddIndex('grades', 'idx_grades_course_type_date', ('course_id', 'type', 'date', 'id')),
+        AddIndex('grades', 'idx_grades_student_date', ('student_id', 'date', 'id')),
+        AddIndex('grades', 'idx_grades_student_name', ('student', 'date')),
+        AddIndex('grades', 'idx_grades_score_id', ('score', 'id')),
+        AddIndex('grades', 'idx_grades_course_score', ('course_id', 'score', 'id')),
+    ]),
+
+    # GET /students 按年级、校区过滤的游标分页
+    Migration(6, 'students_list_indexes', [
+        AddIndex('students', 'idx_students_grade_id', ('grade', 'id')),
+        AddIndex('students', 'idx_students_location_id', ('location', 'id')),
+    ]),
+
+    # 成绩汇总：分数直方图（GET /grade-stats）、加权总评（GET /final-grades）和课程成绩权重，见 rollups.py
+    Migration(7, 'grade_rollups', [
+        CreateTable('grade_course_buckets', """
+        CREATE TABLE IF NOT EXISTS grade_course_buckets (
+            course_id VARCHAR(50) NOT NULL,
+            type ENUM('quiz', 'exam', 'assignment', 'homework') NOT NULL,
+            bucket TINYINT UNSIGNED NOT NULL,
+            grade_count INT NOT NULL DEFAULT 0,
+            ratio_sum DOUBLE NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, type, bucket)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS grade_course_buckets (
+            course_id VARCHAR(50) NOT NULL,
+            type VARCHAR(20) NOT NULL CHECK (type IN ('quiz', 'exam', 'assignment', 'homework')),
+            bucket INT NOT NULL,
+            grade_count INT NOT NULL DEFAULT 0,
+            ratio_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, type, bucket)
+        )
+        """),
+        CreateTable('grade_student_buckets', """
+        CREATE TABLE IF NOT EXISTS grade_student_buckets (
+            student_id INT NOT NULL,
+            course_id VARCHAR(50) NOT NULL,
+            type ENUM('quiz', 'exam', 'assignment', 'homework') NOT NULL,
+            bucket TINYINT UNSIGNED NOT NULL,
+            grade_count INT NOT NULL DEFAULT 0,
+            ratio_sum DOUBLE NOT NULL DEFAULT 0,
+            PRIMARY KEY (student_id, course_id, type, bucket),
+            KEY idx_grade_student_buckets_course (course_id, student_id)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS grade_student_buckets (
+            student_id INT NOT NULL,
+            course_id VARCHAR(50) NOT NULL,
+            type VARCHAR(20) NOT NULL CHECK (type IN ('quiz', 'exam', 'assignment', 'homework')),
+            bucket INT NOT NULL,
+            grade_count INT NOT NULL DEFAULT 0,
+            ratio_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (student_id, course_id, type, bucket)
+        )
+        """),
+        AddIndex('grade_student_buckets', 'idx_grade_student_buckets_course', ('course_id', 'student_id')),
+        CreateTable('student_grade_totals', """
+        CREATE TABLE IF NOT EXISTS student_grade_totals (
+            student_id INT NOT NULL,
+            course_id VARCHAR(50) NOT NULL,
+            quiz_grade_count INT NOT NULL DEFAULT 0,
+            quiz_ratio_sum DOUBLE NOT NULL DEFAULT 0,
+            exam_grade_count INT NOT NULL DEFAULT 0,
+            exam_ratio_sum DOUBLE NOT NULL DEFAULT 0,
+            assignment_grade_count INT NOT NULL DEFAULT 0,
+            assignment_ratio_sum DOUBLE NOT NULL DEFAULT 0,
+            homework_grade_count INT NOT NULL DEFAULT 0,
+            homework_ratio_sum DOUBLE NOT NULL DEFAULT 0,
+            PRIMARY KEY (student_id, course_id),
+            KEY idx_student_grade_totals_course (course_id, student_id)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS student_grade_totals (
+            student_id INT NOT NULL,
+            course_id VARCHAR(50) NOT NULL,
+            quiz_grade_count INT NOT NULL DEFAULT 0,
+            quiz_ratio_sum REAL NOT NULL DEFAULT 0,
+            exam_grade_count INT NOT NULL DEFAULT 0,
+            exam_ratio_sum REAL NOT NULL DEFAULT 0,
+            assignment_grade_count INT NOT NULL DEFAULT 0,
+            assignment_ratio_sum REAL NOT NULL DEFAULT 0,
+            homework_grade_count INT NOT NULL DEFAULT 0,
+            homework_ratio_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (student_id, course_id)
+        )
+        """),
+        AddIndex('student_grade_totals', 'idx_student_grade_totals_course', ('course_id', 'student_id')),
+        # 没有记录的课程使用 app.py 中的 grade_weight_config
+        CreateTable('course_grade_weights', """
+        CREATE TABLE IF NOT EXISTS course_grade_weights (
+            course_id VARCHAR(50) NOT NULL,
+            type ENUM('quiz', 'exam', 'assignment', 'homework') NOT NULL,
+            weight DECIMAL(7,2) NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (course_id, type)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS course_grade_weights (
+            course_id VARCHAR(50) NOT NULL,
+            type VARCHAR(20) NOT NULL CHECK (type IN ('quiz', 'exam', 'assignment', 'homework')),
+            weight DECIMAL(7,2) NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (course_id, type)
+        )
+        """),
+        Run("从现有成绩重建成绩汇总表", rollups.rebuild_grade_rollups),
+    ]),
+
+    # 考勤汇总：每个点名（课程、日期）一行，以及每门课程每个学生每月一行（GET /attendance-rates）
+    Migration(8, 'attendance_rollups', [
+        AddIndex('attendance', 'idx_attendance_student_date', ('student_id', 'date')),
+        CreateTable('attendance_daily', """
+        CREATE TABLE IF NOT EXISTS attendance_daily (
+            course_id VARCHAR(50) NOT NULL,
+            date DATE NOT NULL,
+            present_count INT NOT NULL DEFAULT 0,
+            absent_count INT NOT NULL DEFAULT 0,
+            late_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, date),
+            KEY idx_attendance_daily_date (date)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS attendance_daily (
+            course_id VARCHAR(50) NOT NULL,
+            date DATE NOT NULL,
+            present_count INT NOT NULL DEFAULT 0,
+            absent_count INT NOT NULL DEFAULT 0,
+            late_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, date)
+        )
+        """),
+        AddIndex('attendance_daily', 'idx_attendance_daily_date', ('date',)),
+        CreateTable('attendance_monthly', """
+        CREATE TABLE IF NOT EXISTS attendance_monthly (
+            course_id VARCHAR(50) NOT NULL,
+            student_id VARCHAR(50) NOT NULL,
+            month DATE NOT NULL,
+            present_count INT NOT NULL DEFAULT 0,
+            absent_count INT NOT NULL DEFAULT 0,
+            late_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, student_id, month),
+            KEY idx_attendance_monthly_student (student_id, month)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS attendance_monthly (
+            course_id VARCHAR(50) NOT NULL,
+            student_id VARCHAR(50) NOT NULL,
+            month DATE NOT NULL,
+            present_count INT NOT NULL DEFAULT 0,
+            absent_count INT NOT NULL DEFAULT 0,
+            late_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (course_id, student_id, month)
+        )
+        """),
+        AddIndex('attendance_monthly', 'idx_attendance_monthly_student', ('student_id', 'month')),
+        Run("从现有考勤重建考勤汇总表", rollups.rebuild_attendance_rollups),
+    ]),
+
+    # GET /attendance 按课程、按状态过滤时用索引并按日期排序，用 python check_query_plans.py 检查
+    Migration(9, 'attendance_filter_indexes', [
+        AddIndex('attendance', 'idx_attendance_course_date', ('course_id', 'date')),
+        AddIndex('attendance', 'idx_attendance_status_date', ('status', 'date')),
+    ]),
+
+    # 迁移 1 在 MySQL 上漏建了 init_db.sql 的学生旧字段，/course-students 和 /enroll 仍在使用
+    # （SQLite 已有，跳过）
+    Migration(10, 'students_legacy_columns', [
+        AddColumn('students', 'name', "VARCHAR(100)"),
+        AddColumn('students', 'age', "INT"),
+        AddColumn('students', 'parent', "VARCHAR(100)"),
+        AddColumn('students', 'contact', "VARCHAR(100)"),
+        AddColumn('students', 'course_id', "INT"),
+    ]),
+]
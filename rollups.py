@@ -0,0 +1,406 @@
+"""Rollup tables kept up to date by the write routes.
+
+Grade statistics are read from per-course and per-student score histograms
+(grade_course_buckets, grade_student_buckets) instead of the grades table,
+so their cost depends on the number of buckets, not on the number of
+grades. Each grade falls into one of 101 buckets by its score as a whole
+percentage of max_score; the exact score/max_score ratio is summed next to
+the count so means are exact.
+
+Final grades are read from student_grade_totals, one row per (student,
+course) holding the grade count and ratio sum of each grade type. The
+weighted average is applied when reading, so changing a course's weights
+(course_grade_weights) takes effect without a rebuild.
+
+Attendance rates are read from attendance_daily, one row per register
+(course and date), and attendance_monthly, one row per course, student and
+month, each counting present, absent and late marks. Resubmitting a
+register moves marks between the counts instead of adding them again.
+
+The write routes add to the rollups in the same transaction as the raw
+rows. Rows loaded around the API (seed_data.py, manual imports) are picked
+up by rebuilding:
+
+    python rollups.py
+"""
+import math
+from datetime import date, timedelta
+
+# Assessment types, in the order of the grades.type ENUM
+GRADE_TYPES = ('quiz', 'exam', 'assignment', 'homework')
+
+# Attendance statuses, in the order of the attendance.status ENUM
+ATTENDANCE_STATUSES = ('present', 'absent', 'late')
+
+# Histogram buckets: whole percentages 0..100; scores above max_score count as 100
+TOP_BUCKET = 100
+
+# Percentiles reported by bucket_stats()
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Width in percentage points of the histogram bins reported by bucket_stats()
+HISTOGRAM_BIN_WIDTH = 10
+
+# Rollup rows per upsert statement
+ROLLUP_CHUNK_SIZE = 500
+
+COURSE_BUCKET_KEY = ('course_id', 'type', 'bucket')
+STUDENT_BUCKET_KEY = ('student_id', 'course_id', 'type', 'bucket')
+BUCKET_TOTALS = ('grade_count', 'ratio_sum')
+FINAL_GRADE_KEY = ('student_id', 'course_id')
+ATTENDANCE_DAILY_KEY = ('course_id', 'date')
+ATTENDANCE_MONTHLY_KEY = ('course_id', 'student_id', 'month')
+ATTENDANCE_TOTALS = tuple(f"{status}_count" for status in ATTENDANCE_STATUSES)
+FINAL_GRADE_TOTALS = tuple(f"{grade_type}_{total}" for grade_type in GRADE_TYPES for total in BUCKET_TOTALS)
+
+
+def score_bucket(score, max_score):
+    """Bucket of a score: its whole percentage of max_score, clamped to 0..TOP_BUCKET"""
+    if max_score <= 0:
+        return 0
+    return min(TOP_BUCKET, max(0, score * 100 // max_score))
+
+
+def score_ratio(score, max_score):
+    return score / max_score if max_score > 0 else 0.0
+
+
+def grade_rollup_totals(grades):
+    """Sum grades into the totals of every grade rollup.
+
+    ``grades`` yields (course_id, student_id, type, score, max_score, count)
+    tuples and may be a one-pass iterator. Returns three dicts mapping
+    COURSE_BUCKET_KEY and STUDENT_BUCKET_KEY tuples to [grade_count,
+    ratio_sum], and FINAL_GRADE_KEY tuples to lists of FINAL_GRADE_TOTALS.
+    """
+    course_totals = {}
+    student_totals = {}
+    final_totals = {}
+    for course_id, student_id, grade_type, score, max_score, count in grades:
+        score, max_score = int(score), int(max_score)
+        bucket = score_bucket(score, max_score)
+        ratio_sum = score_ratio(score, max_score) * count
+        for totals, key in ((course_totals, (str(course_id), grade_type, bucket)),
+                            (student_totals, (int(student_id), str(course_id), grade_type, bucket))):
+            entry = totals.get(key)
+            if entry is None:
+                totals[key] = [count, ratio_sum]
+            else:
+                entry[0] += count
+                entry[1] += ratio_sum
+
+        key = (int(student_id), str(course_id))
+        entry = final_totals.get(key)
+        if entry is None:
+            entry = final_totals[key] = [0, 0.0] * len(GRADE_TYPES)
+        offset = GRADE_TYPES.index(grade_type) * 2
+        entry[offset] += count
+        entry[offset + 1] += ratio_sum
+    return course_totals, student_totals, final_totals
+
+
+def _total_statements(backend, table, key_columns, total_columns, totals):
+    # Keys are written in primary key order, so concurrent writers lock rows in the same order
+    keys = sorted(totals)
+    for chunk_start in range(0, len(keys), ROLLUP_CHUNK_SIZE):
+        chunk = keys[chunk_start:chunk_start + ROLLUP_CHUNK_SIZE]
+        sql = backend.upsert(table, key_columns + total_columns, key_columns,
+                             increment_columns=total_columns, rows=len(chunk))
+        yield sql, [value for key in chunk for value in key + tuple(totals[key])]
+
+
+def rollup_total_statements(backend, totals):
+    """Yield (sql, params) adding grade_rollup_totals() output to the rollup tables"""
+    course_totals, student_totals, final_totals = totals
+    yield from _total_statements(backend, 'grade_course_buckets', COURSE_BUCKET_KEY, BUCKET_TOTALS, course_totals)
+    yield from _total_statements(backend, 'grade_student_buckets', STUDENT_BUCKET_KEY, BUCKET_TOTALS, student_totals)
+    yield from _total_statements(backend, 'student_grade_totals', FINAL_GRADE_KEY, FINAL_GRADE_TOTALS, final_totals)
+
+
+def grade_rollup_statements(backend, grades):
+    """Yield (sql, params) adding ``grades`` to every grade rollup (see grade_rollup_totals)"""
+    yield from rollup_total_statements(backend, grade_rollup_totals(grades))
+
+
+def bucket_stats(buckets):
+    """Summarize {bucket: (grade_count, ratio_sum)} as percentages of max_score.
+
+    The mean is exact. Percentiles (nearest rank, so the median is p50)
+    are the bucket's whole percentage, and the histogram counts grades in
+    HISTOGRAM_BIN_WIDTH-point bins, the last one including 100.
+    """
+    count = sum(grade_count for grade_count, _ in buckets.values())
+    bin_count = -(-TOP_BUCKET // HISTOGRAM_BIN_WIDTH)
+    histogram = [0] * bin_count
+    for bucket, (grade_count, _) in buckets.items():
+        histogram[min(bucket // HISTOGRAM_BIN_WIDTH, bin_count - 1)] += grade_count
+
+    percentiles = {f"p{p}": None for p in PERCENTILES}
+    mean = None
+    if count:
+        mean = round(sum(ratio_sum for _, ratio_sum in buckets.values()) * 100 / count, 2)
+        ranks = [(f"p{p}", max(1, math.ceil(p * count / 100))) for p in PERCENTILES]
+        seen = 0
+        for bucket in sorted(buckets):
+            seen += buckets[bucket][0]
+            while ranks and ranks[0][1] <= seen:
+                percentiles[ranks.pop(0)[0]] = bucket
+
+    return {
+        'count': count,
+        'mean': mean,
+        'median': percentiles['p50'],
+        'percentiles': percentiles,
+        'histogram': [
+            {'from': i * HISTOGRAM_BIN_WIDTH, 'to': min((i + 1) * HISTOGRAM_BIN_WIDTH, TOP_BUCKET), 'count': n}
+            for i, n in enumerate(histogram)
+        ]
+    }
+
+
+def add_bucket(buckets, bucket, grade_count, ratio_sum):
+    """Add one rollup row's totals into a {bucket: (grade_count, ratio_sum)} dict"""
+    previous_count, previous_sum = buckets.get(bucket, (0, 0.0))
+    buckets[bucket] = (previous_count + int(grade_count), previous_sum + float(ratio_sum))
+
+
+def final_grade(row, weights):
+    """Weighted final grade of one student_grade_totals row.
+
+    ``weights`` maps grade types to relative weights. Each type's mean is
+    weighted, and types without grades (or without weight) are left out,
+    the remaining weights scaling up to fill their share. Returns
+    (final grade as a percentage or None, {type: {count, mean, weight}}).
+    """
+    by_type = {}
+    weighted_sum = 0.0
+    weight_total = 0.0
+    for grade_type in GRADE_TYPES:
+        count = int(row[f"{grade_type}_grade_count"])
+        weight = float(weights.get(grade_type, 0))
+        mean = None
+        if count:
+            mean = float(row[f"{grade_type}_ratio_sum"]) * 100 / count
+            if weight > 0:
+                weighted_sum += weight * mean
+                weight_total += weight
+        by_type[grade_type] = {
+            'count': count,
+            'mean': None if mean is None else round(mean, 2),
+            'weight': weight
+        }
+    final = round(weighted_sum / weight_total, 2) if weight_total else None
+    return final, by_type
+
+
+def rebuild_grade_rollups(connection, backend):
+    """Recompute every grade rollup from the grades table and commit.
+
+    Grades are grouped by score in SQL and read in one streaming pass, so
+    only distinct (course, student, type, score, max_score) combinations
+    reach Python and none are held as a list. Run it while no grades are
+    being written, or writes made during the rebuild are lost.
+    """
+    stream = backend.stream_cursor(connection)
+    try:
+        stream.execute("""
+        SELECT course_id, student_id, type, score, max_score, COUNT(*) AS grade_count
+        FROM grades
+        GROUP BY course_id, student_id, type, score, max_score
+        """)
+        groups = 0
+
+        def grouped_grades():
+            nonlocal groups
+            for row in stream:
+                groups += 1
+                yield (row['course_id'], row['student_id'], row['type'], row['score'],
+                       row['max_score'], row['grade_count'])
+
+        totals = grade_rollup_totals(grouped_grades())
+    finally:
+        stream.close()
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM grade_course_buckets")
+        cursor.execute("DELETE FROM grade_student_buckets")
+        cursor.execute("DELETE FROM student_grade_totals")
+        for sql, params in rollup_total_statements(backend, totals):
+            cursor.execute(sql, params)
+        connection.commit()
+        return groups
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def split_months(date_from, date_to):
+    """Split the date range [date_from, date_to] (None for open) into whole and partial months.
+
+    Returns (months, edges): ``months`` is (first month, month after the
+    last) of the whole months in the range, either open as None, or None
+    when there are none; ``edges`` lists the (first day, last day) ranges
+    left over at either end.
+    """
+    first = date_from if date_from is None or date_from.day == 1 else next_month(date_from)
+    after = None if date_to is None else month_start(date_to + timedelta(days=1))
+    if first is not None and after is not None and first >= after:
+        return None, [(date_from, date_to)]
+    edges = []
+    if date_from is not None and date_from != first:
+        edges.append((date_from, first - timedelta(days=1)))
+    if date_to is not None and after <= date_to:
+        edges.append((after, date_to))
+    return (first, after), edges
+
+
+def attendance_registers(marks):
+    """Group (date, course_id, student_id, status) marks by register.
+
+    Returns {(date, course_id): {student_id: status}} with ids as strings,
+    keeping the last mark when a student appears twice, as the upsert does.
+    """
+    registers = {}
+    for day, course_id, student_id, status in marks:
+        registers.setdefault((date.fromisoformat(str(day)), str(course_id)), {})[str(student_id)] = status
+    return registers
+
+
+def attendance_lock_statement(backend, registers):
+    """(sql, params) locking the daily rollup row of each register, creating it if missing.
+
+    Submissions for the same register queue here, so each one reads the
+    statuses the previous one committed.
+    """
+    # Locked in primary key order, like the rollup upserts that follow
+    keys = sorted((course_id, day) for day, course_id in registers)
+    sql = backend.upsert('attendance_daily', ATTENDANCE_DAILY_KEY + ATTENDANCE_TOTALS,
+                         ATTENDANCE_DAILY_KEY, increment_columns=ATTENDANCE_TOTALS, rows=len(keys))
+    return sql, [value for key in keys for value in key + (0,) * len(ATTENDANCE_TOTALS)]
+
+
+def previous_attendance_queries(backend, registers):
+    """Yield (register key, sql, params) reading the stored status of every mark in ``registers``"""
+    for (day, course_id), marks in sorted(registers.items()):
+        placeholders = ', '.join(['%s'] * len(marks))
+        sql = backend.locking_read(
+            "SELECT student_id, status FROM attendance "
+            f"WHERE date = %s AND course_id = %s AND student_id IN ({placeholders})"
+        )
+        yield (day, course_id), sql, [day, course_id, *marks]
+
+
+def attendance_rollup_totals(changes):
+    """Sum attendance changes into daily and monthly count deltas.
+
+    ``changes`` yields (date, course_id, student_id, old status or None,
+    new status) tuples and may be a one-pass iterator. Returns two dicts
+    mapping ATTENDANCE_DAILY_KEY and ATTENDANCE_MONTHLY_KEY tuples to lists
+    of ATTENDANCE_TOTALS deltas.
+    """
+    daily = {}
+    monthly = {}
+    for day, course_id, student_id, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        for totals, key in ((daily, (str(course_id), day)),
+                            (monthly, (str(course_id), str(student_id), month_start(day)))):
+            entry = totals.get(key)
+            if entry is None:
+                entry = totals[key] = [0] * len(ATTENDANCE_STATUSES)
+            if old_status is not None:
+                entry[ATTENDANCE_STATUSES.index(old_status)] -= 1
+            entry[ATTENDANCE_STATUSES.index(new_status)] += 1
+    return daily, monthly
+
+
+def attendance_changes(registers, previous):
+    """Yield attendance_rollup_totals() changes for ``registers``.
+
+    ``previous`` holds the statuses stored before the write, in the same
+    {(date, course_id): {student_id: status}} shape.
+    """
+    for (day, course_id), marks in registers.items():
+        stored = previous.get((day, course_id), {})
+        for student_id, status in marks.items():
+            yield day, course_id, student_id, stored.get(student_id), status
+
+
+def attendance_rollup_statements(backend, totals):
+    """Yield (sql, params) adding attendance_rollup_totals() output to both attendance rollups"""
+    daily, monthly = totals
+    yield from _total_statements(backend, 'attendance_daily', ATTENDANCE_DAILY_KEY, ATTENDANCE_TOTALS, daily)
+    yield from _total_statements(backend, 'attendance_monthly', ATTENDANCE_MONTHLY_KEY, ATTENDANCE_TOTALS, monthly)
+
+
+def attendance_rates(counts):
+    """Add total and present/absent/late rates (percentages) to {status_count: n} counts"""
+    total = sum(int(counts[column]) for column in ATTENDANCE_TOTALS)
+    report = {'total': total}
+    for status, column in zip(ATTENDANCE_STATUSES, ATTENDANCE_TOTALS):
+        report[status] = int(counts[column])
+        report[f"{status}Rate"] = round(int(counts[column]) * 100 / total, 2) if total else None
+    return report
+
+
+def rebuild_attendance_rollups(connection, backend):
+    """Recompute both attendance rollups from the attendance table in one streaming pass and commit.
+
+    Like rebuild_grade_rollups, run it while no attendance is being written.
+    """
+    stream = backend.stream_cursor(connection)
+    try:
+        stream.execute("SELECT date, course_id, student_id, status FROM attendance")
+        marks = 0
+
+        def new_marks():
+            nonlocal marks
+            for row in stream:
+                marks += 1
+                yield (date.fromisoformat(str(row['date'])), row['course_id'], row['student_id'],
+                       None, row['status'])
+
+        totals = attendance_rollup_totals(new_marks())
+    finally:
+        stream.close()
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM attendance_daily")
+        cursor.execute("DELETE FROM attendance_monthly")
+        for sql, params in attendance_rollup_statements(backend, totals):
+            cursor.execute(sql, params)
+        connection.commit()
+        return marks
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    from app import app, db_pool, init_db, storage_backend
+
+    with app.app_context():
+        init_db()
+    with db_pool.connection() as connection:
+        groups = rebuild_grade_rollups(connection, storage_backend)
+        print(f"成绩汇总表已重建（{groups} 组成绩）")
+        marks = rebuild_attendance_rollups(connection, storage_backend)
+        print(f"考勤汇总表已重建（{marks} 条考勤记录）")
+
+
+if __name__ == '__main__':
+    main()
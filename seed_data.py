@@ -0,0 +1,371 @@
+"""生成大规模模拟数据，用于压力测试和性能分析
+
+在 migrate.py 的数据库配置之上，按参数生成一致的 teachers、courses、students、
+student_course、teacher_course、enrollments、grades 和 attendance 数据：
+
+    python seed_data.py --centres 5 --courses 60 --students 10000 \\
+        --grades-per-student 100 --attendance-days 30 --truncate
+
+以上参数生成 100 万条成绩。数据优先用 LOAD DATA LOCAL INFILE 批量导入，
+服务器不允许时退回到多行 INSERT。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pymysql
+
+from migrate import db_config, get_connection, migrate
+from rollups import rebuild_attendance_rollups, rebuild_grade_rollups
+from storage import MySQLBackend
+
+FIRST_NAMES = ['Emily', 'Thomas', 'Sophie', 'Jason', 'Alice', 'Ethan', 'Chloe', 'Lucas',
+               'Mia', 'Ryan', 'Hannah', 'Oscar', 'Grace', 'Leo', 'Zoe', 'Adam']
+LAST_NAMES = ['Wong', 'Chan', 'Lee', 'Lam', 'Chen', 'Cheung', 'Ho', 'Ng', 'Lau', 'Yip',
+              'Tsang', 'Leung', 'Kwok', 'Fung', 'Tang', 'Mak']
+SUBJECTS = ['Phonics Foundation', 'Young Readers', 'Creative Writing', 'Grammar Builders',
+            'Public Speaking', 'Story Time', 'Spelling Bee', 'Drama English']
+LEVELS = ['Beginner', 'Intermediate', 'Advanced']
+SCHEDULES = ['Mon, Wed', 'Tue, Thu', 'Fri', 'Sat', 'Sun']
+TIMES = ['10:00-11:00', '11:30-12:30', '14:00-15:00', '16:00-17:00']
+GRADE_TYPES = ('quiz', 'exam', 'assignment', 'homework')
+
+# 学期开始日期；成绩日期落在学期内，考勤从学期开始每周一次
+TERM_START = date(2025, 1, 6)
+TERM_DAYS = 120
+TERM_DATES = [(TERM_START + timedelta(days=day)).isoformat() for day in range(TERM_DAYS)]
+
+# 写入顺序即依赖顺序；列顺序与生成的元组一致
+TABLE_COLUMNS = {
+    'teachers': ('id', 'first_name', 'last_name', 'email', 'phone', 'id_number', 'id_type',
+                 'location', 'qualifications', 'experience', 'join_date', 'languages', 'bio'),
+    'courses': ('id', 'name', 'level', 'age_range', 'location', 'schedule', 'time', 'teacher',
+                'max_students', 'fee', 'description'),
+    'teacher_course': ('teacher_id', 'course_id', 'status'),
+    'parent': ('id', 'First_Name', 'Last_Name', 'Email_Address', 'Password', 'Child_Name', 'Child_Age'),
+    'students': ('id', 'first_name', 'last_name', 'date_of_birth', 'id_number', 'id_type', 'grade',
+                 'location', 'parent_name', 'parent_email', 'parent_phone', 'parent_id_number',
+                 'parent_id_type', 'address', 'emergency_contact', 'medical_info', 'notes'),
+    'student_course': ('student_id', 'course_id', 'status'),
+    'enrollments': ('parent_id', 'course_id', 'student_id', 'status'),
+    'grades': ('date', 'course', 'course_id', 'type', 'title', 'student', 'student_id',
+               'score', 'max_score', 'feedback'),
+    'attendance': ('date', 'course_id', 'course_name', 'student_id', 'student_name', 'status',
+                   'arrival_time', 'leaving_time', 'notes')
+}
+
+
+class Dataset:
+    """按参数确定性地生成各表的行，ID 从 id_offsets 之后开始连续分配"""
+
+    def __init__(self, args, id_offsets):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.centres = [f"Centre {i + 1}" for i in range(args.centres)]
+        self.teacher_count = args.teachers or max(1, -(-args.courses // 3))
+
+        self.teacher_ids = [id_offsets['teachers'] + i + 1 for i in range(self.teacher_count)]
+        self.course_ids = [id_offsets['courses'] + i + 1 for i in range(args.courses)]
+        self.student_ids = [id_offsets['students'] + i + 1 for i in range(args.students)]
+        self.parent_ids = [id_offsets['parent'] + i + 1 for i in range(args.students)]
+
+        # 课程按顺序分配到各中心，学生只报读所在中心的课程
+        self.course_centre = {course_id: self.centres[i % len(self.centres)]
+                              for i, course_id in enumerate(self.course_ids)}
+        self.course_name = {course_id: f"{SUBJECTS[i % len(SUBJECTS)]} {i + 1}"
+                            for i, course_id in enumerate(self.course_ids)}
+        self.course_teacher = {course_id: self.teacher_ids[i % len(self.teacher_ids)]
+                               for i, course_id in enumerate(self.course_ids)}
+        centre_courses = {centre: [] for centre in self.centres}
+        for course_id, centre in self.course_centre.items():
+            centre_courses[centre].append(course_id)
+
+        self.student_name = {}
+        self.student_centre = {}
+        self.student_courses = {}
+        for i, student_id in enumerate(self.student_ids):
+            centre = self.centres[i % len(self.centres)]
+            courses = centre_courses[centre] or self.course_ids
+            self.student_centre[student_id] = centre
+            self.student_name[student_id] = (self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES))
+            self.student_courses[student_id] = self.rng.sample(courses, min(args.courses_per_student, len(courses)))
+
+        # 每门课每周上课一次，考勤日期从学期开始按课程错开
+        self.course_dates = {
+            course_id: [(TERM_START + timedelta(days=i % 7 + 7 * week)).isoformat() for week in range(args.attendance_days)]
+            for i, course_id in enumerate(self.course_ids)
+        }
+
+    def teacher_name(self, teacher_id):
+        index = teacher_id - self.teacher_ids[0]
+        return FIRST_NAMES[index % len(FIRST_NAMES)], f"{LAST_NAMES[index % len(LAST_NAMES)]} {index + 1}"
+
+    def teachers(self):
+        for teacher_id in self.teacher_ids:
+            first_name, last_name = self.teacher_name(teacher_id)
+            yield (teacher_id, first_name, last_name, f"teacher{teacher_id}@example.com", '+852 9000 0000',
+                   f"T{teacher_id:07d}", 'HKID', self.centres[teacher_id % len(self.centres)],
+                   'BEd,TESOL', f"{teacher_id % 15 + 1} years", '2020-09-01', 'English,Cantonese', '')
+
+    def courses(self):
+        for course_id in self.course_ids:
+            first_name, last_name = self.teacher_name(self.course_teacher[course_id])
+            yield (course_id, self.course_name[course_id], LEVELS[course_id % len(LEVELS)], '6-8',
+                   self.course_centre[course_id], SCHEDULES[course_id % len(SCHEDULES)],
+                   TIMES[course_id % len(TIMES)], f"{first_name} {last_name}",
+                   self.args.max_students, '1200', 'Generated course')
+
+    def teacher_courses(self):
+        for course_id in self.course_ids:
+            yield (self.course_teacher[course_id], course_id, 'active')
+
+    def parents(self):
+        for student_id, parent_id in zip(self.student_ids, self.parent_ids):
+            first_name, last_name = self.student_name[student_id]
+            yield (parent_id, 'Parent', last_name, f"parent{parent_id}@example.com", 'password',
+                   f"{first_name} {last_name}", 7 + student_id % 6)
+
+    def students(self):
+        for student_id in self.student_ids:
+            first_name, last_name = self.student_name[student_id]
+            birth = date(2014, 1, 1) + timedelta(days=student_id % 2000)
+            yield (student_id, first_name, last_name, birth.isoformat(), f"S{student_id:08d}", 'HKID',
+                   f"Grade {student_id % 6 + 1}", self.student_centre[student_id], f"Parent {last_name}",
+                   f"parent{student_id}@example.com", '+852 9100 0000', f"P{student_id:08d}", 'HKID',
+                   f"{student_id} Nathan Road", '+852 9200 0000', '', '')
+
+    def student_courses_rows(self):
+        for student_id in self.student_ids:
+            for course_id in self.student_courses[student_id]:
+                yield (student_id, course_id, 'active')
+
+    def enrollments(self):
+        for student_id, parent_id in zip(self.student_ids, self.parent_ids):
+            for course_id in self.student_courses[student_id]:
+                yield (parent_id, course_id, student_id, 'active')
+
+    def grades(self):
+        rng = random.Random(f"{self.args.seed}-grades")
+        per_student = self.args.grades_per_student
+        for student_id in self.student_ids:
+            first_name, last_name = self.student_name[student_id]
+            name = f"{first_name} {last_name}"
+            courses = self.student_courses[student_id]
+            ability = rng.gauss(75, 10)
+            for n in range(per_student):
+                course_id = courses[n % len(courses)]
+                grade_type = GRADE_TYPES[n % len(GRADE_TYPES)]
+                score = min(100, max(0, int(rng.gauss(ability, 12))))
+                yield (TERM_DATES[rng.randrange(TERM_DAYS)],
+                       self.course_name[course_id], course_id, grade_type,
+                       f"{grade_type.title()} {n // len(GRADE_TYPES) + 1}", name, student_id,
+                       score, 100, '')
+
+    def attendance(self):
+        rng = random.Random(f"{self.args.seed}-attendance")
+        for student_id in self.student_ids:
+            first_name, last_name = self.student_name[student_id]
+            name = f"{first_name} {last_name}"
+            for course_id in self.student_courses[student_id]:
+                arrival, leaving = TIMES[course_id % len(TIMES)].split('-')
+                for day in self.course_dates[course_id]:
+                    roll = rng.random()
+                    status = 'present' if roll < 0.88 else ('late' if roll < 0.95 else 'absent')
+                    yield (day, course_id, self.course_name[course_id], student_id, name, status,
+                           arrival if status != 'absent' else '', leaving if status != 'absent' else '', '')
+
+    def rows(self, table):
+        return {
+            'teachers': self.teachers,
+            'courses': self.courses,
+            'teacher_course': self.teacher_courses,
+            'parent': self.parents,
+            'students': self.students,
+            'student_course': self.student_courses_rows,
+            'enrollments': self.enrollments,
+            'grades': self.grades,
+            'attendance': self.attendance
+        }[table]()
+
+
+def _tsv_field(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+class BulkLoader:
+    """批量写入行：优先 LOAD DATA LOCAL INFILE，否则每条语句插入 chunk_size 行"""
+
+    def __init__(self, connection, method, chunk_size):
+        self.connection = connection
+        self.method = method
+        self.chunk_size = chunk_size
+
+    def load(self, table, columns, make_rows):
+        """写入 make_rows() 生成的行并返回行数；退回 INSERT 时会重新生成一遍"""
+        if self.method in ('auto', 'load-data'):
+            try:
+                return self._load_data(table, columns, make_rows())
+            except pymysql.err.MySQLError as e:
+                if self.method == 'load-data':
+                    raise
+                print(f"LOAD DATA 不可用 ({e})，改用多行 INSERT")
+                self.connection.rollback()
+                self.method = 'insert'
+        return self._insert(table, columns, make_rows())
+
+    def _load_data(self, table, columns, rows):
+        count = 0
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv', delete=False) as f:
+            path = f.name
+            for row in rows:
+                f.write('\t'.join(_tsv_field(value) for value in row) + '\n')
+                count += 1
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                    f"({', '.join(columns)})",
+                    (path,)
+                )
+            self.connection.commit()
+        finally:
+            os.unlink(path)
+        return count
+
+    def _insert(self, table, columns, rows):
+        prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        count = 0
+        chunk = []
+        with self.connection.cursor() as cursor:
+            for row in rows:
+                chunk.extend(row)
+                count += 1
+                if count % self.chunk_size == 0:
+                    cursor.execute(prefix + ', '.join([row_placeholder] * self.chunk_size), chunk)
+                    self.connection.commit()
+                    chunk = []
+            if chunk:
+                cursor.execute(prefix + ', '.join([row_placeholder] * (len(chunk) // len(columns))), chunk)
+            self.connection.commit()
+        return count
+
+
+def table_columns(cursor, table):
+    """返回表的列名集合，表不存在时返回 None"""
+    cursor.execute("SHOW TABLES LIKE %s", (table,))
+    if not cursor.fetchone():
+        return None
+    cursor.execute(f"SHOW COLUMNS FROM {table}")
+    return {row['Field'] for row in cursor.fetchall()}
+
+
+def create_tables():
+    """执行 migrate.py 的迁移，保证与接口读取的表结构一致"""
+    connection = get_connection()
+    try:
+        migrate(connection, MySQLBackend(db_config))
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成大规模模拟数据')
+    parser.add_argument('--centres', type=int, default=5, help='教学中心数量')
+    parser.add_argument('--courses', type=int, default=60, help='课程数量')
+    parser.add_argument('--teachers', type=int, default=0, help='教师数量（默认每 3 门课 1 位）')
+    parser.add_argument('--students', type=int, default=10000, help='学生数量')
+    parser.add_argument('--courses-per-student', type=int, default=2, help='每个学生报读的课程数')
+    parser.add_argument('--max-students', type=int, default=1000, help='每门课的人数上限')
+    parser.add_argument('--grades-per-student', type=int, default=100, help='每个学生的成绩条数')
+    parser.add_argument('--attendance-days', type=int, default=30, help='每门课的上课（考勤）次数')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子，相同参数生成相同数据')
+    parser.add_argument('--truncate', action='store_true', help='先清空以上各表')
+    parser.add_argument('--method', choices=('auto', 'load-data', 'insert'), default='auto',
+                        help='导入方式（默认 auto：优先 LOAD DATA，失败则 INSERT）')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='INSERT 方式每条语句的行数')
+    args = parser.parse_args()
+
+    create_tables()
+
+    connection = get_connection(local_infile=True, autocommit=False)
+    cursor = connection.cursor()
+    try:
+        # 导入期间关闭唯一性和外键检查，数据由生成器保证一致
+        cursor.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+
+        columns = {table: table_columns(cursor, table) for table in TABLE_COLUMNS}
+        tables = [table for table in TABLE_COLUMNS if columns[table] is not None]
+        skipped = [table for table in TABLE_COLUMNS if columns[table] is None]
+        if skipped:
+            print(f"跳过不存在的表: {', '.join(skipped)}")
+
+        if args.truncate:
+            for table in tables:
+                cursor.execute(f"TRUNCATE TABLE {table}")
+            print("已清空现有数据")
+
+        id_offsets = {}
+        for table in ('teachers', 'courses', 'students', 'parent'):
+            if columns[table] is None:
+                id_offsets[table] = 0
+                continue
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) AS max_id FROM {table}")
+            id_offsets[table] = cursor.fetchone()['max_id']
+
+        dataset = Dataset(args, id_offsets)
+        loader = BulkLoader(connection, args.method, args.chunk_size)
+
+        started = time.monotonic()
+        total = 0
+        for table in tables:
+            table_columns_present = TABLE_COLUMNS[table]
+            make_rows = lambda table=table: dataset.rows(table)
+            if table == 'enrollments' and 'student_id' not in columns[table]:
+                # 旧版 enrollments 表没有 student_id 列
+                table_columns_present = table_columns_present[:2] + table_columns_present[3:]
+                make_rows = lambda: (row[:2] + row[3:] for row in dataset.rows('enrollments'))
+            table_started = time.monotonic()
+            count = loader.load(table, table_columns_present, make_rows)
+            elapsed = time.monotonic() - table_started
+            total += count
+            print(f"{table:<15} {count:>10} 行  {elapsed:7.2f} 秒  {count / elapsed if elapsed else 0:>10.0f} 行/秒")
+
+        # 让各进程的查询缓存失效
+        if table_columns(cursor, 'table_versions') is not None:
+            cursor.executemany(
+                "INSERT INTO table_versions (table_name, version) VALUES (%s, 1) "
+                "ON DUPLICATE KEY UPDATE version = version + 1",
+                [(table,) for table in tables]
+            )
+        connection.commit()
+        print(f"✅ 共导入 {total} 行，用时 {time.monotonic() - started:.1f} 秒（{loader.method}）")
+
+        # 成绩没有经过写入接口，重建成绩汇总表
+        if 'grades' in tables and table_columns(cursor, 'grade_course_buckets') is not None:
+            rollup_started = time.monotonic()
+            rebuild_grade_rollups(connection, MySQLBackend(db_config))
+            print(f"成绩汇总表已重建，用时 {time.monotonic() - rollup_started:.1f} 秒")
+
+        # 考勤同样没有经过写入接口，重建考勤汇总表
+        if 'attendance' in tables and table_columns(cursor, 'attendance_daily') is not None:
+            rollup_started = time.monotonic()
+            rebuild_attendance_rollups(connection, MySQLBackend(db_config))
+            print(f"考勤汇总表已重建，用时 {time.monotonic() - rollup_started:.1f} 秒")
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ 数据生成失败: {str(e)}")
+        sys.exit(1)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@ import subprocess
 import sys
 import time
 import os
+import urllib.error
+import urllib.request
 
 def check_dependencies():
     """检查必要的依赖是否已安装"""
@@ -16,40 +18,77 @@ def check_dependencies():
         print("请运行: pip install flask flask-cors pymysql")
         return False
 
+def uses_sqlite():
+    """STORAGE_BACKEND=sqlite 时使用内嵌数据库，由 app.py 启动时执行迁移"""
+    return os.environ.get('STORAGE_BACKEND', 'mysql') == 'sqlite'
+
 def init_database():
     """初始化数据库"""
-    print("正在初始化数据库...")
+    if uses_sqlite():
+        print("✅ 使用内嵌 SQLite 数据库，启动后端时执行迁移")
+        return True
+    print("正在执行数据库迁移...")
     try:
-        subprocess.run([sys.executable, "init_db.py"], check=True)
+        subprocess.run([sys.executable, "migrate.py"], check=True)
         print("✅ 数据库初始化成功")
         return True
     except subprocess.CalledProcessError:
         print("❌ 数据库初始化失败")
         return False
 
+# 就绪检查地址与等待时间（秒）
+READY_URL = "http://localhost:9999/health/ready"
+READY_TIMEOUT = 30
+
+def backend_command():
+    """优先使用gunicorn多进程服务器，不可用时（如Windows）退回Flask开发服务器
+
+    内嵌 SQLite 数据库只在单个进程中使用，因此同样使用Flask开发服务器。
+    """
+    if uses_sqlite():
+        return [sys.executable, "app.py"]
+    if os.name != 'nt':
+        try:
+            import gunicorn
+            return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+        except ImportError:
+            pass
+    print("⚠️ 未找到gunicorn，使用Flask开发服务器 (pip install gunicorn)")
+    return [sys.executable, "app.py"]
+
+def wait_until_ready(backend_process):
+    """轮询就绪检查接口，直到服务可用、进程退出或超时"""
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if backend_process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(READY_URL, timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.5)
+    return False
+
 def start_backend():
     """启动后端服务器"""
     print("正在启动后端服务器...")
     try:
-        # 使用非阻塞方式启动后端
-        backend_process = subprocess.Popen(
-            [sys.executable, "app.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # 等待服务器启动
-        time.sleep(2)
+        # 使用非阻塞方式启动后端，日志直接输出到当前终端
+        backend_process = subprocess.Popen(backend_command())
         
-        # 检查进程是否仍在运行
-        if backend_process.poll() is None:
+        # 等待服务器就绪（数据库连接可用）
+        if wait_until_ready(backend_process):
             print("✅ 后端服务器已启动，运行在 http://localhost:9999")
             return backend_process
+        
+        if backend_process.poll() is None:
+            print(f"❌ 后端服务器在{READY_TIMEOUT}秒内未就绪: {READY_URL}")
+            backend_process.terminate()
         else:
-            stdout, stderr = backend_process.communicate()
-            print(f"❌ 后端服务器启动失败: {stderr}")
-            return None
+            print("❌ 后端服务器启动失败，请查看上方日志")
+        return None
     except Exception as e:
         print(f"❌ 启动后端服务器时出错: {e}")
         return None
@@ -0,0 +1,463 @@
+"""Storage backends for the connection pool.
+
+A backend opens DB-API connections whose cursors take ``%s`` placeholders
+and return rows as dicts, and renders the few statements whose SQL differs
+between engines (INSERT IGNORE, upserts, ordered GROUP_CONCAT, the ids of a
+multi-row INSERT) and the schema introspection and index builds used by
+migrate.py. Every other query in app.py is plain SQL run unchanged on both.
+
+``MySQLBackend`` is the production engine. ``SQLiteBackend`` is embedded,
+needs no server and, with the path ``:memory:``, keeps the whole database
+in the process, so the API, test scripts and benchmark can run anywhere.
+"""
+import functools
+import itertools
+import os
+import sqlite3
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import pymysql
+
+def _columns(columns):
+    return ', '.join(columns)
+
+
+def _values(columns, rows):
+    row = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    return ', '.join([row] * rows)
+
+
+class MySQLBackend:
+    """MySQL server reached through pymysql."""
+
+    name = 'mysql'
+    # Connections are only bounded by the pool's max_size
+    max_connections = None
+
+    def __init__(self, db_config, cursorclass=pymysql.cursors.DictCursor,
+                 stream_cursorclass=pymysql.cursors.SSDictCursor):
+        self.db_config = db_config
+        self.cursorclass = cursorclass
+        self.stream_cursorclass = stream_cursorclass
+
+    def connect(self):
+        return pymysql.connect(
+            host=self.db_config['host'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            port=self.db_config['port'],
+            database=self.db_config['database'],
+            charset='utf8mb4',
+            cursorclass=self.cursorclass,
+            ssl={'fake': True}  # Bypass SSL verification requirement
+        )
+
+    def stream_cursor(self, connection):
+        """Unbuffered cursor that reads rows from the server as they are fetched"""
+        return connection.cursor(self.stream_cursorclass)
+
+    def list_tables(self, cursor):
+        cursor.execute("SHOW TABLES")
+        return [next(iter(row.values())) for row in cursor.fetchall()]
+
+    def string_literal(self, value):
+        return "'" + value.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n') + "'"
+
+    def insert_ignore(self, table, columns, rows=1):
+        """INSERT that skips rows clashing with a unique key"""
+        return f"INSERT IGNORE INTO {table} ({_columns(columns)}) VALUES {_values(columns, rows)}"
+
+    def upsert(self, table, columns, key_columns, update_columns=(), assignments=None,
+               increment_columns=(), rows=1):
+        """INSERT that updates the existing row when ``key_columns`` clash.
+
+        ``update_columns`` take the inserted value, ``increment_columns``
+        add it to the existing value, and ``assignments`` map further
+        columns to SQL expressions over the existing row.
+        """
+        updates = [f"{column} = VALUES({column})" for column in update_columns]
+        updates += [f"{column} = {column} + VALUES({column})" for column in increment_columns]
+        updates += [f"{column} = {expression}" for column, expression in (assignments or {}).items()]
+        return (f"INSERT INTO {table} ({_columns(columns)}) VALUES {_values(columns, rows)} "
+                f"ON DUPLICATE KEY UPDATE {', '.join(updates)}")
+
+    def group_concat(self, expression, order_by, separator):
+        """Aggregate joining ``expression`` in ``order_by`` order"""
+        return f"GROUP_CONCAT({expression} ORDER BY {order_by} SEPARATOR {self.string_literal(separator)})"
+
+    def age_in_years(self, column):
+        """Whole years from the date ``column`` to the date bound to its one ``%s``"""
+        return f"TIMESTAMPDIFF(YEAR, {column}, %s)"
+
+    def locking_read(self, sql):
+        """``sql`` reading the latest committed rows and locking them until commit"""
+        return sql + " FOR UPDATE"
+
+    def full_scans(self, cursor, sql, params):
+        """Tables ``sql`` reads in full (every row, or every entry of an index), from EXPLAIN"""
+        cursor.execute("EXPLAIN " + sql, params)
+        return [row['table'] for row in cursor.fetchall() if row['type'] in ('ALL', 'index')]
+
+    def auto_increment_step(self, cursor):
+        """Spacing between the ids a multi-row INSERT assigns"""
+        cursor.execute("SELECT @@auto_increment_increment AS step")
+        return cursor.fetchone()['step']
+
+    def first_insert_id(self, cursor, rows):
+        """Id of the first row written by the last multi-row INSERT of ``rows`` rows"""
+        return cursor.lastrowid
+
+    def table_columns(self, cursor, table):
+        """Names of the columns of ``table`` (empty if it does not exist)"""
+        cursor.execute(
+            "SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,)
+        )
+        return {row['name'] for row in cursor.fetchall()}
+
+    def table_indexes(self, cursor, table):
+        """Names of the indexes of ``table`` (empty if it does not exist)"""
+        cursor.execute(
+            "SELECT DISTINCT INDEX_NAME AS name FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,)
+        )
+        return {row['name'] for row in cursor.fetchall()}
+
+    def add_index(self, table, name, columns, unique=False):
+        """Online index build: reads and writes to ``table`` continue while it runs"""
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        return f"ALTER TABLE {table} ADD {kind} {name} ({_columns(columns)}), ALGORITHM=INPLACE, LOCK=NONE"
+
+    def connection_id(self, connection):
+        """Server id of ``connection``, for ddl_progress()"""
+        return connection.thread_id()
+
+    def enable_ddl_progress(self, cursor):
+        """Turn on the performance_schema instruments that measure ALTER TABLE; False if not allowed"""
+        try:
+            cursor.execute("UPDATE performance_schema.setup_instruments SET ENABLED = 'YES', TIMED = 'YES' "
+                           "WHERE NAME LIKE 'stage/innodb/alter%'")
+            cursor.execute("UPDATE performance_schema.setup_consumers SET ENABLED = 'YES' "
+                           "WHERE NAME LIKE 'events_stages_%'")
+            return True
+        except pymysql.MySQLError:
+            return False
+
+    def ddl_progress(self, cursor, connection_id):
+        """(stage, work completed, work estimated) of the ALTER TABLE running on ``connection_id``, or None"""
+        cursor.execute("""
+        SELECT stage.EVENT_NAME AS stage, stage.WORK_COMPLETED AS completed, stage.WORK_ESTIMATED AS estimated
+        FROM performance_schema.events_stages_current stage
+        JOIN performance_schema.threads thread ON thread.THREAD_ID = stage.THREAD_ID
+        WHERE thread.PROCESSLIST_ID = %s
+        """, (connection_id,))
+        row = cursor.fetchone()
+        return None if row is None else (row['stage'], row['completed'], row['estimated'])
+
+    def try_lock(self, cursor, name):
+        """Take the server-wide lock ``name`` without waiting; False if another session holds it"""
+        cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (name,))
+        return cursor.fetchone()['locked'] == 1
+
+    def release_lock(self, cursor, name):
+        cursor.execute("SELECT RELEASE_LOCK(%s) AS released", (name,))
+        cursor.fetchone()
+
+
+# Dates are stored as ISO text and read back as date/datetime objects, as pymysql returns them
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()[:10]))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+
+@functools.lru_cache(maxsize=1024)
+def _sqlite_query(query, has_args):
+    """Rewrite pymysql's format-style placeholders as SQLite's qmark style"""
+    if not has_args:
+        return query
+    return query.replace('%s', '?').replace('%%', '%')
+
+
+class _OrderedGroupConcat:
+    """group_concat(value, sort_key, separator) aggregate that joins values in sort_key order"""
+
+    def __init__(self):
+        self.items = []
+        self.separator = ','
+
+    def step(self, value, sort_key, separator):
+        if value is not None:
+            self.items.append((sort_key, value))
+            self.separator = separator
+
+    def finalize(self):
+        if not self.items:
+            return None
+        return self.separator.join(str(value) for _, value in sorted(self.items, key=lambda item: item[0]))
+
+
+class SQLiteCursor:
+    """pymysql-style cursor over sqlite3: ``%s`` placeholders and dict rows.
+
+    ``on_execute`` is called with the seconds each statement took and
+    ``on_rows`` with the number of rows read, once the cursor is closed.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection.raw.cursor()
+        self._names = None
+        self._rows_read = 0
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def _run(self, method, query, args):
+        started = time.perf_counter()
+        try:
+            method(_sqlite_query(query, args is not None), () if args is None else args)
+        finally:
+            if self.connection.on_execute is not None:
+                self.connection.on_execute(time.perf_counter() - started)
+        description = self._cursor.description
+        self._names = [column[0] for column in description] if description else None
+
+    def execute(self, query, args=None):
+        self._run(self._cursor.execute, query, args)
+        return self._cursor.rowcount
+
+    def executemany(self, query, args):
+        args = list(args)
+        if not args:
+            return 0
+        self._run(self._cursor.executemany, query, args)
+        return self._cursor.rowcount
+
+    def _to_dicts(self, rows):
+        self._rows_read += len(rows)
+        names = self._names
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None:
+            return None
+        return self._to_dicts([row])[0]
+
+    def fetchmany(self, size=None):
+        return self._to_dicts(self._cursor.fetchmany(size or self._cursor.arraysize))
+
+    def fetchall(self):
+        return self._to_dicts(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor.close()
+        if self._rows_read and self.connection.on_rows is not None:
+            self.connection.on_rows(self._rows_read)
+        self._rows_read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class SQLiteConnection:
+    """sqlite3 connection with the pymysql methods the pool and routes use."""
+
+    def __init__(self, raw, on_execute=None, on_rows=None):
+        self.raw = raw
+        self.on_execute = on_execute
+        self.on_rows = on_rows
+
+    def cursor(self, cursorclass=None):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def ping(self, reconnect=False):
+        self.raw.execute("SELECT 1").close()
+
+    def close(self):
+        self.raw.close()
+
+
+class SQLiteBackend:
+    """Embedded SQLite database in a file, or in memory with ``path=':memory:'``.
+
+    File databases use WAL mode so readers do not block the writer, and
+    wait up to ``busy_timeout`` seconds for another connection's write lock.
+    An in-memory database lives as long as this backend and is shared by
+    every connection it opens, but SQLite locks it per table, so it is
+    served through a single connection (``max_connections``) and belongs
+    to one process.
+    """
+
+    name = 'sqlite'
+
+    _memory_ids = itertools.count(1)
+
+    def __init__(self, path=':memory:', busy_timeout=5, on_execute=None, on_rows=None):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.on_execute = on_execute
+        self.on_rows = on_rows
+
+        if path == ':memory:':
+            self.max_connections = 1
+            self._target = f"file:rhine-memory-{os.getpid()}-{next(self._memory_ids)}?mode=memory&cache=shared"
+            # Held open so the database outlives pooled connections being recycled
+            self._keepalive = self._open()
+        else:
+            self.max_connections = None
+            self._target = path
+            self._keepalive = None
+            # WAL mode is persistent, so setting it once per database file is enough
+            self._open().execute("PRAGMA journal_mode = WAL").connection.close()
+
+    def _open(self):
+        raw = sqlite3.connect(
+            self._target,
+            uri=self._target.startswith('file:'),
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False  # Pooled connections move between request threads
+        )
+        raw.execute("PRAGMA foreign_keys = ON")
+        raw.create_aggregate('ordered_group_concat', 3, _OrderedGroupConcat)
+        return raw
+
+    def connect(self):
+        return SQLiteConnection(self._open(), self.on_execute, self.on_rows)
+
+    def stream_cursor(self, connection):
+        """SQLite steps through results as they are fetched, so any cursor streams"""
+        return connection.cursor()
+
+    def list_tables(self, cursor):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite!_%' ESCAPE '!' ORDER BY name")
+        return [row['name'] for row in cursor.fetchall()]
+
+    def string_literal(self, value):
+        return "'" + value.replace("'", "''") + "'"
+
+    def insert_ignore(self, table, columns, rows=1):
+        """INSERT that skips rows clashing with a unique key"""
+        return f"INSERT OR IGNORE INTO {table} ({_columns(columns)}) VALUES {_values(columns, rows)}"
+
+    def upsert(self, table, columns, key_columns, update_columns=(), assignments=None,
+               increment_columns=(), rows=1):
+        """INSERT that updates the existing row when ``key_columns`` clash.
+
+        ``update_columns`` take the inserted value, ``increment_columns``
+        add it to the existing value, and ``assignments`` map further
+        columns to SQL expressions over the existing row.
+        """
+        updates = [f"{column} = excluded.{column}" for column in update_columns]
+        updates += [f"{column} = {column} + excluded.{column}" for column in increment_columns]
+        updates += [f"{column} = {expression}" for column, expression in (assignments or {}).items()]
+        return (f"INSERT INTO {table} ({_columns(columns)}) VALUES {_values(columns, rows)} "
+                f"ON CONFLICT ({_columns(key_columns)}) DO UPDATE SET {', '.join(updates)}")
+
+    def group_concat(self, expression, order_by, separator):
+        """Aggregate joining ``expression`` in ``order_by`` order"""
+        # SQLite before 3.44 has no ORDER BY inside aggregates
+        return f"ordered_group_concat({expression}, {order_by}, {self.string_literal(separator)})"
+
+    def age_in_years(self, column):
+        """Whole years from the date ``column`` to the date bound to its one ``%s``"""
+        # YYYYMMDD numbers differ by 10000 per full year; '%%' is a literal
+        # '%' in a statement with parameters, as with pymysql
+        return (f"(CAST(strftime('%%Y%%m%%d', %s) AS INTEGER) "
+                f"- CAST(strftime('%%Y%%m%%d', {column}) AS INTEGER)) / 10000")
+
+    def locking_read(self, sql):
+        """``sql`` reading the latest committed rows and locking them until commit"""
+        # Writers hold the database lock until commit, so a read after a write is current
+        return sql
+
+    def full_scans(self, cursor, sql, params):
+        """Tables ``sql`` reads in full (every row, or every entry of an index), from EXPLAIN"""
+        # SEARCH steps look rows up through an index, SCAN steps visit all of them
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row['detail'].split()[1] for row in cursor.fetchall() if row['detail'].startswith('SCAN ')]
+
+    def auto_increment_step(self, cursor):
+        """Spacing between the ids a multi-row INSERT assigns"""
+        return 1
+
+    def first_insert_id(self, cursor, rows):
+        """Id of the first row written by the last multi-row INSERT of ``rows`` rows"""
+        # SQLite reports the last row's id
+        return cursor.lastrowid - rows + 1
+
+    def table_columns(self, cursor, table):
+        """Names of the columns of ``table`` (empty if it does not exist)"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        return {row['name'] for row in cursor.fetchall()}
+
+    def table_indexes(self, cursor, table):
+        """Names of the indexes of ``table`` (empty if it does not exist)"""
+        cursor.execute(f"PRAGMA index_list({table})")
+        return {row['name'] for row in cursor.fetchall()}
+
+    def add_index(self, table, name, columns, unique=False):
+        """Index build; SQLite holds the write lock while it runs"""
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        return f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({_columns(columns)})"
+
+    def connection_id(self, connection):
+        """SQLite has no server to report DDL progress"""
+        return None
+
+    def enable_ddl_progress(self, cursor):
+        return False
+
+    def ddl_progress(self, cursor, connection_id):
+        return None
+
+    def try_lock(self, cursor, name):
+        """Migrations are serialized by SQLite's own write lock"""
+        return True
+
+    def release_lock(self, cursor, name):
+        pass
+
+
+def create_backend(backend='mysql', db_config=None, sqlite_path=':memory:',
+                   cursorclass=pymysql.cursors.DictCursor,
+                   stream_cursorclass=pymysql.cursors.SSDictCursor,
+                   on_execute=None, on_rows=None):
+    """Build the backend named ``backend`` ('mysql' or 'sqlite').
+
+    MySQL connections use ``cursorclass`` and ``stream_cursorclass``;
+    SQLite cursors report statement time and rows read to ``on_execute``
+    and ``on_rows``.
+    """
+    if backend == 'mysql':
+        return MySQLBackend(db_config, cursorclass=cursorclass, stream_cursorclass=stream_cursorclass)
+    if backend == 'sqlite':
+        return SQLiteBackend(sqlite_path, on_execute=on_execute, on_rows=on_rows)
+    raise ValueError(f"Unknown storage backend: {backend!r} (expected 'mysql' or 'sqlite')")
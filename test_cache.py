@@ -0,0 +1,40 @@
+"""Regression test: a cached body must not be served under a newer ETag.
+
+Writes through a second database connection, as another worker process
+would, and checks that the ETag and the body of GET /course-names change
+together before the next table_versions poll.
+
+    python -m pytest test_cache.py
+"""
+from app import BUMP_TABLE_VERSION_SQL, query_cache
+
+
+def test_etag_and_body_change_together_after_external_write(client, sql, add_course):
+    def bump_courses():
+        sql(BUMP_TABLE_VERSION_SQL, ('courses', 1))
+
+    poll_interval = query_cache.poll_interval
+    # No table_versions poll happens during the test; only the ETag read can notice the write
+    query_cache.poll_interval = 3600
+    try:
+        add_course('C0')
+        bump_courses()
+        first = client.get('/course-names')
+        assert first.status_code == 200
+        assert 'C0' in [course['name'] for course in first.get_json()]
+
+        sql("UPDATE courses SET name = %s WHERE name = %s", ('C1', 'C0'))
+        bump_courses()
+        second = client.get('/course-names')
+        assert second.status_code == 200
+        assert second.headers['ETag'] != first.headers['ETag']
+        assert 'C1' in [course['name'] for course in second.get_json()]
+        assert 'C0' not in [course['name'] for course in second.get_json()]
+
+        # The new ETag revalidates; the old one gets the new body
+        assert client.get('/course-names', headers={'If-None-Match': second.headers['ETag']}).status_code == 304
+        stale = client.get('/course-names', headers={'If-None-Match': first.headers['ETag']})
+        assert stale.status_code == 200
+        assert 'C1' in [course['name'] for course in stale.get_json()]
+    finally:
+        query_cache.poll_interval = poll_interval
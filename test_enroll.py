@@ -0,0 +1,44 @@
+"""POST /enroll without a studentId creates the student from the parent account."""
+from datetime import date
+
+
+def add_parent(sql, child_name, child_age):
+    return sql(
+        "INSERT INTO parent (First_Name, Last_Name, Email_Address, Password, Child_Name, Child_Age) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        ('Mary', 'Wong', 'mary.wong@example.com', 'secret', child_name, child_age)
+    )
+
+
+def test_enroll_creates_student_from_parent(client, sql, add_course):
+    course_id = add_course('Enroll Readers', location='Tseung Kwan O Centre')
+    parent_id = add_parent(sql, 'Emily Chan', 7)
+
+    response = client.post('/enroll', json={'courseId': course_id, 'parentId': parent_id})
+    assert response.status_code == 200, response.get_json()
+    student_id = response.get_json()['studentId']
+
+    student, = sql("SELECT * FROM students WHERE id = %s", (student_id,))
+    assert (student['first_name'], student['last_name']) == ('Emily', 'Chan')
+    assert student['date_of_birth'].year == date.today().year - 7
+    assert student['location'] == 'Tseung Kwan O Centre'
+    assert (student['parent_name'], student['parent_email']) == ('Mary Wong', 'mary.wong@example.com')
+    assert (student['name'], student['age'], student['course_id']) == ('Emily Chan', 7, course_id)
+
+    students = client.get(f'/course-students/{course_id}').get_json()
+    assert [row['id'] for row in students] == [student_id]
+    listed = {row['id']: row for row in client.get('/students').get_json()}
+    assert listed[student_id]['joinDate'] == student['created_at'].date().isoformat()
+
+
+def test_enroll_single_word_child_name_takes_parent_last_name(client, sql, add_course):
+    course_id = add_course('Enroll Phonics')
+    parent_id = add_parent(sql, 'Leo', None)
+
+    response = client.post('/enroll', json={'courseId': course_id, 'parentId': parent_id})
+    assert response.status_code == 200, response.get_json()
+
+    student, = sql("SELECT first_name, last_name, date_of_birth FROM students WHERE id = %s",
+                   (response.get_json()['studentId'],))
+    assert (student['first_name'], student['last_name']) == ('Leo', 'Wong')
+    assert student['date_of_birth'] == date.today()
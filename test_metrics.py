@@ -0,0 +1,66 @@
+"""Metrics shared between worker processes through SharedDirectory.
+
+Each "worker" here is a separate Registry in this process, sharing one
+directory as gunicorn workers would.
+"""
+import os
+
+import metrics
+
+
+def start_worker(path):
+    registry = metrics.Registry()
+    jobs = registry.counter('jobs_total', 'Jobs run.', ('kind',))
+    seconds = registry.histogram('job_seconds', 'Job time.', ('kind',), buckets=(1, 10))
+    shared = metrics.SharedDirectory(registry, str(path), interval=3600)
+    shared.start()
+    return shared, jobs, seconds
+
+
+def scrape(shared):
+    lines = shared.registry.render(shared.snapshots()).splitlines()
+    return {line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1]) for line in lines if not line.startswith('#')}
+
+
+def test_scrape_adds_other_workers(tmp_path):
+    first, first_jobs, first_seconds = start_worker(tmp_path)
+    second, second_jobs, second_seconds = start_worker(tmp_path)
+    first_jobs.inc(('report',), 2)
+    first_seconds.observe(('report',), 0.5)
+    second_jobs.inc(('report',), 3)
+    second_jobs.inc(('export',))
+    second_seconds.observe(('report',), 5)
+    second.flush()
+
+    samples = scrape(first)
+    assert samples['jobs_total{kind="report"}'] == 5
+    assert samples['jobs_total{kind="export"}'] == 1
+    assert samples['job_seconds_bucket{kind="report",le="1"}'] == 1
+    assert samples['job_seconds_bucket{kind="report",le="10"}'] == 2
+    assert samples['job_seconds_sum{kind="report"}'] == 5.5
+    first.close()
+    second.close()
+
+
+def test_exited_workers_stay_in_the_totals(tmp_path):
+    first, first_jobs, _ = start_worker(tmp_path)
+    second, second_jobs, _ = start_worker(tmp_path)
+    first_jobs.inc(('report',), 2)
+    second_jobs.inc(('report',), 3)
+    first.close()
+    second.close()
+
+    # Both "workers" share this pid, so the master archives both files
+    master = metrics.SharedDirectory(metrics.Registry(), str(tmp_path))
+    master.registry.counter('jobs_total', 'Jobs run.', ('kind',))
+    master.registry.histogram('job_seconds', 'Job time.', ('kind',), buckets=(1, 10))
+    master.archive(os.getpid())
+    assert sorted(os.listdir(tmp_path)) == [metrics.SharedDirectory.ARCHIVE]
+
+    third, third_jobs, _ = start_worker(tmp_path)
+    third_jobs.inc(('report',))
+    assert scrape(third)['jobs_total{kind="report"}'] == 6
+    third.close()
+
+    master.clear()
+    assert os.listdir(tmp_path) == []
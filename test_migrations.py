@@ -0,0 +1,100 @@
+"""Schema migrations (migrate.py, migrations.py) on in-memory SQLite databases."""
+import pytest
+
+import migrate
+import migrations
+import rollups
+import storage
+
+ALL_VERSIONS = [migration.version for migration in migrations.MIGRATIONS]
+
+
+@pytest.fixture
+def database():
+    backend = storage.SQLiteBackend(':memory:')
+    connection = backend.connect()
+    try:
+        yield backend, connection
+    finally:
+        connection.close()
+
+
+def versions(applied):
+    return [migration.version for migration in applied]
+
+
+def test_fresh_database_gets_every_migration_once(database):
+    backend, connection = database
+    assert versions(migrate.migrate(connection, backend, log=None)) == ALL_VERSIONS
+    assert migrate.pending_migrations(connection, backend) == []
+    assert migrate.migrate(connection, backend, log=None) == []
+
+    cursor = connection.cursor()
+    assert sorted(migrate.applied_versions(cursor)) == ALL_VERSIONS
+    cursor.close()
+
+
+def test_target_stops_at_a_version(database):
+    backend, connection = database
+    assert versions(migrate.migrate(connection, backend, target=5, log=None)) == [1, 2, 3, 4, 5]
+    assert versions(migrate.pending_migrations(connection, backend, target=7)) == [6, 7]
+    assert versions(migrate.migrate(connection, backend, log=None)) == ALL_VERSIONS[5:]
+
+
+def test_upgrade_keeps_existing_data(database):
+    backend, connection = database
+    # A database from before the attendance unique key and the rollups
+    migrate.migrate(connection, backend, target=2, log=None)
+    cursor = connection.cursor()
+    cursor.executemany(
+        "INSERT INTO attendance (date, course_id, course_name, student_id, student_name, status) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        [('2025-01-06', 'phonics', 'Phonics', '1', 'Emily', 'absent'),
+         ('2025-01-06', 'phonics', 'Phonics', '1', 'Emily', 'present'),
+         ('2025-01-06', 'phonics', 'Phonics', '2', 'Leo', 'late')]
+    )
+    cursor.executemany(
+        "INSERT INTO grades (date, course, course_id, type, title, student, student_id, score, max_score, feedback) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        [('2025-01-06', 'Phonics', 'phonics', 'quiz', 'Quiz 1', 'Emily', 1, 8, 10, ''),
+         ('2025-01-13', 'Phonics', 'phonics', 'exam', 'Midterm', 'Emily', 1, 45, 50, '')]
+    )
+    connection.commit()
+
+    assert versions(migrate.migrate(connection, backend, log=None)) == ALL_VERSIONS[2:]
+
+    # Duplicate marks keep the latest row, and the unique key is in place
+    cursor.execute("SELECT student_id, status FROM attendance ORDER BY student_id")
+    assert [(row['student_id'], row['status']) for row in cursor.fetchall()] == [('1', 'present'), ('2', 'late')]
+    assert 'unique_attendance' in backend.table_indexes(cursor, 'attendance')
+
+    # The rollups are built from the rows already there
+    cursor.execute(f"SELECT {', '.join(rollups.ATTENDANCE_TOTALS)} FROM attendance_daily")
+    assert [tuple(row.values()) for row in cursor.fetchall()] == [(1, 0, 1)]
+    cursor.execute("SELECT SUM(grade_count) AS grade_count FROM grade_course_buckets WHERE course_id = 'phonics'")
+    assert cursor.fetchone()['grade_count'] == 2
+    cursor.close()
+
+
+def test_failed_migration_is_retried_from_its_first_step(database, monkeypatch):
+    backend, connection = database
+    calls = []
+
+    def fail_once(connection, backend):
+        calls.append(backend)
+        if len(calls) == 1:
+            raise RuntimeError("step failed")
+
+    monkeypatch.setattr(migrate, 'MIGRATIONS', migrations.MIGRATIONS[:1] + [
+        migrations.Migration(2, 'fail_once', [
+            migrations.Sql("建表 retried", sqlite="CREATE TABLE IF NOT EXISTS retried (id INTEGER)"),
+            migrations.Run("第一次失败", fail_once)
+        ])
+    ])
+
+    with pytest.raises(RuntimeError, match="step failed"):
+        migrate.migrate(connection, backend, log=None)
+    # Migration 1 stays recorded; 2 is not, and runs again from its first step
+    assert versions(migrate.pending_migrations(connection, backend)) == [2]
+    assert versions(migrate.migrate(connection, backend, log=None)) == [2]
+    assert len(calls) == 2
@@ -0,0 +1,38 @@
+"""GET /attendance filters must use an index on a freshly migrated database.
+
+Runs check_query_plans.py's check against an in-memory SQLite database, so
+a migration that drops or forgets an attendance index fails the test run.
+"""
+import pytest
+
+import check_query_plans
+import migrate
+import storage
+
+
+@pytest.fixture
+def backend_cursor():
+    backend = storage.SQLiteBackend(':memory:')
+    connection = backend.connect()
+    migrate.migrate(connection, backend, log=None)
+    cursor = connection.cursor()
+    try:
+        yield backend, cursor
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def full_scans(backend, cursor):
+    return {combination: scanned
+            for combination, scanned in check_query_plans.attendance_full_scans(cursor, backend) if scanned}
+
+
+def test_attendance_filters_use_an_index(backend_cursor):
+    assert full_scans(*backend_cursor) == {}
+
+
+def test_missing_index_is_reported(backend_cursor):
+    backend, cursor = backend_cursor
+    cursor.execute("DROP INDEX idx_attendance_status_date")
+    assert full_scans(backend, cursor)[('status',)] == ['attendance']
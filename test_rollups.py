@@ -0,0 +1,138 @@
+"""Rollups kept by the write routes agree with the raw rows and with a rebuild."""
+import random
+
+import pytest
+
+import rollups
+from app import storage_backend
+
+
+def grade(course_id, student_id, grade_type, score, max_score=100):
+    return {
+        'date': '2025-01-20', 'course': course_id, 'courseId': course_id, 'type': grade_type,
+        'title': 'Test', 'student': f"Student {student_id}", 'studentId': student_id,
+        'score': score, 'maxScore': max_score
+    }
+
+
+def rebuild(rebuild_rollups):
+    connection = storage_backend.connect()
+    try:
+        rebuild_rollups(connection, storage_backend)
+    finally:
+        connection.close()
+
+
+def test_grade_stats_match_grades(client):
+    rng = random.Random(20)
+    grades = [grade('stats-course', rng.randrange(1, 6), rng.choice(rollups.GRADE_TYPES),
+                    rng.randrange(0, 51), 50) for _ in range(60)]
+    for row in grades[:10]:
+        assert client.post('/grades', json=row).status_code == 201
+    assert client.post('/grades/batch', json=grades[10:]).status_code == 201
+
+    stats = client.get('/grade-stats?courseId=stats-course').get_json()
+    percents = [row['score'] * 100 / row['maxScore'] for row in grades]
+    assert stats['overall']['count'] == len(grades)
+    assert stats['overall']['mean'] == pytest.approx(sum(percents) / len(percents), abs=0.01)
+    assert sum(bin['count'] for bin in stats['overall']['histogram']) == len(grades)
+    for grade_type, type_stats in stats['byType'].items():
+        assert type_stats['count'] == sum(1 for row in grades if row['type'] == grade_type)
+
+    student = client.get('/grade-stats?studentId=3').get_json()
+    assert student['overall']['count'] == sum(1 for row in grades if row['studentId'] == 3)
+
+    rebuild(rollups.rebuild_grade_rollups)
+    assert client.get('/grade-stats?courseId=stats-course').get_json() == stats
+
+
+@pytest.mark.parametrize('field, value', [
+    ('score', '85.5'),
+    ('score', -1),
+    ('maxScore', 0),
+    ('type', 'essay'),
+    ('studentId', 'abc'),
+    ('course', '')
+])
+def test_invalid_grade_is_rejected(client, field, value):
+    row = {**grade('invalid-course', 1, 'quiz', 5, 10), field: value}
+    response = client.post('/grades', json=row)
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
+    assert client.get('/grade-stats?courseId=invalid-course').get_json()['overall']['count'] == 0
+
+
+def test_zero_score_is_counted(client):
+    assert client.post('/grades', json=grade('zero-course', 1, 'exam', 0)).status_code == 201
+    stats = client.get('/grade-stats?courseId=zero-course').get_json()
+    assert (stats['overall']['count'], stats['overall']['mean']) == (1, 0)
+
+
+def test_final_grades_follow_course_weights(client):
+    for row in (grade('final-course', 1, 'quiz', 6, 10), grade('final-course', 1, 'quiz', 8, 10),
+                grade('final-course', 1, 'exam', 90), grade('final-course', 2, 'homework', 50)):
+        assert client.post('/grades', json=row).status_code == 201
+
+    final = client.get('/final-grades?courseId=final-course').get_json()['students']
+    # Default weights: quiz 20, exam 40; student 2 has homework only
+    assert [row['finalGrade'] for row in final] == [pytest.approx((20 * 70 + 40 * 90) / 60, abs=0.01), 50]
+    assert final[0]['byType']['quiz'] == {'count': 2, 'mean': 70, 'weight': 20}
+
+    assert client.put('/grade-weights/final-course', json={'quiz': 1, 'exam': 3}).status_code == 200
+    final = client.get('/final-grades?courseId=final-course').get_json()['students']
+    # Homework now weighs 0, so student 2 has no final grade
+    assert [row['finalGrade'] for row in final] == [85, None]
+    assert client.get('/final-grades?studentId=1&courseId=final-course').get_json()['courses'] == final[:1]
+
+    rebuild(rollups.rebuild_grade_rollups)
+    assert client.get('/final-grades?courseId=final-course').get_json()['students'] == final
+
+
+def attendance_report(client, **params):
+    query = '&'.join(f"{key}={value}" for key, value in params.items())
+    report = client.get(f"/attendance-rates?{query}").get_json()
+    return {status: report[status] for status in ('total', *rollups.ATTENDANCE_STATUSES)}
+
+
+def test_attendance_rates_match_marks(client):
+    rng = random.Random(22)
+    days = [f"2025-{month:02d}-{day:02d}" for month in (1, 2, 3) for day in (3, 15, 28)]
+    marks = {}
+
+    def submit(day, course_id):
+        register = []
+        for student_id in range(1, 6):
+            status = rng.choice(rollups.ATTENDANCE_STATUSES)
+            marks[day, course_id, student_id] = status
+            register.append({'date': day, 'courseId': course_id, 'courseName': course_id,
+                             'studentId': student_id, 'studentName': f"Student {student_id}", 'status': status})
+        assert client.post('/attendance', json=register).status_code == 200
+
+    for day in days:
+        for course_id in ('attendance-a', 'attendance-b'):
+            submit(day, course_id)
+    # Resubmitted registers move marks between statuses instead of adding to them
+    for day in days[::2]:
+        submit(day, 'attendance-a')
+
+    def expected(course_id, student_id=None, date_from='', date_to='9999'):
+        statuses = [status for (day, course, student), status in marks.items()
+                    if course == course_id and student_id in (None, student)
+                    and date_from <= day <= date_to]
+        return {'total': len(statuses), **{status: statuses.count(status) for status in rollups.ATTENDANCE_STATUSES}}
+
+    # Whole months come from the rollups, partial ones from the attendance rows
+    queries = [
+        {'courseId': 'attendance-a'},
+        {'courseId': 'attendance-b', 'dateFrom': '2025-01-10', 'dateTo': '2025-03-20'},
+        {'courseId': 'attendance-a', 'studentId': 2},
+        {'courseId': 'attendance-a', 'studentId': 3, 'dateFrom': '2025-01-10', 'dateTo': '2025-03-20'},
+        {'courseId': 'attendance-b', 'studentId': 4, 'dateFrom': '2025-02-01', 'dateTo': '2025-02-28'}
+    ]
+    reports = [attendance_report(client, **params) for params in queries]
+    for params, report in zip(queries, reports):
+        assert report == expected(params['courseId'], params.get('studentId'),
+                                  params.get('dateFrom', ''), params.get('dateTo', '9999'))
+
+    rebuild(rollups.rebuild_attendance_rollups)
+    assert [attendance_report(client, **params) for params in queries] == reports
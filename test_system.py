@@ -16,27 +16,17 @@ def print_header(text):
 def test_database_connection():
     print_header("测试数据库连接")
     try:
-        import pymysql
-        from app import db_config
+        # 使用 app.py 配置的存储后端（STORAGE_BACKEND=mysql 或 sqlite）
+        from app import storage_backend
         
-        connection = pymysql.connect(
-            host=db_config['host'],
-            user=db_config['user'],
-            password=db_config['password'],
-            port=db_config['port'],
-            database=db_config['database'],
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            ssl={'fake': True}
-        )
+        connection = storage_backend.connect()
         cursor = connection.cursor()
         
         # 测试查询
-        cursor.execute("SHOW TABLES")
-        tables = cursor.fetchall()
+        tables = storage_backend.list_tables(cursor)
         
-        print("数据库连接成功!")
-        print(f"数据库中的表: {[table.values() for table in tables]}")
+        print(f"数据库连接成功! ({storage_backend.name})")
+        print(f"数据库中的表: {tables}")
         
         cursor.close()
         connection.close()
@@ -235,9 +225,10 @@ def main():
     server_process = None
     
     if not server_running:
-        # 初始化数据库
-        print("\n正在初始化数据库...")
-        subprocess.run([sys.executable, "init_db.py"], check=True)
+        # 执行数据库迁移（内嵌 SQLite 由 app.py 启动时迁移）
+        if os.environ.get('STORAGE_BACKEND', 'mysql') == 'mysql':
+            print("\n正在执行数据库迁移...")
+            subprocess.run([sys.executable, "migrate.py"], check=True)
         
         # 启动服务器
         server_process = start_server()